@@ -0,0 +1,87 @@
+# Runtime of the one-to-one assignment (core_logic.assignment, --one-to-one) on sparse synthetic candidate
+# pairs, at increasing contention (share of Spotify tracks whose true match is a local file other Spotify
+# tracks also match, e.g. live versions of one studio recording). Compared with the independent best match
+# per track (what compare_tracks does by default) and a greedy best-pair-first assignment. The assignment is
+# also checked against exhaustive search on small random instances.
+#   python benchmarks/bench_assignment.py [num_spotify] [num_local] [candidates_per_track]
+import itertools
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core_logic.assignment import assign_one_to_one
+
+REVIEW_THRESHOLD = 75
+
+def make_candidate_lists(rng, num_spotify, num_local, per_track, contention):
+    # Every Spotify track gets its true local match (scored high) plus per_track - 1 weaker candidates,
+    # half of them near the true match in the local library (same album/artist), half anywhere
+    shared_pool = [rng.randrange(num_local) for _ in range(max(1, num_spotify // 20))]
+    candidate_lists = []
+    for _ in range(num_spotify):
+        true_idx = rng.choice(shared_pool) if rng.random() < contention else rng.randrange(num_local)
+        candidates = {true_idx: round(rng.uniform(85, 100), 1)}
+        while len(candidates) < per_track:
+            other = (true_idx + rng.randint(-20, 20)) % num_local if rng.random() < 0.5 else rng.randrange(num_local)
+            candidates.setdefault(other, round(rng.uniform(REVIEW_THRESHOLD, 95), 1))
+        candidate_lists.append(sorted(candidates.items(), key=lambda pair: -pair[1]))
+    return candidate_lists
+
+def independent_best(candidate_lists):
+    return [candidates[0] if candidates else (None, 0) for candidates in candidate_lists]
+
+def greedy_assignment(candidate_lists):
+    pairs = sorted(((score, row, local_idx) for row, candidates in enumerate(candidate_lists) for local_idx, score in candidates),
+                   key=lambda pair: -pair[0])
+    result, taken = [(None, 0)] * len(candidate_lists), set()
+    for score, row, local_idx in pairs:
+        if result[row][0] is None and local_idx not in taken:
+            result[row] = (local_idx, score); taken.add(local_idx)
+    return result
+
+def assignment_weight(result):
+    # The objective the assignment maximizes: 1 + (score - review threshold) per assigned pair
+    return sum(1 + score - REVIEW_THRESHOLD for local_idx, score in result if local_idx is not None)
+
+def duplicate_claims(result):
+    claimed = [local_idx for local_idx, _ in result if local_idx is not None]
+    return len(claimed) - len(set(claimed))
+
+def check_against_exhaustive(rng, instances):
+    for _ in range(instances):
+        num_rows, num_cols = rng.randint(1, 6), rng.randint(1, 5)
+        candidate_lists = [[(col, round(rng.uniform(REVIEW_THRESHOLD, 100), 1)) for col in rng.sample(range(num_cols), rng.randint(0, num_cols))]
+                           for _ in range(num_rows)]
+        best = 0
+        for choice in itertools.product(*[[None] + [col for col, _ in candidates] for candidates in candidate_lists]):
+            chosen = [col for col in choice if col is not None]
+            if len(chosen) == len(set(chosen)):
+                best = max(best, assignment_weight([(col, dict(candidates).get(col, 0)) for col, candidates in zip(choice, candidate_lists)]))
+        result = assign_one_to_one(candidate_lists, REVIEW_THRESHOLD)
+        if duplicate_claims(result) or abs(assignment_weight(result) - best) > 1e-6:
+            return False
+    return True
+
+def main():
+    num_spotify = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    num_local = int(sys.argv[2]) if len(sys.argv) > 2 else 250000
+    per_track = int(sys.argv[3]) if len(sys.argv) > 3 else 10
+    rng = random.Random(42)
+    print(f"{num_spotify} Spotify tracks x {num_local} local tracks, {per_track} candidates per track ({num_spotify * per_track} pairs)")
+    print(f"  {'contention':>10} {'method':<12} {'time ms':>9} {'dup claims':>11} {'assigned':>9} {'weight':>10}")
+    for contention in (0.0, 0.1, 0.3, 0.6):
+        candidate_lists = make_candidate_lists(rng, num_spotify, num_local, per_track, contention)
+        for name, solve in (("independent", independent_best), ("greedy", greedy_assignment),
+                            ("one-to-one", lambda lists: assign_one_to_one(lists, REVIEW_THRESHOLD))):
+            t0 = time.perf_counter()
+            result = solve(candidate_lists)
+            elapsed_ms = (time.perf_counter() - t0) * 1000
+            assigned = sum(1 for local_idx, _ in result if local_idx is not None)
+            print(f"  {contention:>10.0%} {name:<12} {elapsed_ms:>9.0f} {duplicate_claims(result):>11} {assigned:>9} {assignment_weight(result):>10.0f}")
+    print(f"Optimal on 500 small random instances (exhaustive search): {check_against_exhaustive(rng, 500)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+# Orphan searches per second through the worker threads (spotipy) and through the asyncio client, against a
+# mock Spotify API with a fixed per-request latency. Before timing, the asyncio client is checked against the
+# mock: retries on HTTP 429/5xx, the token refresh on HTTP 401, that a Liked Songs page failing in the
+# concurrent fetch is paged again serially without losing the others, playlist paging, batch sizes of the
+# writes, and that the asyncio orphan search gives the same hits as the threaded one.
+#   python benchmarks/bench_async_api.py [num_orphans] [latency_ms]
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import spotipy
+
+from spotify_sync_lib.config import APP_CONFIG, console
+from services.spotify_async_api import AsyncSpotifyClient, async_spotify_available, httpx
+from core_logic.orphan_processor import prefetch_orphan_searches
+from benchmarks.synthetic_library import make_local_tracks
+
+def search_items(query):
+    return [{"name": f"{query} #{i}", "artists": [{"name": "Artist"}], "album": {"name": "Album"},
+             "external_urls": {"spotify": f"https://open.spotify.com/track/{i}"}, "id": f"id{i}"} for i in range(5)]
+
+class MockSpotify:
+    # Answers like the Web API; `script` holds status codes to return (in order) before a normal answer
+    def __init__(self, latency=0.0, playlist_size=0, saved_size=0):
+        self.latency = latency
+        self.saved = [{"added_at": f"2024-01-01T{i:06d}", "track": {"id": f"s{i}"}} for i in range(saved_size)]
+        self.failing_offsets = {} # Liked Songs offset -> how many more requests for it fail with HTTP 500
+        self.playlist = [f"spotify:track:p{i}" for i in range(playlist_size)]
+        self.script = []
+        self.requests = []
+        self.tokens_seen = []
+
+    async def handle(self, request):
+        if self.latency: await asyncio.sleep(self.latency)
+        body = json.loads(request.content) if request.content else None
+        self.requests.append((request.method, request.url.path, body))
+        self.tokens_seen.append(request.headers["Authorization"])
+        if self.script:
+            status = self.script.pop(0)
+            return httpx.Response(status, headers={"Retry-After": "0"}, json={"error": {"status": status, "message": "scripted"}})
+        params = request.url.params
+        if request.url.path.endswith("/me/tracks") and request.method == "GET":
+            offset, limit = int(params["offset"]), int(params["limit"])
+            if self.failing_offsets.get(offset):
+                self.failing_offsets[offset] -= 1
+                return httpx.Response(500, json={"error": {"status": 500, "message": "scripted"}})
+            return httpx.Response(200, json={"items": self.saved[offset:offset + limit], "total": len(self.saved),
+                                             "next": "x" if offset + limit < len(self.saved) else None})
+        if request.url.path.endswith("/search"):
+            return httpx.Response(200, json={"tracks": {"items": search_items(params["q"])}})
+        if request.method == "GET" and "/playlists/" in request.url.path:
+            offset, limit = int(params["offset"]), int(params["limit"])
+            items = [{"track": {"id": uri.rsplit(":", 1)[1]}} for uri in self.playlist[offset:offset + limit]]
+            return httpx.Response(200, json={"items": items, "total": len(self.playlist), "next": "x" if offset + limit < len(self.playlist) else None})
+        if request.method == "POST":
+            self.playlist.extend(body["uris"])
+        elif request.method == "DELETE":
+            removed = {t["uri"] for t in body["tracks"]}
+            self.playlist = [uri for uri in self.playlist if uri not in removed]
+        return httpx.Response(200, json={"snapshot_id": f"snap{len(self.requests)}"} if "/playlists/" in request.url.path else None)
+
+class TokenProvider:
+    def __init__(self):
+        self.calls = []
+    def __call__(self, force_refresh=False):
+        self.calls.append(force_refresh)
+        return f"token{len(self.calls)}"
+
+async def check_client():
+    checks = {}
+    api, tokens = MockSpotify(playlist_size=250, saved_size=260), TokenProvider()
+    async with AsyncSpotifyClient(tokens, transport=httpx.MockTransport(api.handle)) as client:
+        for status in (429, 503):
+            api.script = [status]
+            checks[f"retry after HTTP {status}"] = len(await client.search_tracks("q")) == 5 and not api.script
+        api.script = [401]
+        seen = len(api.tokens_seen)
+        await client.search_tracks("q")
+        checks["token refreshed after HTTP 401"] = tokens.calls == [False, True] and api.tokens_seen[seen:] == ["Bearer token1", "Bearer token2"]
+        api.script = [404]
+        try:
+            await client.search_tracks("q"); checks["HTTP 404 raised"] = False
+        except spotipy.SpotifyException as e:
+            checks["HTTP 404 raised"] = e.http_status == 404 and not api.script
+
+        max_retries = APP_CONFIG.get("api_max_retries", 3)
+        api.failing_offsets = {100: max_retries} # Fails every retry of the concurrent request, then recovers
+        items, total = await client.all_saved_tracks()
+        checks["failed Liked Songs page paged serially"] = [item["track"]["id"] for item in items] == [f"s{i}" for i in range(260)] and total == 260
+        api.failing_offsets = {100: 2 * max_retries} # Fails the serial retry as well
+        items, _ = await client.all_saved_tracks()
+        checks["other pages kept when one fails"] = [item["track"]["id"] for item in items] == [f"s{i}" for i in range(260) if not 100 <= i < 150]
+
+        items = await client.playlist_items("pl", fields="items(track(id))")
+        checks["playlist paging"] = [item["track"]["id"] for item in items] == [f"p{i}" for i in range(250)]
+        del api.requests[:]
+        await client.add_to_saved_tracks([f"s{i}" for i in range(120)])
+        checks["Liked Songs batches 50/50/20"] = sorted(len(body["ids"]) for _, _, body in api.requests) == [20, 50, 50]
+        del api.requests[:]
+        snapshot = await client.add_to_playlist("pl", [f"a{i}" for i in range(250)])
+        checks["playlist add batches 100/100/50 in order"] = ([len(body["uris"]) for _, _, body in api.requests] == [100, 100, 50]
+                                                             and api.playlist[250:] == [f"spotify:track:a{i}" for i in range(250)]
+                                                             and snapshot == f"snap{len(api.requests)}")
+        del api.requests[:]
+        await client.remove_from_playlist("pl", [f"p{i}" for i in range(150)])
+        checks["playlist remove batches 100/50"] = ([len(body["tracks"]) for _, _, body in api.requests] == [100, 50]
+                                                   and api.playlist[:100] == [f"spotify:track:p{i}" for i in range(150, 250)])
+    return checks
+
+class ThreadedSearch:
+    # spotipy stand-in for the threaded path: blocks for `latency` per search
+    def __init__(self, latency):
+        self.latency = latency
+    def search(self, q, type, limit):
+        time.sleep(self.latency)
+        return {"tracks": {"items": search_items(q)}}
+
+async def orphan_searches(orphans, latency, use_async):
+    def consume(async_client=None):
+        return [(l_track['filepath'], hits) for l_track, hits, _ in prefetch_orphan_searches(ThreadedSearch(latency), orphans, False, async_client=async_client)]
+    if not use_async: return await asyncio.to_thread(consume)
+    async with AsyncSpotifyClient(TokenProvider(), transport=httpx.MockTransport(MockSpotify(latency).handle)) as client:
+        return await asyncio.to_thread(consume, client)
+
+def main():
+    num_orphans = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    latency = (float(sys.argv[2]) if len(sys.argv) > 2 else 50) / 1000
+    if not async_spotify_available():
+        print("httpx is not installed (pip install httpx); nothing to compare."); return
+    APP_CONFIG.update(api_requests_per_second=100000, api_burst_size=100000, api_initial_retry_delay=0)
+    console.quiet = True; logging.disable(logging.CRITICAL) # Retry warnings of the scripted errors
+
+    checks = asyncio.run(check_client())
+    print("Checks: " + ", ".join(f"{name} {'ok' if passed else 'FAILED'}" for name, passed in checks.items()))
+    orphans = make_local_tracks(num_orphans)
+    results = {}
+    print(f"{num_orphans} orphan searches at {latency * 1000:.0f} ms per request "
+          f"({APP_CONFIG.get('orphan_search_workers', 8)} workers, {APP_CONFIG.get('orphan_search_lookahead', 64)} ahead)")
+    for name, use_async in (("threads", False), ("asyncio", True)):
+        t0 = time.perf_counter()
+        results[name] = asyncio.run(orphan_searches(orphans, latency, use_async))
+        elapsed = time.perf_counter() - t0
+        print(f"  {name:<8} {elapsed:>7.2f} s  {num_orphans / elapsed:>8,.0f} searches/s")
+    print(f"  Same hits in the same order: {results['threads'] == results['asyncio']}")
+
+if __name__ == "__main__":
+    main()
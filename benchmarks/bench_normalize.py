@@ -0,0 +1,63 @@
+# Strings per second of normalize_text_advanced before (reference copy of the original re.sub chain)
+# and after (compiled pipeline + artist memo), plus an equality check on the benchmark inputs.
+#   python benchmarks/bench_normalize.py [num_tracks]
+import os
+import re
+import sys
+import time
+import unicodedata
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from spotify_sync_lib.config import APP_CONFIG, apply_normalization_patterns
+from spotify_sync_lib.text_tools import normalize_text_advanced
+from benchmarks.synthetic_library import make_local_tracks
+
+def normalize_text_reference(text, is_artist=False):
+    if not text: return ""
+    normalized_text = str(text)
+    for pattern in APP_CONFIG["normalization_patterns_to_remove_regex"]:
+        normalized_text = pattern.sub("", normalized_text)
+    normalized_text = unicodedata.normalize('NFKD', normalized_text).encode('ascii', 'ignore').decode('utf-8')
+    if is_artist:
+        normalized_text = re.sub(r'feat\..*', '', normalized_text, flags=re.IGNORECASE)
+        normalized_text = re.sub(r'ft\..*', '', normalized_text, flags=re.IGNORECASE)
+        normalized_text = re.sub(r'[,&].*', '', normalized_text)
+        normalized_text = re.sub(r'\s+a\.?k\.?a\.?.*', '', normalized_text, flags=re.IGNORECASE)
+    else:
+        normalized_text = re.sub(r'[\(\[\{].*?[\)\]\}]', '', normalized_text)
+        normalized_text = re.sub(r'[:-].*$', '', normalized_text)
+    normalized_text = re.sub(r"[^\w\s]", "", normalized_text)
+    normalized_text = normalized_text.lower().strip()
+    normalized_text = re.sub(r'\s+', ' ', normalized_text)
+    return normalized_text
+
+EXTRA_SAMPLES = [
+    ("Beyoncé feat. JAY-Z", True), ("Simon & Garfunkel", True), ("Prince a.k.a. Symbol", True), ("Ft. Someone", True),
+    ("AC/DC", True), ("Sigur Rós, Jónsi", True), ("Song (Official Video) [HQ]", False), ("Title - Remastered 2011", False),
+    ("Intro: The Beginning", False), ("Tschüss  (Live)  ", False), ("Wait... What?!", False), ("", False),
+    ("Mötley Crüe", True), ("Fast\tCar\x1f", False), ("Café del Mar (Lyrics)", False), ("[Explicit] Track", False),
+    ("(hd)a(stereo(official video))editmono:", True), ("Song ((Official Video)Explicit)", False), # Removals that expose another match
+]
+
+def main():
+    num_tracks = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    apply_normalization_patterns(APP_CONFIG["normalization_patterns_to_remove_str"])
+    local_tracks = make_local_tracks(num_tracks)
+    inputs = [(t['original_title'] + (" (Official Video)" if i % 9 == 0 else ""), False) for i, t in enumerate(local_tracks)]
+    inputs += [(t['original_artist'] + (" feat. Guest" if i % 7 == 0 else ""), True) for i, t in enumerate(local_tracks)]
+
+    mismatches = [(text, is_artist) for text, is_artist in inputs + EXTRA_SAMPLES
+                  if normalize_text_reference(text, is_artist) != normalize_text_advanced(text, is_artist)]
+    print(f"{len(inputs)} strings ({num_tracks} titles + {num_tracks} artists), mismatches: {len(mismatches)}")
+    for text, is_artist in mismatches[:10]: print(f"  MISMATCH {text!r} artist={is_artist}")
+
+    for name, fn in (("before", normalize_text_reference), ("after", normalize_text_advanced)):
+        apply_normalization_patterns(APP_CONFIG["normalization_patterns_to_remove_str"]) # Also resets the artist memo
+        t0 = time.perf_counter()
+        for text, is_artist in inputs: fn(text, is_artist)
+        elapsed = time.perf_counter() - t0
+        print(f"  {name:<7} {len(inputs) / elapsed:>12,.0f} strings/s")
+
+if __name__ == "__main__":
+    main()
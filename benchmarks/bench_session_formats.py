@@ -0,0 +1,98 @@
+# File size, load time and peak RSS of the session formats (legacy JSON, SQLite, binary pack with and
+# without compression) on synthetic libraries. Each load runs in a fresh process so peak RSS is per format.
+# "open" is load_session_data alone; "scan" also reads norm_title/norm_artist of every track, which is
+# what building the match index needs. Every format is first checked to load back exactly what was saved,
+# including a local path with a surrogate escape (from a non-UTF-8 filename).
+#   python benchmarks/bench_session_formats.py [num_local ...]   (Spotify tracks = num_local / 5)
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from spotify_sync_lib.session_handler import save_session_data, load_session_data
+from spotify_sync_lib.session_pack import zstandard
+from spotify_sync_lib.session_store import SPOTIFY_COLUMNS, LOCAL_COLUMNS
+from spotify_sync_lib.text_tools import record_version_keywords
+from benchmarks.synthetic_library import make_local_tracks, make_spotify_tracks
+
+FORMATS = [("json", ".json"), ("sqlite", ".db"), ("pack", ".pack"), ("pack+gzip", ".pack.gz"), ("pack+zstd", ".pack.zst")]
+
+def peak_rss_mb():
+    # VmHWM on Linux: ru_maxrss survives exec, so a child would report the parent's peak
+    if os.path.exists("/proc/self/status"):
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"): return int(line.split()[1]) / 1024
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024 # bytes on macOS, KiB on Linux
+
+def child(filepath, mode):
+    # Runs in a subprocess; prints "seconds baseline_mb peak_mb"
+    baseline = peak_rss_mb()
+    t0 = time.perf_counter()
+    spotify_tracks, local_tracks, _ = load_session_data(filepath)
+    if mode == "scan":
+        for tracks in (spotify_tracks, local_tracks):
+            if hasattr(tracks, "column"):
+                titles, artists = tracks.column("norm_title"), tracks.column("norm_artist")
+            else:
+                titles, artists = [t['norm_title'] for t in tracks], [t['norm_artist'] for t in tracks]
+    elapsed = time.perf_counter() - t0
+    print(f"{elapsed} {baseline} {peak_rss_mb()}")
+
+def run_child(filepath, mode):
+    out = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", filepath, mode],
+                         capture_output=True, text=True, check=True).stdout.strip().splitlines()[-1]
+    return [float(x) for x in out.split()]
+
+def check_round_trip(tmp_dir):
+    local_tracks = make_local_tracks(500)
+    spotify_tracks, _ = make_spotify_tracks(local_tracks, 100)
+    for track in local_tracks + spotify_tracks: record_version_keywords(track)
+    local_tracks[0]['filepath'] = "/music/caf\udcff.mp3"
+    local_tracks[1]['album'] = None
+    results = []
+    for name, ext in FORMATS:
+        if ext.endswith(".zst") and zstandard is None: continue
+        filepath = os.path.join(tmp_dir, f"round_trip{ext}")
+        save_session_data(filepath, spotify_tracks, local_tracks, {"liked_total": len(spotify_tracks)})
+        loaded_spotify, loaded_local, meta = load_session_data(filepath)
+        same = (loaded_spotify is not None and meta.get("liked_total") == len(spotify_tracks)
+                and [[t.get(c) for c in SPOTIFY_COLUMNS] for t in spotify_tracks] == [[t.get(c) for c in SPOTIFY_COLUMNS] for t in loaded_spotify]
+                and [[t.get(c) for c in LOCAL_COLUMNS] for t in local_tracks] == [[t.get(c) for c in LOCAL_COLUMNS] for t in loaded_local])
+        results.append(f"{name} {'ok' if same else 'MISMATCH'}")
+    print(f"Round trip (incl. a surrogate-escaped path): {', '.join(results)}")
+
+def main():
+    sizes = [int(x) for x in sys.argv[1:]] or [100000, 500000]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        check_round_trip(tmp_dir)
+        for num_local in sizes:
+            local_tracks = make_local_tracks(num_local)
+            spotify_tracks, _ = make_spotify_tracks(local_tracks, num_local // 5)
+            for track in local_tracks + spotify_tracks: record_version_keywords(track)
+            meta = {"liked_watermark": "2024-01-01T00:00:00Z", "liked_total": len(spotify_tracks)}
+            print(f"\n{num_local} local + {len(spotify_tracks)} Spotify tracks")
+            print(f"  {'format':<10} {'size MB':>9} {'save s':>8} {'open s':>8} {'open RSS':>9} {'scan s':>8} {'scan RSS':>9}")
+            for name, ext in FORMATS:
+                if ext.endswith(".zst") and zstandard is None:
+                    print(f"  {name:<10} (skipped, zstandard not installed)"); continue
+                filepath = os.path.join(tmp_dir, f"session_{num_local}{ext}")
+                t0 = time.perf_counter()
+                save_session_data(filepath, spotify_tracks, local_tracks, meta)
+                save_seconds = time.perf_counter() - t0
+                size_mb = os.path.getsize(filepath) / 1e6
+                open_s, open_base, open_peak = run_child(filepath, "open")
+                scan_s, scan_base, scan_peak = run_child(filepath, "scan")
+                print(f"  {name:<10} {size_mb:>9.1f} {save_seconds:>8.2f} {open_s:>8.3f} {open_peak - open_base:>7.0f}MB"
+                      f" {scan_s:>8.3f} {scan_peak - scan_base:>7.0f}MB")
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == "--child":
+        child(sys.argv[2], sys.argv[3])
+    else:
+        main()
@@ -0,0 +1,55 @@
+# Pairwise fuzzywuzzy loop vs the batched scorer (core_logic.similarity) on synthetic data.
+# Also checks that both produce the same best match and score.
+#   python benchmarks/bench_similarity.py [num_local] [num_spotify] [candidates_per_track]
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from fuzzywuzzy import fuzz
+from core_logic.similarity import best_candidate, score_block
+from benchmarks.synthetic_library import make_local_tracks, make_spotify_tracks
+
+def pairwise_best(s_track, candidates):
+    best, highest = None, 0
+    for position, l_track in enumerate(candidates):
+        score = fuzz.ratio(s_track['norm_title'], l_track['norm_title']) * 0.7 + fuzz.ratio(s_track['norm_artist'], l_track['norm_artist']) * 0.3
+        if score > highest: best, highest = position, score
+    return best, highest
+
+def main():
+    num_local = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    num_spotify = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    per_track = int(sys.argv[3]) if len(sys.argv) > 3 else 500
+    local_tracks = make_local_tracks(num_local)
+    spotify_tracks, _ = make_spotify_tracks(local_tracks, num_spotify)
+    cand_titles = [t['norm_title'] for t in local_tracks]
+    cand_artists = [t['norm_artist'] for t in local_tracks]
+    print(f"{num_spotify} Spotify tracks x {per_track} candidates each ({num_spotify * per_track} pairs)")
+
+    windows = [((i * 7919) % (num_local - per_track)) for i in range(num_spotify)]
+    t0 = time.perf_counter()
+    pairwise = [pairwise_best(s, local_tracks[w:w + per_track]) for s, w in zip(spotify_tracks, windows)]
+    pairwise_s = time.perf_counter() - t0
+
+    for cutoff in (0, 75):
+        t0 = time.perf_counter()
+        batched = [best_candidate(s['norm_title'], s['norm_artist'], cand_titles[w:w + per_track], cand_artists[w:w + per_track], cutoff)
+                   for s, w in zip(spotify_tracks, windows)]
+        batched_s = time.perf_counter() - t0
+        expected = [(p, sc) if sc >= cutoff and p is not None else (None, 0) for p, sc in pairwise]
+        mismatches = sum(1 for a, b in zip(expected, batched) if a[0] != b[0] or abs(a[1] - b[1]) > 1e-9)
+        print(f"  one-vs-candidates cutoff={cutoff:<3}: {batched_s:7.2f}s vs pairwise {pairwise_s:7.2f}s "
+              f"({pairwise_s / batched_s:5.1f}x), mismatches: {mismatches}")
+
+    block = spotify_tracks[:min(num_spotify, 1000)]
+    t0 = time.perf_counter()
+    matrix = score_block([s['norm_title'] for s in block], [s['norm_artist'] for s in block], cand_titles, cand_artists, 75)
+    block_s = time.perf_counter() - t0
+    print(f"  block-vs-block {matrix.shape[0]}x{matrix.shape[1]} cutoff=75: {block_s:.2f}s "
+          f"({matrix.size / block_s / 1e6:.1f}M pairs/s, {int(np.count_nonzero(matrix))} pairs >= cutoff)")
+
+if __name__ == "__main__":
+    main()
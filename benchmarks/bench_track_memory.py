@@ -0,0 +1,57 @@
+# Peak RSS of holding a synthetic library as per-track dicts (before) and as __slots__ track records with
+# interned artist/album strings (after). Every track is round-tripped through JSON first so its strings are
+# separate objects, as they are when read from tags or a session file. The compare stage adds the
+# per-Spotify-track match_info dict compare_tracks used to build (before) or nothing (after).
+#   python benchmarks/bench_track_memory.py [num_local ...]   (Spotify tracks = num_local / 5)
+import json
+import os
+import subprocess
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from spotify_sync_lib.text_tools import record_version_keywords
+from spotify_sync_lib.track_records import SpotifyTrack, LocalTrack
+from benchmarks.synthetic_library import make_local_tracks, make_spotify_tracks
+from benchmarks.bench_session_formats import peak_rss_mb
+
+def fresh_copies(tracks):
+    for track in tracks:
+        yield json.loads(json.dumps(track))
+
+def child(num_local, representation):
+    # Runs in a subprocess; prints "library_mb compare_mb" (peak RSS growth after each stage)
+    local_source = make_local_tracks(num_local)
+    spotify_source, _ = make_spotify_tracks(local_source, num_local // 5)
+    for track in local_source + spotify_source: record_version_keywords(track)
+    baseline = peak_rss_mb()
+    if representation == "dict":
+        local_tracks = list(fresh_copies(local_source))
+        spotify_tracks = list(fresh_copies(spotify_source))
+    else:
+        local_tracks = [LocalTrack.from_dict(t) for t in fresh_copies(local_source)]
+        spotify_tracks = [SpotifyTrack.from_dict(t) for t in fresh_copies(spotify_source)]
+    library_peak = peak_rss_mb()
+    if representation == "dict":
+        match_infos = [{"spotify_track": s_track, "best_local_match": local_tracks[i % num_local], "score": 0.0,
+                        "spotify_version_keywords": list(s_track['version_keywords']),
+                        "local_version_keywords": list(local_tracks[i % num_local]['version_keywords'])}
+                       for i, s_track in enumerate(spotify_tracks)]
+    print(f"{library_peak - baseline} {peak_rss_mb() - baseline}")
+
+def main():
+    sizes = [int(x) for x in sys.argv[1:]] or [100000, 250000]
+    for num_local in sizes:
+        print(f"\n{num_local} local + {num_local // 5} Spotify tracks (peak RSS growth)")
+        print(f"  {'records':<10} {'library':>9} {'+compare':>9}")
+        for representation in ("dict", "slots"):
+            out = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", str(num_local), representation],
+                                 capture_output=True, text=True, check=True).stdout.strip().splitlines()[-1]
+            library_mb, compare_mb = (float(x) for x in out.split())
+            print(f"  {representation:<10} {library_mb:>7.0f}MB {compare_mb:>7.0f}MB")
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == "--child":
+        child(int(sys.argv[2]), sys.argv[3])
+    else:
+        main()
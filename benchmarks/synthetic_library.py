@@ -0,0 +1,85 @@
+import random
+import string
+
+# Synthetic libraries for the benchmark scripts. Word frequencies follow a Zipf-Mandelbrot distribution
+# so common tokens ("the", "love", ...) and skewed first letters behave like a real music collection.
+COMMON_WORDS = ["the", "love", "you", "me", "my", "in", "of", "a", "to", "night", "heart", "time", "baby", "life", "world"]
+
+def make_vocabulary(rng, size):
+    words = list(COMMON_WORDS)
+    while len(words) < size:
+        words.append("".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(3, 9))))
+    return words
+
+_cum_weights_cache = {}
+
+def zipf_cum_weights(size):
+    # Rank r (0-based) is drawn with probability ~ 1 / (r + 5)
+    if size not in _cum_weights_cache:
+        total, cum = 0.0, []
+        for rank in range(size):
+            total += 1.0 / (rank + 5); cum.append(total)
+        _cum_weights_cache[size] = cum
+    return _cum_weights_cache[size]
+
+def random_phrase(rng, vocabulary, min_words, max_words):
+    words = rng.choices(vocabulary, cum_weights=zipf_cum_weights(len(vocabulary)), k=rng.randint(min_words, max_words))
+    return " ".join(words)
+
+def typo(rng, text):
+    if len(text) < 4: return text
+    pos = rng.randrange(len(text))
+    if text[pos] == " ": return text
+    return text[:pos] + rng.choice(string.ascii_lowercase) + text[pos + 1:]
+
+def make_local_tracks(num_tracks, seed=42, num_artists=None):
+    rng = random.Random(seed)
+    vocabulary = make_vocabulary(rng, 20000)
+    artists = [random_phrase(rng, vocabulary, 1, 3) for _ in range(num_artists or max(10, num_tracks // 12))]
+    tracks = []
+    for i in range(num_tracks):
+        artist = rng.choice(artists)
+        if rng.random() < 0.15: artist = "the " + artist
+        title = random_phrase(rng, vocabulary, 1, 5)
+        album = random_phrase(rng, vocabulary, 1, 3)
+        tracks.append({
+            'original_title': title.title() + (" (Live)" if rng.random() < 0.05 else ""),
+            'original_artist': artist.title(),
+            'album': album.title(),
+            'norm_title': title,
+            'norm_artist': artist,
+            'filepath': f"/music/{artist}/{album}/{i:06d} - {title}.flac"
+        })
+    return tracks
+
+def make_spotify_tracks(local_tracks, num_tracks, match_ratio=0.7, seed=7):
+    # match_ratio of the tracks are perturbed copies of local tracks (added/dropped "the", title typos,
+    # dropped first title word); the rest are not in the local library. Returns (tracks, true_local_index_or_None).
+    rng = random.Random(seed)
+    vocabulary = make_vocabulary(random.Random(42), 20000)
+    tracks, truth = [], []
+    for i in range(num_tracks):
+        if rng.random() < match_ratio:
+            local_idx = rng.randrange(len(local_tracks))
+            l_track = local_tracks[local_idx]
+            artist, title = l_track['norm_artist'], l_track['norm_title']
+            roll = rng.random()
+            if roll < 0.15: artist = artist[4:] if artist.startswith("the ") else "the " + artist
+            elif roll < 0.30: title = typo(rng, title)
+            elif roll < 0.35 and " " in title: title = title.split(" ", 1)[1]
+            truth.append(local_idx)
+        else:
+            artist, title = random_phrase(rng, vocabulary, 1, 3), random_phrase(rng, vocabulary, 1, 5)
+            truth.append(None)
+        tracks.append({
+            'original_title': title.title(),
+            'original_artist': artist.title(),
+            'all_artists_str': artist.title(),
+            'album': "Album",
+            'norm_title': title,
+            'norm_artist': artist,
+            'id': f"sp{i:07d}",
+            'url': f"https://open.spotify.com/track/sp{i:07d}",
+            'added_at': "2024-01-01T00:00:00Z"
+        })
+    return tracks, truth
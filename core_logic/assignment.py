@@ -0,0 +1,79 @@
+import heapq
+
+# One-to-one assignment of Spotify tracks to local tracks (--one-to-one). compare_tracks normally takes each
+# Spotify track's best local match on its own, so several Spotify tracks (e.g. live versions) can claim the
+# same local file. Here the candidate pairs above the review threshold form a sparse bipartite graph and every
+# local track is given to at most one Spotify track, maximizing the summed weight of the chosen pairs.
+#
+# A pair weighs 1 + (score - score_floor), so a confident match outweighs several marginal ones. As a min-cost
+# problem every Spotify track is assigned either a candidate (cost 100 - score) or its own "unassigned" column
+# (cost 101 - score_floor, dearer than any candidate). It is solved with successive shortest augmenting paths
+# (Dijkstra on reduced costs with dual potentials, as in Jonker-Volgenant). Tracks start on their cheapest
+# candidate; only those that lose it to another track search for an augmenting path, and a search only visits
+# the tracks competing for the same local files, so the work grows with the contention, not the library size.
+
+def assign_one_to_one(candidate_lists, score_floor):
+    # candidate_lists: per Spotify track, [(local_track_index, score), ...] with scores >= score_floor.
+    # Returns [(local_track_index or None, score), ...] in the same order, each local index used at most once.
+    unassigned_cost = 101.0 - score_floor
+    costs = [[(local_idx, 100.0 - score) for local_idx, score in candidates] for candidates in candidate_lists]
+    row_potential = [0.0] * len(costs)
+    col_potential = {} # Local index -> dual potential; absent means 0. Unassigned columns keep 0.
+    col_of_row = [None] * len(costs)
+    row_of_col = {} # Local index, or -1 - row for a row's unassigned column
+    contested_rows = []
+
+    for row, row_costs in enumerate(costs): # Cheapest candidate first, when no other track took it yet
+        if not row_costs: continue
+        local_idx, cost = min(row_costs, key=lambda pair: pair[1])
+        row_potential[row] = cost # Keeps every reduced cost of the row >= 0, and 0 on its cheapest pair
+        if local_idx in row_of_col:
+            contested_rows.append(row)
+        else:
+            col_of_row[row] = local_idx; row_of_col[local_idx] = row
+
+    for row in contested_rows:
+        _augment(row, costs, unassigned_cost, row_potential, col_potential, col_of_row, row_of_col)
+
+    scores = [dict(candidates) for candidates in candidate_lists]
+    return [(col, scores[row][col]) if col is not None and col >= 0 else (None, 0)
+            for row, col in enumerate(col_of_row)]
+
+def _augment(start_row, costs, unassigned_cost, row_potential, col_potential, col_of_row, row_of_col):
+    # Dijkstra from start_row over alternating paths (candidate pair, then back along an assigned pair) to the
+    # nearest free column, then flips the path and updates the potentials so reduced costs stay >= 0
+    dist, pred_row, settled = {}, {}, []
+    settled_cols = set()
+    heap = []
+
+    def relax(row, base):
+        u = row_potential[row]
+        for col, cost in costs[row] + [(-1 - row, unassigned_cost)]:
+            if col in settled_cols: continue
+            d = base + cost - u - col_potential.get(col, 0.0)
+            if d < dist.get(col, float("inf")):
+                dist[col] = d; pred_row[col] = row
+                heapq.heappush(heap, (d, col))
+
+    relax(start_row, 0.0)
+    while True:
+        d, col = heapq.heappop(heap)
+        if col in settled_cols or d > dist[col]: continue
+        owner = row_of_col.get(col)
+        if owner is None: # Free column: shortest augmenting path found
+            break
+        settled_cols.add(col); settled.append(col)
+        relax(owner, d)
+
+    row_potential[start_row] += d
+    for settled_col in settled:
+        slack = d - dist[settled_col]
+        col_potential[settled_col] = col_potential.get(settled_col, 0.0) - slack
+        row_potential[row_of_col[settled_col]] += slack
+
+    while True: # Each row on the path takes the column it was reached through
+        row = pred_row[col]
+        previous_col = col_of_row[row]
+        col_of_row[row] = col; row_of_col[col] = row
+        if row == start_row: break
+        col = previous_col
@@ -0,0 +1,182 @@
+import logging
+import math
+from collections import Counter, defaultdict
+
+import numpy as np
+
+from spotify_sync_lib.config import APP_CONFIG, v_print
+from spotify_sync_lib.text_tools import generate_index_features, generate_feature_trigrams
+from core_logic.similarity import best_candidate, score_candidates
+
+# Features shared by more than this fraction of the library (e.g. "a:the", "t:love") carry almost no
+# signal and would make every query touch a large part of the index, so they are not counted when the
+# query has rarer features. They still break ties at the top-N cut.
+COMMON_FEATURE_RATIO = 0.01
+MIN_COMMON_FEATURE_POSTINGS = 200
+# A query word the library does not contain (usually a typo) is replaced by up to this many indexed words of
+# the same field whose character trigrams are at least TYPO_MIN_TRIGRAM_DICE similar to its own
+MAX_TYPO_EXPANSIONS = 3
+TYPO_MIN_TRIGRAM_DICE = 0.5
+
+class LocalTrackIndex:
+    # Inverted index over the normalized artist/title word tokens of the local library.
+    # A query returns the top-N local tracks with the highest IDF-weighted overlap of selective tokens, which
+    # keeps the fuzzy scoring work per Spotify track small and, unlike first-letter blocking, still finds
+    # "The Beatles" vs "Beatles" style matches. A character trigram index over the indexed words maps
+    # misspelt query words to the words they were probably meant to be.
+    def __init__(self, local_tracks_list, top_n=None):
+        self.tracks = local_tracks_list
+        if hasattr(local_tracks_list, "column"): # Lazily loaded session (PackedTrackList): the records are not built
+            self._build(local_tracks_list.column('norm_title'), local_tracks_list.column('norm_artist'), top_n)
+        else:
+            self._build([l_track['norm_title'] for l_track in local_tracks_list],
+                        [l_track['norm_artist'] for l_track in local_tracks_list], top_n)
+
+    @classmethod
+    def from_columns(cls, norm_titles, norm_artists, top_n=None):
+        # Index without the track dicts, e.g. rebuilt inside a worker process from the two string columns
+        index = cls.__new__(cls)
+        index.tracks = None
+        index._build(norm_titles, norm_artists, top_n)
+        return index
+
+    def _build(self, norm_titles, norm_artists, top_n):
+        self.norm_titles = norm_titles # Column arrays for batched scoring
+        self.norm_artists = norm_artists
+        self.top_n = top_n or APP_CONFIG.get("match_candidates_top_n", 50)
+        self.postings = defaultdict(list) # Only read with an `in` check first, so lookups never add keys
+        self.trigram_features = defaultdict(list) # Trigram -> indexed features (words) containing it
+        self._index_columns(0)
+
+    def _index_columns(self, first_idx):
+        # Adds postings for the column entries from first_idx on
+        postings = self.postings
+        for idx, (norm_title, norm_artist) in enumerate(zip(self.norm_titles[first_idx:], self.norm_artists[first_idx:]), first_idx):
+            for feature in generate_index_features(norm_artist, norm_title):
+                if feature not in postings:
+                    for trigram in generate_feature_trigrams(feature):
+                        self.trigram_features[trigram].append(feature)
+                postings[feature].append(idx)
+        self.common_feature_postings = max(MIN_COMMON_FEATURE_POSTINGS, int(len(self.norm_titles) * COMMON_FEATURE_RATIO))
+
+    def add_tracks(self, local_tracks):
+        # Appends tracks (e.g. a batch from a streaming scan) to the indexed list; they get the next indices
+        first_idx = len(self.norm_titles)
+        self.tracks.extend(local_tracks)
+        self.norm_titles.extend(l_track['norm_title'] for l_track in local_tracks)
+        self.norm_artists.extend(l_track['norm_artist'] for l_track in local_tracks)
+        self._index_columns(first_idx)
+
+    def similar_features(self, feature):
+        # Indexed words of the same field closest to an unindexed one, by shared character trigrams (Dice)
+        trigrams = generate_feature_trigrams(feature)
+        shared = Counter()
+        for trigram in trigrams:
+            if trigram in self.trigram_features:
+                shared.update(self.trigram_features[trigram])
+        close = [(count, other) for other, count in shared.items()
+                 if 2 * count >= TYPO_MIN_TRIGRAM_DICE * (len(trigrams) + len(other) - 2)] # len(other) - 2: trigrams of its word, about
+        close.sort(key=lambda pair: (-pair[0], pair[1]))
+        return [other for _, other in close[:MAX_TYPO_EXPANSIONS]]
+
+    def query_features(self, norm_artist, norm_title):
+        # Indexed features of a query, misspelt words replaced by their closest indexed words. Sorted so ties
+        # at the top-N cut are broken the same way in every process (set order depends on the hash seed).
+        features = {}
+        for feature in sorted(generate_index_features(norm_artist, norm_title)):
+            for indexed in ((feature,) if feature in self.postings else self.similar_features(feature)):
+                features[indexed] = self.postings[indexed]
+        return features
+
+    def candidate_indices(self, norm_artist, norm_title, top_n=None):
+        top_n = top_n or self.top_n
+        features = self.query_features(norm_artist, norm_title)
+        if not features:
+            return []
+        counted = [f for f, posting_list in features.items() if len(posting_list) <= self.common_feature_postings]
+        if not counted: # Only very common tokens: fall back to the two rarest ones
+            counted = sorted(features, key=lambda f: len(features[f]))[:2]
+        overlap_weights = Counter()
+        num_tracks = len(self.norm_titles)
+        for feature in counted:
+            posting_list = features[feature]
+            # IDF weight in whole steps: 1, plus 1 per tenfold rarer than the whole library (counting runs in C)
+            for _ in range(1 + int(math.log10(num_tracks / len(posting_list)))):
+                overlap_weights.update(posting_list)
+        top = overlap_weights.most_common(top_n)
+        if len(overlap_weights) <= top_n:
+            return [idx for idx, _ in top]
+        # Tracks tied with the N-th one compete for the remaining places on the uncounted (common) features
+        # they share with the query, e.g. "the beatles" among 60 covers of "yesterday"
+        cut_weight = top[-1][1]
+        chosen = [idx for idx, weight in top if weight > cut_weight]
+        tied = [idx for idx, weight in overlap_weights.items() if weight == cut_weight]
+        tie_breakers = [features[f] for f in features if f not in counted]
+        if tie_breakers and len(tied) > top_n - len(chosen):
+            tied_set, tie_hits = set(tied), Counter()
+            for posting_list in tie_breakers:
+                tie_hits.update(tied_set.intersection(posting_list))
+            tied.sort(key=tie_hits.__getitem__, reverse=True) # Stable: equal hits keep their order
+        return chosen + tied[:top_n - len(chosen)]
+
+    def candidates(self, norm_artist, norm_title, top_n=None):
+        return [self.tracks[idx] for idx in self.candidate_indices(norm_artist, norm_title, top_n)]
+
+    def best_match(self, norm_artist, norm_title, score_cutoff=0):
+        # (local track index or None, score) of the best weighted title/artist match among the candidates,
+        # scored in one batched call
+        candidate_indices = self.candidate_indices(norm_artist, norm_title)
+        position, score = best_candidate(norm_title, norm_artist,
+                                         [self.norm_titles[i] for i in candidate_indices],
+                                         [self.norm_artists[i] for i in candidate_indices],
+                                         score_cutoff)
+        return (candidate_indices[position], score) if position is not None else (None, 0)
+
+    def scored_candidates(self, norm_artist, norm_title, score_cutoff=0, limit=None):
+        # [(local track index, score), ...] of the candidates reaching score_cutoff, best first (candidate
+        # order on ties), at most limit of them. Input for the one-to-one assignment.
+        candidate_indices = self.candidate_indices(norm_artist, norm_title)
+        if not candidate_indices:
+            return []
+        scores = score_candidates(norm_title, norm_artist,
+                                  [self.norm_titles[i] for i in candidate_indices],
+                                  [self.norm_artists[i] for i in candidate_indices],
+                                  score_cutoff)
+        positions = [int(p) for p in np.argsort(-scores, kind="stable") if scores[p] > 0][:limit]
+        return [(candidate_indices[p], float(scores[p])) for p in positions]
+
+
+_local_index_cache = {"tracks": None, "length": 0, "top_n": None, "index": None}
+
+def build_local_track_index(local_tracks_list, verbose_flag=False):
+    # The index of the last library is kept, so the comparison and playlist cleaning of one run share it.
+    # It is reused while the same, unmodified list of local tracks is passed.
+    top_n = APP_CONFIG.get("match_candidates_top_n", 50)
+    cached = _local_index_cache
+    if cached["tracks"] is local_tracks_list and cached["length"] == len(local_tracks_list) and cached["top_n"] == top_n:
+        v_print(f"Reusing the token index of {len(local_tracks_list)} local tracks.", verbose_flag)
+        return cached["index"]
+    v_print("Building inverted token index over local tracks for candidate selection...", verbose_flag)
+    index = LocalTrackIndex(local_tracks_list, top_n)
+    msg = f"Indexed {len(local_tracks_list)} local tracks under {len(index.postings)} tokens (top {index.top_n} candidates per query)."
+    v_print(msg, verbose_flag); logging.info(msg)
+    cached.update(tracks=local_tracks_list, length=len(local_tracks_list), top_n=top_n, index=index)
+    return index
+
+def index_local_track_batches(batches, verbose_flag=False):
+    # Collects batches of local tracks (e.g. from iter_local_tracks) into one list while indexing them, so the
+    # index is ready when the scan ends. Returns the list; build_local_track_index then reuses its index.
+    # A scan that reused every directory passes the session's list on whole as its only batch; that list is
+    # returned and indexed as it is, so a lazily loaded one stays undecoded.
+    top_n = APP_CONFIG.get("match_candidates_top_n", 50)
+    local_tracks_list = []
+    index = LocalTrackIndex(local_tracks_list, top_n)
+    for batch in batches:
+        if not local_tracks_list and not isinstance(batch, list):
+            local_tracks_list, index = batch, LocalTrackIndex(batch, top_n)
+        else:
+            index.add_tracks(batch)
+    msg = f"Indexed {len(local_tracks_list)} local tracks under {len(index.postings)} tokens while scanning (top {index.top_n} candidates per query)."
+    v_print(msg, verbose_flag); logging.info(msg)
+    _local_index_cache.update(tracks=local_tracks_list, length=len(local_tracks_list), top_n=top_n, index=index)
+    return local_tracks_list
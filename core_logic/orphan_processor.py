@@ -1,23 +1,117 @@
 import logging
-import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from itertools import islice
 from rich.panel import Panel
 from rich.table import Table
 from rich.prompt import Confirm, Prompt
 import rich.box
 
-from spotify_sync_lib.config import console, v_print
+from spotify_sync_lib.config import console, APP_CONFIG, v_print
+from spotify_sync_lib.search_cache import lookup_search_cache, store_search_cache
 from services.spotify_api import (
     spotify_api_call_with_retry, 
     select_existing_playlist, 
     create_new_playlist,
     add_tracks_to_target_playlist,
-    get_all_track_ids_in_playlist
+    get_all_track_ids_in_playlist,
+    get_current_spotify_user,
+    TrackWriteQueue, SAVED_TRACKS_ADD_BATCH_SIZE, PLAYLIST_ADD_BATCH_SIZE
 )
 
 
+def _orphan_search_query(l_track):
+    return f"artist:{l_track['norm_artist']} track:{l_track['norm_title']}"
+
+def _orphan_search_hits(items):
+    spotify_hits = []
+    for item in items or []:
+        spotify_hits.append({
+            'title': item['name'], 
+            'artist': ", ".join([a['name'] for a in item['artists']]),
+            'album': item['album']['name'], 
+            'url': item['external_urls']['spotify'], 
+            'id': item['id']
+        })
+    return spotify_hits
+
+def search_spotify_for_orphan(sp_actions, l_track, verbose_flag, search_cache=None):
+    # Returns (spotify_hits, from_cache): up to 5 hits as display dicts. Raises if the search fails after
+    # retries; failures are not cached, empty results are.
+    query = _orphan_search_query(l_track)
+    if search_cache is not None:
+        cached, spotify_hits = lookup_search_cache(search_cache, query)
+        if cached: return spotify_hits, True
+    results = spotify_api_call_with_retry(lambda: sp_actions.search(q=query, type="track", limit=5), verbose_flag)
+    spotify_hits = _orphan_search_hits(results['tracks']['items'] if results and results['tracks'] else None)
+    if search_cache is not None: store_search_cache(search_cache, query, spotify_hits)
+    return spotify_hits, False
+
+async def search_spotify_for_orphan_async(async_client, l_track, search_cache=None):
+    # search_spotify_for_orphan on the asyncio client (same query, hits and cache entries)
+    query = _orphan_search_query(l_track)
+    if search_cache is not None:
+        cached, spotify_hits = lookup_search_cache(search_cache, query)
+        if cached: return spotify_hits, True
+    spotify_hits = _orphan_search_hits(await async_client.search_tracks(query, limit=5))
+    if search_cache is not None: store_search_cache(search_cache, query, spotify_hits)
+    return spotify_hits, False
+
+def prefetch_orphan_searches(sp_actions, local_orphan_tracks, verbose_flag, search_cache=None, search_stats=None, async_client=None):
+    # Yields (l_track, spotify_hits, error) in orphan order. Searches run on orphan_search_workers threads and
+    # stay up to orphan_search_lookahead orphans ahead of the consumer, so prompts rarely wait on the network;
+    # the shared rate limiter paces the actual requests. Closing the generator drops the queued searches.
+    # search_stats, if given, counts answers served from search_cache ("cached") and sent to Spotify ("searched").
+    # async_client: an AsyncSpotifyClient whose event loop runs the searches instead of the worker threads, so
+    # the whole lookahead can be in flight at once.
+    lookahead = max(1, APP_CONFIG.get("orphan_search_lookahead", 64))
+    max_workers = max(1, min(APP_CONFIG.get("orphan_search_workers", 8), lookahead))
+    executor = ThreadPoolExecutor(max_workers=max_workers) if async_client is None else None
+    orphans = iter(local_orphan_tracks)
+    pending = deque()
+    def submit(l_track):
+        if async_client is not None:
+            future = async_client.submit(search_spotify_for_orphan_async(async_client, l_track, search_cache))
+        else:
+            future = executor.submit(search_spotify_for_orphan, sp_actions, l_track, verbose_flag, search_cache)
+        pending.append((l_track, future))
+    try:
+        for l_track in islice(orphans, lookahead): submit(l_track)
+        while pending:
+            l_track, future = pending.popleft()
+            next_track = next(orphans, None)
+            if next_track is not None: submit(next_track)
+            try:
+                spotify_hits, from_cache = future.result()
+            except Exception as e:
+                yield l_track, [], e
+                continue
+            if search_stats is not None:
+                stat_key = "cached" if from_cache else "searched"
+                search_stats[stat_key] = search_stats.get(stat_key, 0) + 1
+            yield l_track, spotify_hits, None
+    finally:
+        for _, future in pending: future.cancel()
+        if executor is not None: executor.shutdown(wait=False, cancel_futures=True)
+
+
+def get_orphan_playlist_track_ids(sp_actions, playlist_id, verbose_flag, async_client=None):
+    if async_client is None: return get_all_track_ids_in_playlist(sp_actions, playlist_id, verbose_flag)
+    try:
+        items = async_client.submit(async_client.playlist_items(playlist_id, fields="items(track(id))")).result()
+    except Exception as e:
+        msg = f"Error fetching all items from playlist {playlist_id}: {e}"
+        console.print(f"[red]{msg}[/red]"); logging.error(msg, exc_info=True)
+        return set()
+    return {item['track']['id'] for item in items if item.get('track') and item['track'].get('id')}
+
+
 def process_local_orphans(sp_actions, local_orphan_tracks, progress, task_id, 
                            dry_run_flag, process_orphans_action, 
-                           default_orphan_playlist_name, verbose_flag):
+                           default_orphan_playlist_name, verbose_flag, search_cache=None, search_stats=None, async_client=None):
+    # async_client: optional AsyncSpotifyClient on the caller's event loop (this function runs in a worker
+    # thread); searches, the target playlist read and the batched adds then go through it.
     if not local_orphan_tracks:
         console.print("[cyan]No local orphan tracks to search on Spotify.[/cyan]")
         logging.info("No local orphan tracks provided for Spotify search.")
@@ -29,9 +123,25 @@ def process_local_orphans(sp_actions, local_orphan_tracks, progress, task_id,
     logging.info(f"Starting processing for {num_orphans} local orphan tracks. Action: {process_orphans_action}. Dry run: {dry_run_flag}")
     progress.update(task_id, total=num_orphans, description="[blue]Processing local orphans...")
 
-    added_to_liked_count = 0
+    added_to_liked_count = 0 # Dry-run counts; real adds are counted by the write queues
     added_to_playlist_count = 0
+    # Confirmed adds are queued and sent in API-maximum batches instead of one call per track
+    if async_client is not None:
+        add_to_liked = lambda ids: async_client.submit(async_client.add_to_saved_tracks(ids)).result()
+    else:
+        add_to_liked = lambda ids: spotify_api_call_with_retry(lambda: sp_actions.current_user_saved_tracks_add(tracks=ids), verbose_flag)
+    liked_queue = TrackWriteQueue(add_to_liked, SAVED_TRACKS_ADD_BATCH_SIZE, "Liked Songs", verbose_flag)
+    playlist_queue = None # Created once the target playlist is known
     
+    def finish_orphan_writes():
+        # Sends everything still queued and returns the final (liked, playlist) counts
+        liked_added, liked_failed = liked_queue.flush()
+        playlist_added, playlist_failed = playlist_queue.flush() if playlist_queue else (0, 0)
+        if liked_failed or playlist_failed:
+            msg = f"{liked_failed + playlist_failed} confirmed orphan track(s) could not be added (see errors above and the log)."
+            console.print(f"[red]{msg}[/red]"); logging.error(msg)
+        return added_to_liked_count + liked_added, added_to_playlist_count + playlist_added
+
     target_orphan_playlist_id = None
     target_orphan_playlist_name = default_orphan_playlist_name 
     ids_in_target_orphan_playlist_set = set() 
@@ -45,125 +155,123 @@ def process_local_orphans(sp_actions, local_orphan_tracks, progress, task_id,
         # Get user_id once if needed for new playlist creation.
         # sp_actions must have user-library-read or similar for current_user()
         try:
-            current_user_for_orphan = spotify_api_call_with_retry(lambda: sp_actions.current_user(), verbose_flag)
+            current_user_for_orphan = get_current_spotify_user(sp_actions, verbose_flag)
             if current_user_for_orphan: user_id_for_orphan_playlist = current_user_for_orphan['id']
         except Exception as e:
             logging.warning(f"Could not get current user for orphan playlist creation: {e}. Will prompt if new playlist needed.")
 
 
-    for i, l_track in enumerate(local_orphan_tracks):
-        progress.update(task_id, advance=1)
-        v_print(f"Processing orphan: {l_track['original_artist']} - {l_track['original_title']}", verbose_flag)
-        query = f"artist:{l_track['norm_artist']} track:{l_track['norm_title']}"
-        spotify_hits = []
-        try:
-            results = spotify_api_call_with_retry(lambda: sp_actions.search(q=query, type="track", limit=5), verbose_flag)
-            if results and results['tracks'] and results['tracks']['items']:
-                for item in results['tracks']['items']:
-                    spotify_hits.append({
-                        'title': item['name'], 
-                        'artist': ", ".join([a['name'] for a in item['artists']]),
-                        'album': item['album']['name'], 
-                        'url': item['external_urls']['spotify'], 
-                        'id': item['id']
-                    })
-        except Exception as e:
-            msg = f"Error searching Spotify for orphan '{l_track['original_title']}': {e}"
-            console.print(f"[red]{msg}[/red]"); logging.error(msg, exc_info=True)
-            continue 
-
-        if not spotify_hits:
-            v_print(f"No Spotify matches found for local orphan: '{l_track['original_title']}'", verbose_flag)
-            logging.info(f"No Spotify matches for orphan: {l_track['original_title']}")
-            continue
-
-        console.print(f"\n[bold]Local orphan {i+1}/{num_orphans}:[/bold] [green]{l_track['original_artist']} - {l_track['original_title']}[/green]")
-        results_table = Table(title="Potential Spotify Matches", box=rich.box.MINIMAL_HEAVY_HEAD, show_lines=True)
-        results_table.add_column("#", width=3); results_table.add_column("Artist"); results_table.add_column("Title"); results_table.add_column("Album"); results_table.add_column("ID", style="dim")
-        for idx, hit in enumerate(spotify_hits):
-            results_table.add_row(str(idx + 1), hit['artist'], hit['title'], hit['album'], hit['id'])
-        console.print(results_table)
-
-        if process_orphans_action != 'display':
-            while True: # Loop for user input for this specific orphan
-                try:
-                    prompt_action_text = process_orphans_action.replace('-', ' ')
-                    choice_str = Prompt.ask(f"Select match to '{prompt_action_text}' (1-{len(spotify_hits)}, 0 to skip, 'c' to cancel all orphan processing)", default="0")
-                    if choice_str.lower() == 'c':
-                        console.print("[yellow]Orphan processing cancelled by user.[/yellow]"); logging.info("Orphan processing cancelled by user.")
-                        progress.update(task_id, description="[yellow]Orphan processing cancelled")
-                        return added_to_liked_count, added_to_playlist_count 
-
-                    if choice_str == '0': # Skip this orphan
-                        logging.info(f"User skipped action for orphan '{l_track['original_title']}'.")
-                        break # Process next orphan
-
-                    choice_idx = int(choice_str) - 1
-                    if 0 <= choice_idx < len(spotify_hits):
-                        selected_spotify_track = spotify_hits[choice_idx]
-                        logging.info(f"User selected Spotify track '{selected_spotify_track['title']}' (ID: {selected_spotify_track['id']}) for orphan '{l_track['original_title']}'. Action: {process_orphans_action}")
-                        
-                        if dry_run_flag:
-                            console.print(f"  [DRY RUN] Would perform '{process_orphans_action}' for Spotify track ID {selected_spotify_track['id']}")
-                            logging.info(f"[DRY RUN] Action '{process_orphans_action}' for Spotify track ID {selected_spotify_track['id']}")
-                            if process_orphans_action == 'add-to-liked': added_to_liked_count +=1
-                            elif process_orphans_action == 'add-to-playlist': added_to_playlist_count +=1
+    search_runner = "asyncio client" if async_client is not None else f"{APP_CONFIG.get('orphan_search_workers', 8)} workers"
+    v_print(f"Searching Spotify for orphans ({search_runner}, {APP_CONFIG.get('orphan_search_lookahead', 64)} ahead)...", verbose_flag)
+    orphan_searches = prefetch_orphan_searches(sp_actions, local_orphan_tracks, verbose_flag, search_cache, search_stats, async_client)
+    cancelled = False
+    try:
+        for i, (l_track, spotify_hits, search_error) in enumerate(orphan_searches):
+            progress.update(task_id, advance=1)
+            liked_queue.flush_if_due()
+            if playlist_queue: playlist_queue.flush_if_due()
+            v_print(f"Processing orphan: {l_track['original_artist']} - {l_track['original_title']}", verbose_flag)
+            if search_error is not None:
+                msg = f"Error searching Spotify for orphan '{l_track['original_title']}': {search_error}"
+                console.print(f"[red]{msg}[/red]"); logging.error(msg, exc_info=search_error)
+                continue 
+
+            if not spotify_hits:
+                v_print(f"No Spotify matches found for local orphan: '{l_track['original_title']}'", verbose_flag)
+                logging.info(f"No Spotify matches for orphan: {l_track['original_title']}")
+                continue
+
+            console.print(f"\n[bold]Local orphan {i+1}/{num_orphans}:[/bold] [green]{l_track['original_artist']} - {l_track['original_title']}[/green]")
+            results_table = Table(title="Potential Spotify Matches", box=rich.box.MINIMAL_HEAVY_HEAD, show_lines=True)
+            results_table.add_column("#", width=3); results_table.add_column("Artist"); results_table.add_column("Title"); results_table.add_column("Album"); results_table.add_column("ID", style="dim")
+            for idx, hit in enumerate(spotify_hits):
+                results_table.add_row(str(idx + 1), hit['artist'], hit['title'], hit['album'], hit['id'])
+            console.print(results_table)
+
+            if process_orphans_action != 'display':
+                while True: # Loop for user input for this specific orphan
+                    try:
+                        prompt_action_text = process_orphans_action.replace('-', ' ')
+                        choice_str = Prompt.ask(f"Select match to '{prompt_action_text}' (1-{len(spotify_hits)}, 0 to skip, 'c' to cancel all orphan processing)", default="0")
+                        if choice_str.lower() == 'c':
+                            console.print("[yellow]Orphan processing cancelled by user.[/yellow]"); logging.info("Orphan processing cancelled by user.")
+                            progress.update(task_id, description="[yellow]Orphan processing cancelled")
+                            cancelled = True # Tracks already confirmed are still added
+                            break
+
+                        if choice_str == '0': # Skip this orphan
+                            logging.info(f"User skipped action for orphan '{l_track['original_title']}'.")
                             break # Process next orphan
 
-                        # Perform actual action (if not dry_run)
-                        if process_orphans_action == 'add-to-liked':
-                            if Confirm.ask(f"Add '{selected_spotify_track['title']}' to Liked Songs?", default=True):
-                                try: 
-                                    spotify_api_call_with_retry(lambda: sp_actions.current_user_saved_tracks_add(tracks=[selected_spotify_track['id']]), verbose_flag)
-                                    console.print(f"  [green]Added '{selected_spotify_track['title']}' to Liked Songs.[/green]"); logging.info(f"Added '{selected_spotify_track['title']}' to Liked Songs."); added_to_liked_count += 1
-                                except Exception as e: msg = f"Error adding to Liked Songs: {e}"; console.print(f"  [red]{msg}[/red]"); logging.error(msg, exc_info=True)
+                        choice_idx = int(choice_str) - 1
+                        if 0 <= choice_idx < len(spotify_hits):
+                            selected_spotify_track = spotify_hits[choice_idx]
+                            logging.info(f"User selected Spotify track '{selected_spotify_track['title']}' (ID: {selected_spotify_track['id']}) for orphan '{l_track['original_title']}'. Action: {process_orphans_action}")
+                        
+                            if dry_run_flag:
+                                console.print(f"  [DRY RUN] Would perform '{process_orphans_action}' for Spotify track ID {selected_spotify_track['id']}")
+                                logging.info(f"[DRY RUN] Action '{process_orphans_action}' for Spotify track ID {selected_spotify_track['id']}")
+                                if process_orphans_action == 'add-to-liked': added_to_liked_count +=1
+                                elif process_orphans_action == 'add-to-playlist': added_to_playlist_count +=1
+                                break # Process next orphan
+
+                            # Perform actual action (if not dry_run)
+                            if process_orphans_action == 'add-to-liked':
+                                if Confirm.ask(f"Add '{selected_spotify_track['title']}' to Liked Songs?", default=True):
+                                    liked_queue.add(selected_spotify_track['id'], selected_spotify_track['title'])
+                                    v_print(f"Queued '{selected_spotify_track['title']}' for Liked Songs.", verbose_flag)
                         
-                        elif process_orphans_action == 'add-to-playlist':
-                            # Determine target playlist if not already set for this session
-                            if not target_orphan_playlist_id: 
-                                if Confirm.ask(f"Add orphans to a new playlist (default name: '{default_orphan_playlist_name}') or an existing one?", choices=["new", "existing"], default="new") == "existing":
-                                    selected_pl_for_orphan = select_existing_playlist(sp_actions, verbose_flag) 
-                                    if selected_pl_for_orphan: 
-                                        target_orphan_playlist_id = selected_pl_for_orphan['id']
-                                        target_orphan_playlist_name = selected_pl_for_orphan['name']
-                                        # Fetch existing tracks from this chosen playlist
-                                        ids_in_target_orphan_playlist_set = get_all_track_ids_in_playlist(sp_actions, target_orphan_playlist_id, verbose_flag)
-                                    else: 
-                                        console.print("[yellow]No existing playlist chosen for orphans. Action skipped for this track.[/yellow]"); logging.info("Orphan add-to-playlist skipped: no existing playlist chosen for this session."); break # Break from inner while, go to next orphan
-                                else: # Create new
-                                    if not user_id_for_orphan_playlist: # Get user_id if not already fetched
-                                        current_user_for_orphan = spotify_api_call_with_retry(lambda: sp_actions.current_user(), verbose_flag)
-                                        if current_user_for_orphan: user_id_for_orphan_playlist = current_user_for_orphan['id']
-                                        else: console.print("[red]Cannot create new playlist: failed to get user info. Action skipped.[/red]"); logging.error("Orphan playlist create failed: no user info for new playlist."); break
+                            elif process_orphans_action == 'add-to-playlist':
+                                # Determine target playlist if not already set for this session
+                                if not target_orphan_playlist_id: 
+                                    if Confirm.ask(f"Add orphans to a new playlist (default name: '{default_orphan_playlist_name}') or an existing one?", choices=["new", "existing"], default="new") == "existing":
+                                        selected_pl_for_orphan = select_existing_playlist(sp_actions, verbose_flag) 
+                                        if selected_pl_for_orphan: 
+                                            target_orphan_playlist_id = selected_pl_for_orphan['id']
+                                            target_orphan_playlist_name = selected_pl_for_orphan['name']
+                                            # Fetch existing tracks from this chosen playlist
+                                            ids_in_target_orphan_playlist_set = get_orphan_playlist_track_ids(sp_actions, target_orphan_playlist_id, verbose_flag, async_client)
+                                        else: 
+                                            console.print("[yellow]No existing playlist chosen for orphans. Action skipped for this track.[/yellow]"); logging.info("Orphan add-to-playlist skipped: no existing playlist chosen for this session."); break # Break from inner while, go to next orphan
+                                    else: # Create new
+                                        if not user_id_for_orphan_playlist: # Get user_id if not already fetched
+                                            current_user_for_orphan = get_current_spotify_user(sp_actions, verbose_flag)
+                                            if current_user_for_orphan: user_id_for_orphan_playlist = current_user_for_orphan['id']
+                                            else: console.print("[red]Cannot create new playlist: failed to get user info. Action skipped.[/red]"); logging.error("Orphan playlist create failed: no user info for new playlist."); break
                                     
-                                    pl_id, _ = create_new_playlist(sp_actions, user_id_for_orphan_playlist, default_orphan_playlist_name, f"Local orphan tracks found on Spotify {datetime.now():%Y-%m-%d}", dry_run_flag, verbose_flag)
-                                    if pl_id: 
-                                        target_orphan_playlist_id = pl_id
-                                        target_orphan_playlist_name = default_orphan_playlist_name # Use the actual name used
-                                        ids_in_target_orphan_playlist_set = set() # New playlist is empty
-                                    else: 
-                                        console.print("[red]Failed to create new playlist for orphans. Action skipped for this track.[/red]"); logging.error("Failed to create new orphan playlist."); break
+                                        pl_id, _ = create_new_playlist(sp_actions, user_id_for_orphan_playlist, default_orphan_playlist_name, f"Local orphan tracks found on Spotify {datetime.now():%Y-%m-%d}", dry_run_flag, verbose_flag)
+                                        if pl_id: 
+                                            target_orphan_playlist_id = pl_id
+                                            target_orphan_playlist_name = default_orphan_playlist_name # Use the actual name used
+                                            ids_in_target_orphan_playlist_set = set() # New playlist is empty
+                                        else: 
+                                            console.print("[red]Failed to create new playlist for orphans. Action skipped for this track.[/red]"); logging.error("Failed to create new orphan playlist."); break
                             
-                            # Now, add to the target_orphan_playlist_id
-                            if target_orphan_playlist_id:
-                                if selected_spotify_track['id'] in ids_in_target_orphan_playlist_set:
-                                    console.print(f"  [yellow]Track '{selected_spotify_track['title']}' is already in playlist '{target_orphan_playlist_name}'. Skipping.[/yellow]")
-                                    logging.info(f"Skipped adding duplicate '{selected_spotify_track['title']}' to orphan playlist '{target_orphan_playlist_name}'.")
-                                elif Confirm.ask(f"Add '{selected_spotify_track['title']}' to playlist '{target_orphan_playlist_name}'?", default=True):
-                                    try: 
-                                        # Using playlist_add_items for a single track is fine
-                                        spotify_api_call_with_retry(lambda: sp_actions.playlist_add_items(target_orphan_playlist_id, [selected_spotify_track['id']]), verbose_flag)
-                                        console.print(f"  [green]Added '{selected_spotify_track['title']}' to playlist '{target_orphan_playlist_name}'.[/green]"); logging.info(f"Added '{selected_spotify_track['title']}' to playlist '{target_orphan_playlist_name}'."); added_to_playlist_count += 1
-                                        if not dry_run_flag: ids_in_target_orphan_playlist_set.add(selected_spotify_track['id']) # Update local set
-                                    except Exception as e: msg = f"Error adding to playlist '{target_orphan_playlist_name}': {e}"; console.print(f"  [red]{msg}[/red]"); logging.error(msg, exc_info=True)
-                        break # Choice made for this orphan, process next orphan
-                    else:
-                        console.print(f"[yellow]Invalid selection. Please choose a number between 1 and {len(spotify_hits)}, 0 to skip, or 'c' to cancel all.[/yellow]")
-                except ValueError:
-                    console.print("[yellow]Invalid input. Please enter a number, 0, or 'c'.[/yellow]")
-        
-        if i < num_orphans - 1 and not dry_run_flag and process_orphans_action != 'display':
-            time.sleep(0.5) # Brief pause between processing orphans if actions are taken
+                                # Now, add to the target_orphan_playlist_id
+                                if target_orphan_playlist_id:
+                                    if playlist_queue is None:
+                                        if async_client is not None:
+                                            add_to_playlist = lambda ids: async_client.submit(async_client.add_to_playlist(target_orphan_playlist_id, ids)).result()
+                                        else:
+                                            add_to_playlist = lambda ids: spotify_api_call_with_retry(lambda: sp_actions.playlist_add_items(target_orphan_playlist_id, ids), verbose_flag)
+                                        playlist_queue = TrackWriteQueue(add_to_playlist, PLAYLIST_ADD_BATCH_SIZE, f"playlist '{target_orphan_playlist_name}'", verbose_flag)
+                                    if selected_spotify_track['id'] in ids_in_target_orphan_playlist_set:
+                                        console.print(f"  [yellow]Track '{selected_spotify_track['title']}' is already in playlist '{target_orphan_playlist_name}'. Skipping.[/yellow]")
+                                        logging.info(f"Skipped adding duplicate '{selected_spotify_track['title']}' to orphan playlist '{target_orphan_playlist_name}'.")
+                                    elif Confirm.ask(f"Add '{selected_spotify_track['title']}' to playlist '{target_orphan_playlist_name}'?", default=True):
+                                        playlist_queue.add(selected_spotify_track['id'], selected_spotify_track['title'])
+                                        ids_in_target_orphan_playlist_set.add(selected_spotify_track['id']) # Queued counts as present
+                                        v_print(f"Queued '{selected_spotify_track['title']}' for playlist '{target_orphan_playlist_name}'.", verbose_flag)
+                            break # Choice made for this orphan, process next orphan
+                        else:
+                            console.print(f"[yellow]Invalid selection. Please choose a number between 1 and {len(spotify_hits)}, 0 to skip, or 'c' to cancel all.[/yellow]")
+                    except ValueError:
+                        console.print("[yellow]Invalid input. Please enter a number, 0, or 'c'.[/yellow]")
+            if cancelled: break
+    finally: # Runs on every exit, so confirmed tracks are still added after an error or EOF at a prompt
+        orphan_searches.close() # Drops any searches queued ahead
+        added_to_liked_count, added_to_playlist_count = finish_orphan_writes()
+    if cancelled: return added_to_liked_count, added_to_playlist_count
 
     progress.update(task_id, description="[green]Orphan processing complete")
     logging.info(f"Finished processing local orphans. Added to Liked: {added_to_liked_count}, Added to Playlist: {added_to_playlist_count}")
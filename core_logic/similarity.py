@@ -0,0 +1,54 @@
+import numpy as np
+from rapidfuzz import fuzz as rf_fuzz, process as rf_process
+
+# Batched version of the comparator's weighted score:
+#     score = fuzz.ratio(title_a, title_b) * 0.7 + fuzz.ratio(artist_a, artist_b) * 0.3
+# rapidfuzz's ratio is the same Indel similarity fuzzywuzzy (with python-Levenshtein) uses; fuzzywuzzy
+# rounds it to an int (round-half-even), so results are rounded with np.rint to give identical scores.
+TITLE_WEIGHT = 0.7
+ARTIST_WEIGHT = 0.3
+
+def _rounded_ratio_matrix(queries, choices, score_cutoff, workers=1):
+    # Raw ratios below score_cutoff - 0.5 can never round up to the cutoff, so rapidfuzz may skip them (-> 0)
+    raw_cutoff = max(0.0, score_cutoff - 0.5) if score_cutoff else 0
+    matrix = rf_process.cdist(queries, choices, scorer=rf_fuzz.ratio, dtype=np.float64,
+                              score_cutoff=raw_cutoff or None, workers=workers)
+    return np.rint(matrix, out=matrix)
+
+def score_block(query_titles, query_artists, cand_titles, cand_artists, score_cutoff=0, workers=1):
+    # Weighted score matrix of shape (len(queries), len(candidates)). Entries below score_cutoff are 0.
+    # The title term alone must reach score_cutoff - 30 (artist can add at most 30), so hopeless pairs
+    # are cut inside rapidfuzz and the artist pass only runs for columns with a surviving title.
+    num_queries, num_cands = len(query_titles), len(cand_titles)
+    if not num_queries or not num_cands:
+        return np.zeros((num_queries, num_cands), dtype=np.float64)
+    title_cutoff = max(0.0, (score_cutoff - ARTIST_WEIGHT * 100) / TITLE_WEIGHT) if score_cutoff else 0
+    scores = _rounded_ratio_matrix(query_titles, cand_titles, title_cutoff, workers) * TITLE_WEIGHT
+    if title_cutoff:
+        live_cols = np.flatnonzero(scores.any(axis=0))
+        if live_cols.size == 0:
+            return scores
+        artist_scores = np.zeros_like(scores)
+        artist_scores[:, live_cols] = _rounded_ratio_matrix(query_artists, [cand_artists[i] for i in live_cols], 0, workers)
+        scores[scores == 0] = -np.inf # Title cut-off means the pair is out, whatever the artist score
+        scores += artist_scores * ARTIST_WEIGHT
+    else:
+        scores += _rounded_ratio_matrix(query_artists, cand_artists, 0, workers) * ARTIST_WEIGHT
+    if score_cutoff:
+        scores[scores < score_cutoff] = 0
+    return scores
+
+def score_candidates(norm_title, norm_artist, cand_titles, cand_artists, score_cutoff=0):
+    # One Spotify track against a candidate array. Returns a 1-D array of weighted scores.
+    return score_block([norm_title], [norm_artist], cand_titles, cand_artists, score_cutoff)[0]
+
+def best_candidate(norm_title, norm_artist, cand_titles, cand_artists, score_cutoff=0):
+    # Returns (position, score) of the best candidate, first one on ties (same as the pairwise loop),
+    # or (None, 0) when no candidate reaches score_cutoff.
+    if not cand_titles:
+        return None, 0
+    scores = score_candidates(norm_title, norm_artist, cand_titles, cand_artists, score_cutoff)
+    position = int(np.argmax(scores))
+    if scores[position] <= 0:
+        return None, 0
+    return position, float(scores[position])
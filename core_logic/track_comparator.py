@@ -1,18 +1,141 @@
 import logging
-from collections import defaultdict
-from fuzzywuzzy import fuzz
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
 from rich.panel import Panel
 from rich.table import Table
 from rich.prompt import Prompt
 from rich.text import Text
 import rich.box
 
-from spotify_sync_lib.config import console, v_print
-from spotify_sync_lib.text_tools import extract_version_keywords, generate_block_key
+from spotify_sync_lib.config import console, v_print, APP_CONFIG
+from spotify_sync_lib.text_tools import record_version_keywords
+from core_logic.match_index import build_local_track_index, LocalTrackIndex
+from core_logic.assignment import assign_one_to_one
+
+# --- PARALLEL MATCHING ---
+_worker_local_index = None # Built once per worker process by init_compare_worker
+
+def match_shard(local_index, shard, score_cutoff, max_candidates=None):
+    # shard: list of (norm_title, norm_artist). Returns [(local_track_index or None, score), ...] in shard order,
+    # or with max_candidates, each track's list of up to that many (local_track_index, score) pairs, best first.
+    if max_candidates:
+        return [local_index.scored_candidates(norm_artist, norm_title, score_cutoff, max_candidates) for norm_title, norm_artist in shard]
+    return [local_index.best_match(norm_artist, norm_title, score_cutoff) for norm_title, norm_artist in shard]
+
+def init_compare_worker(norm_titles, norm_artists, top_n):
+    # Runs once per worker: the local library columns are transferred once, not with every shard
+    global _worker_local_index
+    _worker_local_index = LocalTrackIndex.from_columns(norm_titles, norm_artists, top_n)
+
+def match_shard_in_worker(shard, score_cutoff, max_candidates=None):
+    return match_shard(_worker_local_index, shard, score_cutoff, max_candidates)
+
+def resolve_compare_workers():
+    configured = APP_CONFIG.get("compare_workers", 1)
+    if configured and configured > 0:
+        return configured
+    return min(os.cpu_count() or 1, 61) # ProcessPoolExecutor caps max_workers at 61 on Windows
+
+def start_compare_pool(local_index, num_workers):
+    return ProcessPoolExecutor(max_workers=num_workers, initializer=init_compare_worker,
+                               initargs=(local_index.norm_titles, local_index.norm_artists, local_index.top_n))
+
+def shard_queries(spotify_tracks):
+    return [(s_track['norm_title'], s_track['norm_artist']) for s_track in spotify_tracks]
+
+def match_spotify_tracks(local_index, spotify_tracks, score_cutoff, progress, task_id, verbose_flag, max_candidates=None):
+    # Best local match for every Spotify track (candidate lists with max_candidates, see match_shard),
+    # sharded across a process pool when compare_workers > 1.
+    # Shard results are stored by shard number, so the output order never depends on worker timing.
+    shard_size = max(1, APP_CONFIG.get("compare_shard_size", 500))
+    queries = shard_queries(spotify_tracks)
+    shards = [queries[i:i + shard_size] for i in range(0, len(queries), shard_size)]
+    shard_results = [None] * len(shards)
+    num_workers = min(resolve_compare_workers(), len(shards))
+
+    if num_workers > 1:
+        v_print(f"Comparing with {num_workers} worker processes ({len(shards)} shards of up to {shard_size} tracks)...", verbose_flag)
+        logging.info(f"Parallel comparison: {num_workers} workers, {len(shards)} shards, shard size {shard_size}.")
+        try:
+            with start_compare_pool(local_index, num_workers) as executor:
+                future_to_shard = {executor.submit(match_shard_in_worker, shard, score_cutoff, max_candidates): idx for idx, shard in enumerate(shards)}
+                for future in as_completed(future_to_shard):
+                    idx = future_to_shard[future]
+                    shard_results[idx] = future.result()
+                    progress.update(task_id, advance=len(shards[idx]))
+        except (BrokenProcessPool, OSError) as e:
+            msg = f"Process pool for comparison failed ({e}). Comparing remaining tracks serially."
+            console.print(f"[yellow]{msg}[/yellow]"); logging.warning(msg, exc_info=True)
+
+    for idx, shard in enumerate(shards): # Serial path, and fallback for shards a failed pool did not finish
+        if shard_results[idx] is None:
+            shard_results[idx] = match_shard(local_index, shard, score_cutoff, max_candidates)
+            progress.update(task_id, advance=len(shard))
+    return [result for shard_result in shard_results for result in shard_result]
+
+def match_streamed_pages(local_index, page_queue, score_cutoff, progress, task_id, verbose_flag, max_candidates=None):
+    # Streaming comparison: scores pages of Spotify track records taken from page_queue (a queue.Queue, ended
+    # by None) against the local index while the rest of the library is still being fetched. With
+    # compare_workers > 1 the pages are gathered into shards of compare_shard_size tracks for a process pool,
+    # as in match_spotify_tracks; otherwise each page is scored here as it arrives.
+    # Returns {spotify_id: (local_track_index or None, score)} for compare_tracks(precomputed_matches=...),
+    # or candidate lists when max_candidates is given (see match_shard).
+    matches, received = {}, []
+    progress.update(task_id, total=0, description="[magenta]Comparing fetched pages...")
+    num_workers = resolve_compare_workers()
+    shard_size = max(1, APP_CONFIG.get("compare_shard_size", 500))
+    executor, pending_shards, shard_records, page_records = None, {}, [], []
+
+    def store(records, results):
+        matches.update(zip((s_track['id'] for s_track in records), results))
+        progress.update(task_id, total=len(received), completed=len(matches))
+
+    def collect(done_futures):
+        for future in done_futures:
+            store(pending_shards.pop(future), future.result())
+
+    try:
+        if num_workers > 1:
+            v_print(f"Comparing fetched pages with {num_workers} worker processes (shards of up to {shard_size} tracks)...", verbose_flag)
+            logging.info(f"Parallel streaming comparison: {num_workers} workers, shard size {shard_size}.")
+            executor = start_compare_pool(local_index, num_workers)
+        while page_records is not None:
+            page_records = page_queue.get()
+            if page_records is not None:
+                received.extend(page_records); shard_records.extend(page_records)
+            if shard_records and (executor is None or page_records is None or len(shard_records) >= shard_size):
+                if executor is None:
+                    store(shard_records, match_shard(local_index, shard_queries(shard_records), score_cutoff, max_candidates))
+                else:
+                    pending_shards[executor.submit(match_shard_in_worker, shard_queries(shard_records), score_cutoff, max_candidates)] = shard_records
+                shard_records = []
+            collect([future for future in pending_shards if future.done()])
+        collect(as_completed(list(pending_shards)))
+    except (BrokenProcessPool, OSError) as e:
+        msg = f"Process pool for the streaming comparison failed ({e}). Comparing remaining tracks serially."
+        console.print(f"[yellow]{msg}[/yellow]"); logging.warning(msg, exc_info=True)
+        while page_records is not None: # The fetch keeps queueing pages until it ends the stream
+            page_records = page_queue.get()
+            if page_records is not None: received.extend(page_records)
+    finally:
+        if executor is not None: executor.shutdown(cancel_futures=True)
+
+    remaining_tracks = [s_track for s_track in received if s_track['id'] not in matches] # Left by a failed pool
+    if remaining_tracks:
+        store(remaining_tracks, match_shard(local_index, shard_queries(remaining_tracks), score_cutoff, max_candidates))
+    msg = f"Compared {len(matches)} Spotify tracks while fetching."
+    v_print(msg, verbose_flag); logging.info(msg)
+    progress.update(task_id, description="[green]Fetched pages compared")
+    return matches
 
 def compare_tracks(spotify_tracks, local_tracks_list, progress, task_id, 
                    matched_local_filepaths_set, verbose_flag, 
-                   current_similarity_threshold, current_review_threshold):
+                   current_similarity_threshold, current_review_threshold, precomputed_matches=None, one_to_one=False):
+    # precomputed_matches: {spotify_id: (local_track_index, score)} from match_streamed_pages against the same
+    # local_tracks_list and thresholds (candidate lists with one_to_one); only tracks missing from it are scored here
+    # one_to_one: give each local track to at most one Spotify track (see core_logic.assignment) instead of
+    # letting every Spotify track take its own best match
     msg = f"Comparing libraries (Similarity: {current_similarity_threshold}%, Review: {current_review_threshold}%)..."
     console.print(f"\n[magenta]{msg}[/magenta]"); logging.info(msg)
     progress.update(task_id, total=len(spotify_tracks), description="[magenta]Comparing libraries (optimized)...")
@@ -20,47 +143,35 @@ def compare_tracks(spotify_tracks, local_tracks_list, progress, task_id,
     missing_songs = []
     review_songs_info = []
 
-    local_blocks = defaultdict(list)
-    v_print("Pre-processing local tracks into blocks for optimized comparison...", verbose_flag)
-    for l_track in local_tracks_list:
-        block_key = generate_block_key(l_track['norm_artist'], l_track['norm_title'])
-        local_blocks[block_key].append(l_track)
-    v_print(f"Created {len(local_blocks)} blocks from {len(local_tracks_list)} local tracks.", verbose_flag)
-
-    for s_track in spotify_tracks: # No tqdm here, progress updated manually
-        progress.update(task_id, advance=1)
-        best_local_match = None
-        highest_score = 0
-        s_version_keywords = extract_version_keywords(s_track['original_title'])
-        
-        s_block_key = generate_block_key(s_track['norm_artist'], s_track['norm_title'])
-        candidate_local_tracks = local_blocks.get(s_block_key, [])
-        
-        if not candidate_local_tracks and verbose_flag:
-             v_print(f"Block '{s_block_key}' empty for Spotify track: {s_track['original_artist']} - {s_track['original_title']}", verbose_flag)
+    local_index = build_local_track_index(local_tracks_list, verbose_flag)
+    # Candidates below both thresholds end up 'missing' whatever their exact score, so the scorer may drop them early
+    score_cutoff = min(current_similarity_threshold, current_review_threshold)
+    precomputed_matches = precomputed_matches or {}
+    pending_tracks = [s_track for s_track in spotify_tracks if s_track['id'] not in precomputed_matches]
+    progress.update(task_id, advance=len(spotify_tracks) - len(pending_tracks))
+    max_candidates = APP_CONFIG.get("assignment_candidates_per_track", 10) if one_to_one else None
+    pending_matches = iter(match_spotify_tracks(local_index, pending_tracks, score_cutoff, progress, task_id, verbose_flag, max_candidates))
+    best_matches = [precomputed_matches[s_track['id']] if s_track['id'] in precomputed_matches else next(pending_matches)
+                    for s_track in spotify_tracks]
+    if one_to_one:
+        candidate_lists = best_matches
+        best_matches = assign_one_to_one(candidate_lists, score_cutoff)
+        displaced = sum(1 for candidates, (local_idx, _) in zip(candidate_lists, best_matches) if candidates and local_idx != candidates[0][0])
+        unassigned = sum(1 for candidates, (local_idx, _) in zip(candidate_lists, best_matches) if candidates and local_idx is None)
+        msg = f"One-to-one assignment: {displaced} Spotify tracks gave up their best local match to a better-fitting track ({unassigned} of them have no local match left)."
+        console.print(f"[cyan]{msg}[/cyan]"); logging.info(msg)
 
-        for l_track in candidate_local_tracks: 
-            title_similarity = fuzz.ratio(s_track['norm_title'], l_track['norm_title'])
-            artist_similarity = fuzz.ratio(s_track['norm_artist'], l_track['norm_artist'])
-            match_score = (title_similarity * 0.7) + (artist_similarity * 0.3)
-            
-            if match_score > highest_score:
-                highest_score = match_score
-                best_local_match = l_track
-        
-        match_info = {
-            "spotify_track": s_track,
-            "best_local_match": best_local_match,
-            "score": highest_score,
-            "spotify_version_keywords": list(s_version_keywords),
-            "local_version_keywords": list(extract_version_keywords(best_local_match['original_title'])) if best_local_match else []
-        }
+    for s_track, (best_local_idx, highest_score) in zip(spotify_tracks, best_matches):
+        s_version_keywords = record_version_keywords(s_track)
+        best_local_match = local_tracks_list[best_local_idx] if best_local_idx is not None else None
+        if best_local_match is None and verbose_flag:
+             v_print(f"No local candidate above {score_cutoff}% for Spotify track: {s_track['original_artist']} - {s_track['original_title']}", verbose_flag)
         
         if highest_score >= current_similarity_threshold:
             if best_local_match:
                 matched_local_filepaths_set.add(best_local_match['filepath']) 
-                s_kws = set(match_info["spotify_version_keywords"])
-                l_kws = set(match_info["local_version_keywords"])
+                s_kws = set(s_version_keywords)
+                l_kws = set(record_version_keywords(best_local_match))
                 if s_kws != l_kws:
                     version_note = f"Version keywords differ. Spotify: {s_kws or '{none}'}, Local: {l_kws or '{none}'}"
                     s_track['version_note'] = version_note 
@@ -68,7 +179,14 @@ def compare_tracks(spotify_tracks, local_tracks_list, progress, task_id,
                 else:
                     v_print(f"Match: '{s_track['original_title']}' with '{best_local_match['original_title']}'. Score: {highest_score:.2f}", verbose_flag)
         elif highest_score >= current_review_threshold:
-            review_songs_info.append(match_info)
+            # Only review candidates keep a match_info; matched and missing tracks need no extra object
+            review_songs_info.append({
+                "spotify_track": s_track,
+                "best_local_match": best_local_match,
+                "score": highest_score,
+                "spotify_version_keywords": list(s_version_keywords),
+                "local_version_keywords": list(record_version_keywords(best_local_match)) if best_local_match else []
+            })
         else:
             missing_songs.append(s_track)
             
@@ -1,67 +1,358 @@
 import os
 import logging
+import time
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from tinytag import TinyTag, TinyTagException
 
-from spotify_sync_lib.config import console, APP_CONFIG, v_print
-from spotify_sync_lib.text_tools import normalize_text_advanced
+from spotify_sync_lib.config import console, APP_CONFIG, v_print, apply_normalization_patterns
+from spotify_sync_lib.text_tools import normalize_text_advanced, extract_version_keywords
+from spotify_sync_lib.scan_cache import lookup_scan_cache, store_scan_cache, prune_scan_cache
+from spotify_sync_lib.track_records import LocalTrack
 
-def scan_local_tracks(music_dirs, progress, task_id, verbose_flag):
+def read_file_tags(filepath):
+    # Returns (title, artist, album) or None when the file lacks a usable title/artist. TinyTag errors propagate.
+    tag = TinyTag.get(filepath)
+    if tag and tag.title and tag.artist:
+        return tag.title, tag.artist, tag.album
+    return None
+
+def build_local_track_record(filepath, tag_record):
+    # tag_record is the compact tuple produced by tag_files_chunk:
+    #   (title, artist, album, norm_title, norm_artist, version_keywords)
+    title, artist, album, norm_title, norm_artist, version_keywords = tag_record
+    return LocalTrack(
+        original_title=title,
+        original_artist=artist,
+        album=album or "Unknown Album",
+        norm_title=norm_title,
+        norm_artist=norm_artist,
+        version_keywords=version_keywords,
+        filepath=filepath
+    )
+
+def make_tag_record(tags):
+    title, artist, album = tags
+    return (title, artist, album,
+            normalize_text_advanced(title, is_artist=False),
+            normalize_text_advanced(artist, is_artist=True),
+            tuple(sorted(extract_version_keywords(title))))
+
+# --- PARALLEL TAGGING ENGINE ---
+PENDING_CHUNKS_PER_WORKER = 2 # Chunks submitted ahead per worker process: keeps workers busy without buffering the whole scan
+def init_tag_worker(patterns_str_list, version_keywords):
+    # Worker processes started with 'spawn' (Windows/macOS) re-import config with script defaults only
+    apply_normalization_patterns(patterns_str_list)
+    APP_CONFIG["version_keywords"] = version_keywords
+
+def tag_files_chunk(filepaths):
+    # Runs in a worker process (or in-thread for small scans). Returns (records, failures):
+    #   records: list aligned with filepaths; a tag record tuple, or None when the file has no usable title/artist
+    #   failures: list of (index, message, is_tinytag_error) for files that could not be read
+    records, failures = [], []
+    for index, filepath in enumerate(filepaths):
+        try:
+            tags = read_file_tags(filepath)
+            records.append(make_tag_record(tags) if tags else None)
+        except TinyTagException as e:
+            records.append(None); failures.append((index, str(e), True))
+        except Exception as e:
+            records.append(None); failures.append((index, f"{type(e).__name__}: {e}", False))
+    return records, failures
+
+def resolve_scan_workers():
+    configured = APP_CONFIG.get("scan_workers", 0)
+    if configured and configured > 0:
+        return configured
+    return min(os.cpu_count() or 1, 61) # ProcessPoolExecutor caps max_workers at 61 on Windows
+
+def iter_tagging_engine(filepaths, progress, task_id, verbose_flag):
+    # Tags filepaths in chunks across a process pool. Yields (offset, records, failures) per chunk in input order,
+    # as soon as the chunk and all chunks before it are tagged; records/failures are in the tag_files_chunk
+    # format, indexed from offset (the chunk's first position in filepaths). Only a few chunks per worker are
+    # submitted ahead of the consumer, so results never pile up faster than they are used.
+    chunk_size = max(1, APP_CONFIG.get("scan_chunk_size", 200))
+    chunks = [filepaths[i:i + chunk_size] for i in range(0, len(filepaths), chunk_size)]
+    num_workers = min(resolve_scan_workers(), len(chunks))
+    next_chunk = 0 # First chunk not yet yielded
+
+    if num_workers > 1:
+        v_print(f"Tagging {len(filepaths)} files with {num_workers} worker processes ({len(chunks)} chunks)...", verbose_flag)
+        logging.info(f"Tagging {len(filepaths)} files with {num_workers} worker processes, chunk size {chunk_size}.")
+        pending = deque() # Futures of chunks next_chunk, next_chunk + 1, ...
+        try:
+            with ProcessPoolExecutor(max_workers=num_workers, initializer=init_tag_worker,
+                                     initargs=(APP_CONFIG["normalization_patterns_to_remove_str"], APP_CONFIG["version_keywords"])) as executor:
+                try:
+                    while next_chunk < len(chunks):
+                        while next_chunk + len(pending) < len(chunks) and len(pending) < num_workers * PENDING_CHUNKS_PER_WORKER:
+                            pending.append(executor.submit(tag_files_chunk, chunks[next_chunk + len(pending)]))
+                        chunk_records, chunk_failures = pending[0].result()
+                        pending.popleft()
+                        progress.update(task_id, advance=len(chunks[next_chunk]))
+                        next_chunk += 1
+                        yield (next_chunk - 1) * chunk_size, chunk_records, chunk_failures
+                finally:
+                    for future in pending: future.cancel() # Consumer stopped early: the pool only finishes running chunks
+        except (BrokenProcessPool, OSError) as e:
+            msg = f"Process pool for tagging failed ({e}). Tagging remaining files serially."
+            console.print(f"[yellow]{msg}[/yellow]"); logging.warning(msg, exc_info=True)
+
+    for idx in range(next_chunk, len(chunks)): # Serial path, and fallback for chunks a failed pool did not finish
+        chunk_records, chunk_failures = tag_files_chunk(chunks[idx])
+        progress.update(task_id, advance=len(chunks[idx]))
+        yield idx * chunk_size, chunk_records, chunk_failures
+
+# A directory's mtime changes when entries are added, removed or renamed in it, so a directory whose mtime
+# matches the previous scan still has the same file list. Mtimes this close to the scan start are not
+# trusted (coarse timestamps could hide a change made in the same tick) and are stored as None.
+RACY_MTIME_WINDOW_NS = 2_000_000_000
+
+def dir_key(dirpath):
+    # Directory of a file path built from dirpath (os.path.dirname form, e.g. without a trailing separator)
+    return os.path.dirname(os.path.join(dirpath, ''))
+
+def collect_candidate_files(music_dirs, with_stat, verbose_flag, dir_state=None, previous_dir_state=None, walk_order=None):
+    # Single os.scandir walk over all directories. Returns a compact list of (filepath, size, mtime_ns) tuples;
+    # size/mtime_ns come from the directory entry (free on Windows) and are None when with_stat is False.
+    # Mirrors os.walk defaults: top-down, symlinked directories are not followed, unreadable directories are skipped.
+    # dir_state: optional dict filled with dirpath -> [mtime_ns, subdir names] for every directory visited.
+    # previous_dir_state: dir_state of an earlier scan. Directories with an unchanged mtime are not listed;
+    #   their subdirectories come from that state and they contribute no candidates.
+    # walk_order: optional list receiving (dirpath, first candidate index, listed) for every directory visited;
+    #   the candidates of a listed directory are contiguous.
+    supported_exts = tuple(ext.lower() for ext in APP_CONFIG["supported_formats"]) # Built once, not per filename
+    scan_started_ns = time.time_ns()
+    candidates = []
+    for music_dir in music_dirs:
+        v_print(f"Listing directory tree: {music_dir}", verbose_flag)
+        pending_dirs = [music_dir]
+        while pending_dirs:
+            current_dir = pending_dirs.pop()
+            try:
+                dir_mtime_ns = os.stat(current_dir).st_mtime_ns # Taken before listing, so a concurrent change shows up next run
+            except OSError as e:
+                v_print(f"Could not stat directory {current_dir}: {e}", verbose_flag)
+                logging.warning(f"Could not stat directory {current_dir}: {e}")
+                continue
+            if dir_mtime_ns >= scan_started_ns - RACY_MTIME_WINDOW_NS:
+                dir_mtime_ns = None
+            previous = previous_dir_state.get(current_dir) if previous_dir_state else None
+            if previous and dir_mtime_ns is not None and previous[0] == dir_mtime_ns:
+                subdir_names = previous[1]
+                if walk_order is not None: walk_order.append((current_dir, len(candidates), False))
+            else:
+                if walk_order is not None: walk_order.append((current_dir, len(candidates), True))
+                subdir_names = []
+                try:
+                    with os.scandir(current_dir) as it:
+                        for entry in it:
+                            try:
+                                if entry.is_dir():
+                                    if not entry.is_symlink(): subdir_names.append(entry.name)
+                                elif entry.name.lower().endswith(supported_exts):
+                                    if with_stat:
+                                        st = entry.stat()
+                                        candidates.append((entry.path, st.st_size, st.st_mtime_ns))
+                                    else:
+                                        candidates.append((entry.path, None, None))
+                            except OSError as e:
+                                logging.debug(f"Could not stat {entry.path}: {e}")
+                except OSError as e:
+                    v_print(f"Could not list directory {current_dir}: {e}", verbose_flag)
+                    logging.warning(f"Could not list directory {current_dir}: {e}")
+                    if walk_order is not None: walk_order.pop()
+                    continue
+            if dir_state is not None: dir_state[current_dir] = [dir_mtime_ns, subdir_names]
+            pending_dirs.extend(os.path.join(current_dir, name) for name in reversed(subdir_names)) # Keep os.walk's depth-first, listing-order traversal
+    return candidates
+
+def scan_local_tracks(music_dirs, progress, task_id, verbose_flag, scan_cache=None, scan_stats=None,
+                      previous_tracks=None, previous_dir_state=None, dir_state=None):
+    # All local tracks in one list; see iter_local_tracks for the arguments
+    return [l_track for batch in iter_local_tracks(music_dirs, progress, task_id, verbose_flag, scan_cache, scan_stats,
+                                                   previous_tracks, previous_dir_state, dir_state)
+            for l_track in batch]
+
+def iter_local_tracks(music_dirs, progress, task_id, verbose_flag, scan_cache=None, scan_stats=None,
+                      previous_tracks=None, previous_dir_state=None, dir_state=None):
+    # Streaming scan: yields lists of local track records in directory walk order as soon as every file of their
+    # directories is tagged (reused and fully cached directories right away, the rest chunk by chunk), so later
+    # stages can start before the last file is read. Joined, the batches are what scan_local_tracks returns.
+    # When no file needs reading and every previous track is reused in its previous order, previous_tracks itself
+    # is the only batch, so a lazily loaded session list (PackedTrackList) is passed on without being decoded.
+    # scan_stats and dir_state are complete once the generator is exhausted.
     # music_dirs is now a list of paths
+    # scan_cache: optional dict from spotify_sync_lib.scan_cache; unchanged files (same size and mtime) skip TinyTag.
+    # scan_stats: optional dict that receives cache 'hits', 'misses' and 'removed' counts, and 'reused_dirs'/'listed_dirs'.
+    # previous_tracks/previous_dir_state: local tracks and directory state of an earlier scan (e.g. the session).
+    #   Tracks of directories whose mtime is unchanged are reused without listing or tagging; everything else
+    #   (changed or new directories, new roots) is scanned. Tracks under roots not in music_dirs are dropped.
+    # dir_state: optional dict that receives the directory state of this scan, for the next run.
     valid_music_dirs = [d for d in music_dirs if os.path.isdir(d)]
     if not valid_music_dirs:
         msg = f"Error: None of the provided local music directories are valid: {music_dirs}"
         console.print(f"[red]{msg}[/red]"); logging.error(msg)
         progress.update(task_id, description="[red]Local dirs invalid")
-        return []
+        return
     
-    v_print(f"Counting supported files in {len(valid_music_dirs)} director(y/ies)...", verbose_flag)
-    logging.info(f"Starting local scan in {valid_music_dirs}. Counting files...")
+    v_print(f"Listing supported files in {len(valid_music_dirs)} director(y/ies)...", verbose_flag)
+    logging.info(f"Starting local scan in {valid_music_dirs}. Listing files...")
+    progress.update(task_id, description="[blue]Listing local files...")
     
-    num_supported_files = 0
-    for music_dir in valid_music_dirs:
-        for r, d, f_list in os.walk(music_dir):
-            for f in f_list:
-                if f.lower().endswith(tuple(APP_CONFIG["supported_formats"])): # Use config
-                    num_supported_files += 1
+    # One walk feeds both the progress total and the tagging stage
+    walk_order = []
+    candidate_files = collect_candidate_files(valid_music_dirs, scan_cache is not None, verbose_flag, dir_state,
+                                              previous_dir_state if previous_tracks is not None else None, walk_order)
+    num_supported_files = len(candidate_files)
+    reused_dir_keys = {dir_key(dirpath) for dirpath, _, listed in walk_order if not listed}
+    previous_by_dir = {} # Directory -> indices into previous_tracks
+    if reused_dir_keys:
+        previous_filepaths = previous_tracks.column('filepath') if hasattr(previous_tracks, "column") else (t['filepath'] for t in previous_tracks)
+        for idx, filepath in enumerate(previous_filepaths):
+            track_dir = os.path.dirname(filepath)
+            if track_dir in reused_dir_keys: previous_by_dir.setdefault(track_dir, []).append(idx)
+    num_reused_tracks = sum(len(indices) for indices in previous_by_dir.values())
+    reuse_whole_list = (num_supported_files == 0 and num_reused_tracks == len(previous_tracks or ()) and
+                        [idx for dirpath, _, listed in walk_order if not listed for idx in previous_by_dir.get(dir_key(dirpath), ())] == list(range(num_reused_tracks)))
+    seen_filepaths = {fp for fp, _, _ in candidate_files} if scan_cache is not None else set()
+    if scan_cache is not None and reused_dir_keys: # Files in reused directories were not listed but still exist
+        seen_filepaths.update(fp for fp in scan_cache if os.path.dirname(fp) in reused_dir_keys)
     
     msg = f"Found {num_supported_files} potential audio files to scan across specified directories."
+    if previous_dir_state:
+        msg += f" Reusing {num_reused_tracks} tracks from {len(reused_dir_keys)} unchanged of {len(walk_order)} directories."
     v_print(msg, verbose_flag); logging.info(msg)
-    if num_supported_files == 0:
+    if scan_stats is not None:
+        scan_stats.update({"reused_dirs": len(reused_dir_keys), "listed_dirs": len(walk_order) - len(reused_dir_keys)})
+    if num_supported_files == 0 and num_reused_tracks == 0:
         progress.update(task_id, total=0, completed=0, description="[yellow]No supported local files.")
-        return []
-    
-    progress.update(task_id, total=num_supported_files, description="[blue]Scanning local files...")
-    local_tracks_data = []
-    tracks_found = 0 # Tracks successfully tagged
-
-    for music_dir in valid_music_dirs: # Iterate through each provided directory
-        v_print(f"Scanning directory: {music_dir}", verbose_flag)
-        for root, _, files_in_dir in os.walk(music_dir):
-            for file_in_root in files_in_dir:
-                if file_in_root.lower().endswith(tuple(APP_CONFIG["supported_formats"])): # Use config
-                    progress.update(task_id, advance=1)
-                    filepath = os.path.join(root, file_in_root)
-                    try:
-                        tag = TinyTag.get(filepath)
-                        if tag and tag.title and tag.artist:
-                            local_tracks_data.append({
-                                'original_title': tag.title,
-                                'original_artist': tag.artist,
-                                'album': tag.album or "Unknown Album",
-                                'norm_title': normalize_text_advanced(tag.title, is_artist=False),
-                                'norm_artist': normalize_text_advanced(tag.artist, is_artist=True),
-                                'filepath': filepath
-                            })
-                            tracks_found += 1
-                            if verbose_flag and tracks_found > 0 and tracks_found % 200 == 0:
-                                v_print(f"Tagged {tracks_found} local tracks...", verbose_flag)
-                    except TinyTagException:
-                        v_print(f"TinyTag failed for: {filepath}", verbose_flag)
-                        logging.debug(f"TinyTag failed for: {filepath}")
-                    except Exception as e:
-                        v_print(f"Error processing file {filepath}: {e}", verbose_flag)
-                        logging.warning(f"Error processing file {filepath}: {e}", exc_info=True)
+        if scan_cache is not None:
+            removed_entries = prune_scan_cache(scan_cache, valid_music_dirs, seen_filepaths)
+            if scan_stats is not None:
+                scan_stats.update({"hits": 0, "misses": 0, "removed": removed_entries})
+        return
     
+    progress.update(task_id, total=num_supported_files + num_reused_tracks, description="[blue]Scanning local files...")
+    if num_reused_tracks: progress.update(task_id, advance=num_reused_tracks)
+    tag_records = [None] * num_supported_files
+    failed_indices = set()
+    cache_hits = 0
+    pending_indices = [] # Files that need TinyTag (cache misses, or everything without a cache)
+
+    for index, (filepath, size, mtime_ns) in enumerate(candidate_files):
+        if scan_cache is None:
+            pending_indices.append(index); continue
+        hit, tags = lookup_scan_cache(scan_cache, filepath, size, mtime_ns)
+        if hit:
+            cache_hits += 1
+            if tags: tag_records[index] = make_tag_record(tags)
+        else:
+            pending_indices.append(index)
+    cache_misses = len(pending_indices) if scan_cache is not None else 0
+    if cache_hits: progress.update(task_id, advance=cache_hits)
+
+    # Output order follows the directory walk, independent of worker completion order; reused directories
+    # slot in where a full walk would have listed them. Directories are emitted once all their files are
+    # tagged, i.e. when they end before the first candidate still being tagged (frontier).
+    walk_bounds = [start for _, start, _ in walk_order[1:]] + [num_supported_files]
+    next_dir, tracks_found = 0, 0 # tracks_found: tracks successfully tagged
+
+    def completed_directories(frontier):
+        nonlocal next_dir, tracks_found
+        batch = []
+        while next_dir < len(walk_order) and walk_bounds[next_dir] <= frontier:
+            (dirpath, start, listed), end = walk_order[next_dir], walk_bounds[next_dir]
+            if listed:
+                tagged = [build_local_track_record(candidate_files[i][0], tag_records[i]) for i in range(start, end) if tag_records[i]]
+                tracks_found += len(tagged)
+                batch.extend(tagged)
+                tag_records[start:end] = [None] * (end - start) # Emitted: the tag tuples are no longer needed
+                if dir_state is not None and failed_indices.intersection(range(start, end)):
+                    dir_state[dirpath][0] = None # List it again next run so the failed files are retried
+            else:
+                batch.extend(previous_tracks[idx] for idx in previous_by_dir.get(dir_key(dirpath), ()))
+            next_dir += 1
+        return batch
+
+    if reuse_whole_list:
+        yield previous_tracks
+    else:
+        batch = completed_directories(pending_indices[0] if pending_indices else num_supported_files)
+        if batch: yield batch
+
+    if pending_indices:
+        pending_filepaths = [candidate_files[i][0] for i in pending_indices]
+        for offset, records, failures in iter_tagging_engine(pending_filepaths, progress, task_id, verbose_flag):
+            failed_positions = set()
+            for i, message, is_tinytag_error in failures:
+                filepath = pending_filepaths[offset + i]
+                if is_tinytag_error:
+                    v_print(f"TinyTag failed for: {filepath}", verbose_flag)
+                    logging.debug(f"TinyTag failed for: {filepath} ({message})")
+                else:
+                    failed_positions.add(offset + i) # Not cached: may be a transient I/O error
+                    failed_indices.add(pending_indices[offset + i])
+                    v_print(f"Error processing file {filepath}: {message}", verbose_flag)
+                    logging.warning(f"Error processing file {filepath}: {message}")
+            for position, record in enumerate(records, offset):
+                index = pending_indices[position]
+                tag_records[index] = record
+                if scan_cache is not None and position not in failed_positions:
+                    filepath, size, mtime_ns = candidate_files[index]
+                    store_scan_cache(scan_cache, filepath, size, mtime_ns, record[:3] if record else None)
+            tagged_through = offset + len(records)
+            batch = completed_directories(pending_indices[tagged_through] if tagged_through < len(pending_indices) else num_supported_files)
+            if batch: yield batch
+
     msg = f"Finished scanning. Found metadata for {tracks_found} tracks out of {num_supported_files} supported files."
     v_print(msg, verbose_flag); logging.info(msg)
-    return local_tracks_data
\ No newline at end of file
+    if scan_cache is not None:
+        removed_entries = prune_scan_cache(scan_cache, valid_music_dirs, seen_filepaths)
+        msg = f"Scan cache: {cache_hits} hits, {cache_misses} misses (re-tagged), {removed_entries} removed files dropped."
+        console.print(f"[cyan]{msg}[/cyan]"); logging.info(msg)
+        if scan_stats is not None:
+            scan_stats.update({"hits": cache_hits, "misses": cache_misses, "removed": removed_entries})
+
+_END_OF_BATCHES = object()
+
+def prefetch_track_batches(batches, max_buffered=None):
+    # Runs a batch generator such as iter_local_tracks on a background thread, at most max_buffered batches
+    # (scan_stream_buffer_batches) ahead of the consumer, so tagging continues while the consumer works on
+    # earlier batches. Errors of the generator are raised in the consumer; closing this generator stops it.
+    max_buffered = max(1, max_buffered or APP_CONFIG.get("scan_stream_buffer_batches", 8))
+    buffer = queue.Queue(maxsize=max_buffered)
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1); return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for batch in batches:
+                if not put(batch): return
+            put(_END_OF_BATCHES)
+        except Exception as e:
+            put(e)
+        finally:
+            batches.close()
+
+    producer = threading.Thread(target=produce, name="local-scan", daemon=True)
+    producer.start()
+    try:
+        while True:
+            item = buffer.get()
+            if item is _END_OF_BATCHES: return
+            if isinstance(item, Exception): raise item
+            yield item
+    finally:
+        stop.set()
+        producer.join()
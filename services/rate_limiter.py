@@ -0,0 +1,82 @@
+import threading
+import time
+
+from spotify_sync_lib.config import APP_CONFIG
+
+# After a 429 the rate is cut to RATE_LIMIT_BACKOFF_FACTOR of its current value (never below MIN_RATE_FRACTION
+# of the configured rate) and then grows back linearly, reaching the configured rate again after
+# RATE_RECOVERY_SECONDS without further 429s.
+RATE_LIMIT_BACKOFF_FACTOR = 0.5
+MIN_RATE_FRACTION = 0.1
+RATE_RECOVERY_SECONDS = 30.0
+
+class RateLimiter:
+    # Thread-safe token bucket. Callers reserve a token and sleep until it is due, so concurrent
+    # callers are spread out at `rate_per_second` with bursts of up to `burst` requests.
+    # rate_limited() adapts it to the server: every caller is held back until the Retry-After time
+    # has passed, and the rate is lowered, then recovers while no 429s come back.
+    def __init__(self, rate_per_second, burst=None):
+        self.max_rate = float(rate_per_second)
+        self.rate = self.max_rate
+        self.burst = float(burst if burst else max(1, rate_per_second))
+        self._tokens = self.burst
+        self._last_refill = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+        self._metrics = {"requests": 0, "waited_requests": 0, "wait_seconds": 0.0, "max_wait_seconds": 0.0,
+                         "rate_limited": 0, "retry_after_seconds": 0.0}
+
+    def acquire(self):
+        # Returns the number of seconds the caller waited
+        wait = self.reserve()
+        if wait > 0: time.sleep(wait)
+        return wait
+
+    def reserve(self):
+        # Takes a token and returns how long the caller must wait before using it, without sleeping
+        # (async callers await asyncio.sleep(wait) instead)
+        with self._lock:
+            now = time.monotonic()
+            elapsed = max(0.0, now - max(self._last_refill, self._blocked_until)) # Nothing refills while blocked
+            if self.rate < self.max_rate:
+                self.rate = min(self.max_rate, self.rate + elapsed * self.max_rate / RATE_RECOVERY_SECONDS)
+            self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+            self._last_refill = now
+            self._tokens -= 1
+            # Callers queued behind a Retry-After block are released one by one at the lowered rate
+            wait = max(0.0, self._blocked_until - now) + (-self._tokens / self.rate if self._tokens < 0 else 0.0)
+            metrics = self._metrics
+            metrics["requests"] += 1
+            if wait > 0:
+                metrics["waited_requests"] += 1
+                metrics["wait_seconds"] += wait
+                metrics["max_wait_seconds"] = max(metrics["max_wait_seconds"], wait)
+        return wait
+
+    def rate_limited(self, retry_after_seconds=None):
+        # Called on HTTP 429. retry_after_seconds is the server's Retry-After value, if it sent one.
+        with self._lock:
+            now = time.monotonic()
+            self.rate = max(self.max_rate * MIN_RATE_FRACTION, self.rate * RATE_LIMIT_BACKOFF_FACTOR)
+            self._tokens = min(self._tokens, 0.0) # No burst straight after the block lifts
+            if retry_after_seconds:
+                self._blocked_until = max(self._blocked_until, now + retry_after_seconds)
+                self._metrics["retry_after_seconds"] += retry_after_seconds
+            self._metrics["rate_limited"] += 1
+
+    def metrics(self):
+        with self._lock:
+            return dict(self._metrics, current_rate=self.rate)
+
+
+_spotify_rate_limiter = None
+_spotify_rate_limiter_lock = threading.Lock()
+
+def get_spotify_rate_limiter():
+    # Process-wide limiter shared by every Spotify API call, built lazily so it picks up values from config.json
+    global _spotify_rate_limiter
+    with _spotify_rate_limiter_lock:
+        if _spotify_rate_limiter is None:
+            rate = APP_CONFIG.get("api_requests_per_second", 10)
+            _spotify_rate_limiter = RateLimiter(rate, burst=APP_CONFIG.get("api_burst_size", rate))
+        return _spotify_rate_limiter
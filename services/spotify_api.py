@@ -1,6 +1,7 @@
 import time
 import logging
 import requests # For specific exceptions
+from urllib3.util.retry import Retry
 import spotipy
 from spotipy.oauth2 import SpotifyOAuth
 from rich.panel import Panel
@@ -9,37 +10,59 @@ from rich.table import Table
 from rich.prompt import Prompt
 import rich.box
 import os
-from collections import defaultdict
-from fuzzywuzzy import fuzz
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 from spotify_sync_lib.config import console, APP_CONFIG, v_print
-from spotify_sync_lib.text_tools import normalize_text_advanced, generate_block_key # For processing tracks if needed within this module
+from spotify_sync_lib.text_tools import normalize_text_advanced, extract_version_keywords # For processing tracks if needed within this module
+from spotify_sync_lib.track_records import SpotifyTrack
+from spotify_sync_lib.playlist_cache import update_playlist_cache
+from services.rate_limiter import get_spotify_rate_limiter
+from core_logic.match_index import build_local_track_index
 
 # Replace all SPOTIFY_CACHE_PATH with a correct definition
 SPOTIFY_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '.spotify_user_cache')
 
+# spotipy retries these itself. 429 is left out so rate limiting reaches spotify_api_call_with_retry and the shared limiter.
+SPOTIPY_RETRY_STATUS_CODES = (500, 502, 503, 504)
+
 # --- API CALL HELPER ---
-def spotify_api_call_with_retry(api_call_lambda, verbose_flag):
+def api_retry_delay(attempt, retry_after_header=None):
+    # Backoff policy shared by the sync and async clients: exponential from api_initial_retry_delay, or the
+    # server's Retry-After (HTTP 429) when it sent one
+    delay = APP_CONFIG.get("api_initial_retry_delay", 5) * (2 ** attempt)
+    if retry_after_header is not None:
+        try: delay = int(retry_after_header)
+        except (ValueError, TypeError): pass
+    return delay
+
+def spotify_api_call_with_retry(api_call_lambda, verbose_flag, retry_on_rate_limit=True):
+    # Every call waits for the shared rate limiter first. HTTP 429 feeds its Retry-After into the limiter,
+    # which holds back all callers and lowers the rate, so the retry is paced there instead of sleeping here.
+    # retry_on_rate_limit=False re-raises HTTP 429 immediately so concurrent callers can back off as a group
     max_retries = APP_CONFIG.get("api_max_retries", 3)
-    initial_delay = APP_CONFIG.get("api_initial_retry_delay", 5)
+    rate_limiter = get_spotify_rate_limiter()
     
     for attempt in range(max_retries):
+        rate_limiter.acquire()
         try:
             return api_call_lambda()
         except (requests.exceptions.ReadTimeout, requests.exceptions.ConnectionError, requests.exceptions.ChunkedEncodingError) as e:
-            delay = initial_delay * (2 ** attempt)
+            delay = api_retry_delay(attempt)
             msg = f"Spotify API request failed (attempt {attempt + 1}/{max_retries}): {type(e).__name__} - {str(e)[:100]}. Retrying in {delay}s..."
             logging.warning(msg); console.print(f"[yellow]{msg}[/yellow]")
             if attempt < max_retries - 1: time.sleep(delay)
             else: logging.error(f"Max retries reached for API request after {type(e).__name__}."); raise
         except spotipy.SpotifyException as se:
-            delay = initial_delay * (2 ** attempt)
             retry_after_header = se.headers.get('Retry-After') if hasattr(se, 'headers') and se.headers else None
+            delay = api_retry_delay(attempt, retry_after_header if se.http_status == 429 else None)
 
             if se.http_status == 429: # Rate limit
-                try: specific_delay = int(retry_after_header); delay = max(specific_delay, delay) 
-                except (ValueError, TypeError): pass 
+                rate_limiter.rate_limited(delay)
+                if not retry_on_rate_limit: raise
                 msg = f"Rate limited by Spotify (HTTP 429). Attempt {attempt + 1}/{max_retries}. Retrying in {delay}s..."
+                logging.warning(msg); console.print(f"[yellow]{msg}[/yellow]")
+                if attempt < max_retries - 1: continue # The next acquire() waits out the Retry-After
+                logging.error(f"Max retries reached for API request after HTTP {se.http_status}."); raise
             elif se.http_status >= 500: # Server error
                 msg = f"Spotify server error (HTTP {se.http_status}). Attempt {attempt + 1}/{max_retries}. Retrying in {delay}s..."
             else: 
@@ -51,13 +74,62 @@ def spotify_api_call_with_retry(api_call_lambda, verbose_flag):
             else: logging.error(f"Max retries reached for API request after HTTP {se.http_status}."); raise
     return None 
 
+def log_api_rate_limiter_metrics(run_stats=None):
+    # Summarizes the shared limiter for the log and, optionally, the run statistics table
+    metrics = get_spotify_rate_limiter().metrics()
+    msg = (f"Spotify API: {metrics['requests']} requests, {metrics['rate_limited']} rate-limited (HTTP 429), "
+           f"{metrics['waited_requests']} paced, {metrics['wait_seconds']:.1f}s total wait (max {metrics['max_wait_seconds']:.1f}s), "
+           f"current rate {metrics['current_rate']:.1f}/s")
+    logging.info(msg)
+    if run_stats is not None and metrics['requests']:
+        run_stats["Spotify API Requests"] = metrics['requests']
+        run_stats["Spotify API Rate-Limit Responses (429)"] = metrics['rate_limited']
+        run_stats["Spotify API Pacing Wait (s)"] = round(metrics['wait_seconds'], 1)
+    return metrics
+
 # --- CONNECTION ---
+# One authenticated client serves the whole run. It is created on first use with every scope the run may
+# need, shares one pooled HTTP session (keep-alive) with its OAuth manager, and caches current_user().
+SCOPES_LIBRARY_READ = ["user-library-read"]
+SCOPES_LIBRARY_MODIFY = ["user-library-modify"]
+SCOPES_PLAYLIST = ["playlist-read-private", "playlist-modify-private", "playlist-modify-public"]
+
+_spotify_connection = {"client": None, "scopes": frozenset(), "current_user": None}
+
+def spotify_scopes_for_run(process_orphans_action=None):
+    # Union of the scopes the run may use: reading Liked Songs, the missing-tracks playlist step and orphan actions
+    scopes = SCOPES_LIBRARY_READ + SCOPES_PLAYLIST
+    if process_orphans_action == 'add-to-liked':
+        scopes = scopes + SCOPES_LIBRARY_MODIFY
+    return scopes
+
+def _scope_set(scopes):
+    if scopes is None: return frozenset()
+    if isinstance(scopes, str): return frozenset(scopes.split())
+    return frozenset(scopes)
+
+def build_spotify_http_session():
+    # Pool sized for the concurrent page fetcher; spotipy's own retry policy, minus 429 (see SPOTIPY_RETRY_STATUS_CODES)
+    pool_size = max(10, 2 * APP_CONFIG.get("spotify_fetch_concurrency", 4))
+    retry = Retry(total=3, connect=None, read=False, allowed_methods=frozenset(['GET', 'POST', 'PUT', 'DELETE']),
+                  status=3, backoff_factor=0.3, status_forcelist=SPOTIPY_RETRY_STATUS_CODES)
+    adapter = requests.adapters.HTTPAdapter(pool_connections=2, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
 def get_spotify_connection(scopes="user-library-read", verbose_flag=False, project_root_dir=None):
     # SPOTIFY_CACHE_PATH is already an absolute path based on config_manager.SCRIPT_DIR
-
-    if isinstance(scopes, list): scopes_str = " ".join(sorted(list(set(scopes))))
-    elif scopes is None: scopes_str = None
-    else: scopes_str = scopes
+    # Returns the run's shared client when it already holds the requested scopes. Otherwise a client is built
+    # for the requested scopes plus all scopes granted so far, and replaces the shared one.
+    requested_scopes = _scope_set(scopes)
+    cached_client = _spotify_connection["client"]
+    if cached_client is not None and requested_scopes <= _spotify_connection["scopes"]:
+        v_print("Reusing the authenticated Spotify connection.", verbose_flag)
+        return cached_client
+    requested_scopes |= _spotify_connection["scopes"]
+    scopes_str = " ".join(sorted(requested_scopes)) or None
     
     try:
         # Explicitly get credentials from environment (loaded by dotenv in config.py)
@@ -70,20 +142,25 @@ def get_spotify_connection(scopes="user-library-read", verbose_flag=False, proje
         # Not logging secret
         logging.debug(f"  REDIRECT_URI from env: {'SET' if redirect_uri else 'NOT SET'}")
 
+        http_session = build_spotify_http_session()
         auth_manager = SpotifyOAuth(
             client_id=client_id,
             client_secret=client_secret,
             redirect_uri=redirect_uri,
             scope=scopes_str, 
-            cache_path=SPOTIFY_CACHE_PATH # SPOTIFY_CACHE_PATH from config_manager
+            cache_path=SPOTIFY_CACHE_PATH, # SPOTIFY_CACHE_PATH from config_manager
+            requests_session=http_session
         )
         
         sp = spotipy.Spotify(
             auth_manager=auth_manager,
-            requests_timeout=(APP_CONFIG["requests_timeout_connect"], APP_CONFIG["requests_timeout_read"])
+            requests_session=http_session,
+            requests_timeout=(APP_CONFIG["requests_timeout_connect"], APP_CONFIG["requests_timeout_read"]),
+            status_forcelist=SPOTIPY_RETRY_STATUS_CODES
         )
         
         display_name_for_log = "user"
+        user_info = None
         if scopes_str: 
             user_info = spotify_api_call_with_retry(lambda: sp.current_user(), verbose_flag=verbose_flag)
             if not user_info: 
@@ -96,6 +173,7 @@ def get_spotify_connection(scopes="user-library-read", verbose_flag=False, proje
             msg = "Spotify connection established (Client Credentials Flow likely)."
             
         console.print(Text(msg, style="cyan")); logging.info(msg)
+        _spotify_connection.update(client=sp, scopes=requested_scopes, current_user=user_info)
         return sp
         
     except spotipy.SpotifyOauthError as soe:
@@ -107,14 +185,102 @@ def get_spotify_connection(scopes="user-library-read", verbose_flag=False, proje
         console.print(Panel(Text(msg, style="bold red"), border_style="red")); logging.critical(msg, exc_info=True)
         return None
 
+def get_current_spotify_user(sp, verbose_flag=False):
+    # current_user() of the shared client is fetched once per run (get_spotify_connection already has it)
+    if sp is _spotify_connection["client"] and _spotify_connection["current_user"]:
+        return _spotify_connection["current_user"]
+    user_info = spotify_api_call_with_retry(lambda: sp.current_user(), verbose_flag)
+    if user_info and sp is _spotify_connection["client"]:
+        _spotify_connection["current_user"] = user_info
+    return user_info
+
 # --- TRACK FETCHING ---
-def fetch_spotify_liked_tracks(sp, progress, task_id, verbose_flag):
+def build_spotify_track_record(track, added_at=None):
+    if not (track and track.get('name') and track.get('artists') and track.get('id') and track.get('album')):
+        return None
+    return SpotifyTrack(
+        original_title=track['name'],
+        original_artist=track['artists'][0]['name'] if track['artists'] else "Unknown",
+        all_artists_str=", ".join([a['name'] for a in track['artists']]),
+        album=track['album']['name'],
+        norm_title=normalize_text_advanced(track['name'], is_artist=False), 
+        norm_artist=normalize_text_advanced(track['artists'][0]['name'] if track['artists'] else "Unknown", is_artist=True),
+        version_keywords=tuple(sorted(extract_version_keywords(track['name']))),
+        id=track['id'],
+        url=track['external_urls'].get('spotify', ''),
+        added_at=added_at
+    )
+
+def build_page_records(items):
+    # Track records for one page of saved-track items, skipping items without usable track data
+    page_records = []
+    for item in items:
+        track_record = build_spotify_track_record(item['track'], item.get('added_at'))
+        if track_record: page_records.append(track_record)
+    return page_records
+
+def update_liked_sync_state(liked_sync_state, spotify_tracks_data, liked_total):
+    # Records what an incremental fetch needs next time: newest 'added_at' (ISO 8601 UTC strings sort
+    # chronologically) and the library total Spotify reported
+    if liked_sync_state is None: return
+    added_ats = [t['added_at'] for t in spotify_tracks_data if t.get('added_at')]
+    liked_sync_state["liked_watermark"] = max(added_ats) if added_ats else None
+    liked_sync_state["liked_total"] = liked_total
+
+def fetch_saved_tracks_pages_concurrently(sp, offsets, limit, progress, task_id, verbose_flag, on_page=None):
+    # Fetches the given offsets in parallel, bounded by spotify_fetch_concurrency and the shared rate limiter.
+    # Returns {offset: track records}; on_page(records) is called as each page arrives. On HTTP 429 the remaining requests are cancelled; missing offsets are left
+    # for the caller to page serially.
+    max_workers = min(APP_CONFIG.get("spotify_fetch_concurrency", 4), len(offsets))
+    pages = {}
+
+    def fetch_page(page_offset):
+        return spotify_api_call_with_retry(lambda: sp.current_user_saved_tracks(limit=limit, offset=page_offset), verbose_flag, retry_on_rate_limit=False)
+
+    v_print(f"Fetching {len(offsets)} pages with {max_workers} concurrent requests...", verbose_flag)
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    future_to_offset = {}
+    try:
+        future_to_offset = {executor.submit(fetch_page, page_offset): page_offset for page_offset in offsets}
+        for future in as_completed(future_to_offset):
+            page_offset = future_to_offset[future]
+            try:
+                results = future.result()
+            except spotipy.SpotifyException as se:
+                if se.http_status == 429:
+                    msg = "Rate limited by Spotify (HTTP 429) during concurrent fetch. Falling back to serial paging."
+                    console.print(f"[yellow]{msg}[/yellow]"); logging.warning(msg)
+                    break
+                logging.warning(f"Concurrent fetch failed at offset {page_offset}: {se}. Will retry serially.")
+                continue
+            except Exception as e:
+                logging.warning(f"Concurrent fetch failed at offset {page_offset}: {e}. Will retry serially.")
+                continue
+            page_items = (results or {}).get('items') or []
+            pages[page_offset] = build_page_records(page_items)
+            if on_page: on_page(pages[page_offset])
+            progress.update(task_id, advance=len(page_items))
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+    for future, page_offset in future_to_offset.items(): # Keep pages that were already in flight when we stopped
+        if page_offset not in pages and future.done() and not future.cancelled() and future.exception() is None:
+            page_items = (future.result() or {}).get('items') or []
+            pages[page_offset] = build_page_records(page_items)
+            if on_page: on_page(pages[page_offset])
+            progress.update(task_id, advance=len(page_items))
+    return pages
+
+def fetch_spotify_liked_tracks(sp, progress, task_id, verbose_flag, liked_sync_state=None, on_page=None):
+    # liked_sync_state: optional dict that receives the watermark used by fetch_spotify_liked_tracks_incremental.
+    # on_page: optional callback receiving each page's track records as it arrives (in arrival order, which
+    # differs from library order when pages are fetched concurrently)
     if not sp: return []
     v_print("Starting Spotify library fetch...", verbose_flag); logging.info("Starting Spotify library fetch...")
-    spotify_tracks_data = []
-    offset, limit, total_tracks_expected = 0, 50, 0
+    limit, total_tracks_expected = 50, 0
+    pages = {} # offset -> page track records, reassembled in offset order at the end
     try:
-        results = spotify_api_call_with_retry(lambda: sp.current_user_saved_tracks(limit=1, offset=0), verbose_flag=verbose_flag)
+        # The first full page also tells us the total, so every remaining offset is known up front
+        results = spotify_api_call_with_retry(lambda: sp.current_user_saved_tracks(limit=limit, offset=0), verbose_flag=verbose_flag)
         if results: total_tracks_expected = results.get('total', 0)
         msg = f"Found {total_tracks_expected} tracks in your Spotify library."
         console.print(Text(msg, style="deep_sky_blue1" if console.color_system else "default")); logging.info(msg) 
@@ -122,13 +288,22 @@ def fetch_spotify_liked_tracks(sp, progress, task_id, verbose_flag):
             progress.update(task_id, total=0, completed=0, description="[green]No Spotify tracks found.")
             return []
         progress.update(task_id, total=total_tracks_expected, description="[green]Fetching Spotify tracks...")
+        first_items = results.get('items') or []
+        pages[0] = build_page_records(first_items)
+        if on_page: on_page(pages[0])
+        progress.update(task_id, advance=len(first_items))
     except Exception as e:
         msg = f"Error fetching initial track count from Spotify: {e}"
         console.print(f"[red]{msg}[/red]"); logging.error(msg, exc_info=True)
         progress.update(task_id, description="[red]Error fetching Spotify tracks")
         return []
 
-    while offset < total_tracks_expected:
+    remaining_offsets = list(range(limit, total_tracks_expected, limit)) if results.get('next') else []
+    if len(remaining_offsets) > 1 and APP_CONFIG.get("spotify_fetch_concurrency", 4) > 1:
+        pages.update(fetch_saved_tracks_pages_concurrently(sp, remaining_offsets, limit, progress, task_id, verbose_flag, on_page))
+
+    for offset in remaining_offsets: # Serial paging: the default path and the 429/error fallback for missing pages
+        if offset in pages: continue
         try: 
             results = spotify_api_call_with_retry(lambda: sp.current_user_saved_tracks(limit=limit, offset=offset), verbose_flag=verbose_flag)
         except Exception as e:
@@ -141,27 +316,16 @@ def fetch_spotify_liked_tracks(sp, progress, task_id, verbose_flag):
             logging.info(f"No more items from Spotify at offset {offset}. Expected {total_tracks_expected}.")
             break 
         
-        page_items = results['items']
-        for item in page_items:
-            track = item['track']
-            if track and track.get('name') and track.get('artists') and track.get('id') and track.get('album'):
-                spotify_tracks_data.append({
-                    'original_title': track['name'],
-                    'original_artist': track['artists'][0]['name'] if track['artists'] else "Unknown",
-                    'all_artists_str': ", ".join([a['name'] for a in track['artists']]),
-                    'album': track['album']['name'],
-                    'norm_title': normalize_text_advanced(track['name'], is_artist=False), 
-                    'norm_artist': normalize_text_advanced(track['artists'][0]['name'] if track['artists'] else "Unknown", is_artist=True),
-                    'id': track['id'],
-                    'url': track['external_urls'].get('spotify', '')
-                })
-        progress.update(task_id, advance=len(page_items))
-        offset += len(page_items)
-        v_print(f"Fetched page. Total: {len(spotify_tracks_data)}/{total_tracks_expected}", verbose_flag)
+        pages[offset] = build_page_records(results['items'])
+        if on_page: on_page(pages[offset])
+        progress.update(task_id, advance=len(results['items']))
+        v_print(f"Fetched page at offset {offset}. Pages: {len(pages)}", verbose_flag)
         if not results['next']:
             v_print("Spotify API indicates no next page at current offset.", verbose_flag)
             logging.info("Spotify API indicates no next page at current offset.")
             break
+
+    spotify_tracks_data = [track_record for offset in sorted(pages) for track_record in pages[offset]]
     
     # Check progress.tasks list if task_id is known to be there.
     current_task = next((t for t in progress.tasks if t.id == task_id), None)
@@ -170,22 +334,113 @@ def fetch_spotify_liked_tracks(sp, progress, task_id, verbose_flag):
 
     msg = f"Finished fetching. Loaded {len(spotify_tracks_data)} tracks from Spotify."
     v_print(msg, verbose_flag); logging.info(msg)
+    update_liked_sync_state(liked_sync_state, spotify_tracks_data, total_tracks_expected)
     return spotify_tracks_data
 
-def get_all_track_ids_in_playlist(sp, playlist_id, verbose_flag):
-    track_ids = set()
-    if not playlist_id: return track_ids
-    v_print(f"Fetching all track IDs from playlist ID: {playlist_id}", verbose_flag)
-    offset, limit = 0, 100 # Max limit for playlist_items is 100
+def fetch_spotify_liked_tracks_incremental(sp, cached_tracks, session_meta, progress, task_id, verbose_flag, liked_sync_state=None):
+    # Liked Songs come newest-first, so only pages until the first already-known item are fetched.
+    # Removals cannot be seen that way; they are detected by comparing Spotify's total with the previous
+    # total plus the newly liked items. On any mismatch this falls back to a full fetch.
+    if not sp: return []
+    watermark, previous_total = session_meta.get("liked_watermark"), session_meta.get("liked_total")
+    if not watermark or previous_total is None:
+        v_print("Session has no Liked Songs watermark. Doing a full fetch.", verbose_flag)
+        return fetch_spotify_liked_tracks(sp, progress, task_id, verbose_flag, liked_sync_state)
+
+    v_print(f"Starting incremental Spotify library fetch (watermark: {watermark})...", verbose_flag)
+    logging.info(f"Starting incremental Spotify library fetch. Watermark: {watermark}, previous total: {previous_total}")
+    progress.update(task_id, total=None, description="[green]Checking for new Spotify likes...")
+    known_ids = {t['id'] for t in cached_tracks}
+    new_tracks, new_ids = [], set()
+    newly_liked_count = 0 # Raw items not in the cached library, including ones build_spotify_track_record skips
+    offset, limit, current_total, pages_fetched = 0, 50, None, 0
     try:
-        while True:
-            results = spotify_api_call_with_retry(lambda: sp.playlist_items(playlist_id, fields='items(track(id)),next', limit=limit, offset=offset), verbose_flag)
+        reached_known = False
+        while not reached_known:
+            results = spotify_api_call_with_retry(lambda: sp.current_user_saved_tracks(limit=limit, offset=offset), verbose_flag=verbose_flag)
+            pages_fetched += 1
             if not results or not results['items']: break
+            current_total = results.get('total', 0)
             for item in results['items']:
-                if item['track'] and item['track']['id']: # Track can be None for local files in playlist not synced
-                    track_ids.add(item['track']['id'])
+                added_at = item.get('added_at') or ""
+                track_id = (item.get('track') or {}).get('id')
+                if added_at < watermark or (added_at == watermark and track_id in known_ids):
+                    reached_known = True; break
+                if track_id not in known_ids: newly_liked_count += 1
+                track_record = build_spotify_track_record(item['track'], item.get('added_at'))
+                if track_record and track_record['id'] not in new_ids:
+                    new_tracks.append(track_record); new_ids.add(track_record['id'])
+            progress.update(task_id, completed=len(new_tracks))
             offset += len(results['items'])
             if not results['next']: break
+    except Exception as e:
+        msg = f"Incremental Spotify fetch failed: {e}. Falling back to a full fetch."
+        console.print(f"[yellow]{msg}[/yellow]"); logging.warning(msg, exc_info=True)
+        return fetch_spotify_liked_tracks(sp, progress, task_id, verbose_flag, liked_sync_state)
+
+    expected_total = previous_total + newly_liked_count
+    if current_total is None or current_total != expected_total:
+        msg = f"Liked Songs count changed beyond new additions (Spotify: {current_total}, expected: {expected_total}). Tracks were removed; doing a full fetch."
+        console.print(f"[yellow]{msg}[/yellow]"); logging.info(msg)
+        return fetch_spotify_liked_tracks(sp, progress, task_id, verbose_flag, liked_sync_state)
+
+    # Re-liked tracks move to the top, so they replace their cached entry
+    spotify_tracks_data = new_tracks + [t for t in cached_tracks if t['id'] not in new_ids]
+    progress.update(task_id, total=len(new_tracks), completed=len(new_tracks), description="[green]Spotify likes up to date")
+    msg = f"Incremental fetch: {len(new_tracks)} new liked tracks in {pages_fetched} page(s). Total: {len(spotify_tracks_data)} tracks."
+    console.print(Text(msg, style="deep_sky_blue1" if console.color_system else "default")); logging.info(msg)
+    update_liked_sync_state(liked_sync_state, spotify_tracks_data, current_total)
+    return spotify_tracks_data
+
+PLAYLIST_TRACK_FIELDS = 'items(track(name,artists(name),album(name),id)),next,total'
+
+def get_playlist_snapshot_id(sp, playlist_id, verbose_flag):
+    results = spotify_api_call_with_retry(lambda: sp.playlist(playlist_id, fields='snapshot_id'), verbose_flag)
+    return (results or {}).get('snapshot_id')
+
+def fetch_playlist_tracks(sp, playlist_id, verbose_flag, playlist_cache=None, progress=None, task_id=None):
+    # Returns [id, name, first_artist, album] rows for the playlist's tracks (entries without a track ID, e.g.
+    # local files, are skipped). The first request returns the snapshot_id together with the first page of
+    # items, so with playlist_cache an unchanged playlist costs that one request. A changed or unknown playlist
+    # is paged and stored again, but only if its snapshot_id is still the same after paging; a playlist edited
+    # meanwhile may have been read half before and half after the edit. Raises on API errors.
+    playlist = spotify_api_call_with_retry(lambda: sp.playlist(playlist_id, fields=f"snapshot_id,tracks({PLAYLIST_TRACK_FIELDS})"), verbose_flag) or {}
+    snapshot_id = playlist.get('snapshot_id')
+    cached_entry = playlist_cache.get(playlist_id) if playlist_cache is not None else None
+    if cached_entry and snapshot_id and cached_entry["snapshot_id"] == snapshot_id:
+        v_print(f"Playlist {playlist_id} unchanged since last read (snapshot {snapshot_id[:12]}...). Using cached contents.", verbose_flag)
+        if progress is not None: progress.update(task_id, total=len(cached_entry["tracks"]), completed=len(cached_entry["tracks"]))
+        return cached_entry["tracks"]
+
+    tracks = []
+    offset, limit = 0, 100 # Max limit for playlist_items is 100
+    results = playlist.get('tracks')
+    while True:
+        if not results or not results['items']: break
+        if progress is not None: progress.update(task_id, total=results.get('total', 0), advance=len(results['items']))
+        for item in results['items']:
+            track = item['track']
+            if track and track.get('id'): # Track can be None for local files in playlist not synced
+                tracks.append([track['id'], track.get('name') or "", (track['artists'][0]['name'] if track.get('artists') else "Unknown"),
+                               (track.get('album') or {}).get('name') or ""])
+        offset += len(results['items'])
+        if not results['next']: break
+        results = spotify_api_call_with_retry(lambda: sp.playlist_items(playlist_id, fields=PLAYLIST_TRACK_FIELDS, limit=limit, offset=offset), verbose_flag)
+    if playlist_cache is not None and snapshot_id:
+        single_page = not (playlist.get('tracks') or {}).get('next') # Items and snapshot_id came from one response
+        if single_page or get_playlist_snapshot_id(sp, playlist_id, verbose_flag) == snapshot_id:
+            playlist_cache[playlist_id] = {"snapshot_id": snapshot_id, "tracks": tracks}
+        else:
+            msg = f"Playlist {playlist_id} changed while it was being read; not keeping a copy of it."
+            v_print(msg, verbose_flag); logging.info(msg)
+    return tracks
+
+def get_all_track_ids_in_playlist(sp, playlist_id, verbose_flag, playlist_cache=None):
+    track_ids = set()
+    if not playlist_id: return track_ids
+    v_print(f"Fetching all track IDs from playlist ID: {playlist_id}", verbose_flag)
+    try:
+        track_ids = {track[0] for track in fetch_playlist_tracks(sp, playlist_id, verbose_flag, playlist_cache)}
         v_print(f"Found {len(track_ids)} unique track IDs in playlist {playlist_id}", verbose_flag)
     except Exception as e:
         msg = f"Error fetching all items from playlist {playlist_id}: {e}"
@@ -262,7 +517,10 @@ def create_new_playlist(sp, user_id, playlist_name, playlist_description, dry_ru
         console.print(f"  [red]{msg}[/red]"); logging.error(msg, exc_info=True)
         return None, None
 
-def add_tracks_to_target_playlist(sp, playlist_id, playlist_name, track_ids_to_add, progress, task_id, dry_run_flag, verbose_flag):
+def add_tracks_to_target_playlist(sp, playlist_id, playlist_name, track_ids_to_add, progress, task_id, dry_run_flag, verbose_flag,
+                                  playlist_cache=None, track_details=None):
+    # playlist_cache: playlist mirror used for the duplicate check and updated with the added tracks.
+    # track_details: optional {track_id: (name, first_artist, album)} so the mirror stays complete after the add.
     if not track_ids_to_add:
         progress.update(task_id, description=f"[green]'{playlist_name}': No new tracks to add.")
         console.print(f"  No new tracks to add to '{playlist_name}'."); logging.info(f"No new tracks to add to '{playlist_name}'.")
@@ -271,7 +529,7 @@ def add_tracks_to_target_playlist(sp, playlist_id, playlist_name, track_ids_to_a
     actual_ids_to_add = list(track_ids_to_add) 
     if not dry_run_flag:
         v_print(f"Checking for existing tracks in playlist '{playlist_name}' before adding...", verbose_flag)
-        existing_track_ids_in_playlist = get_all_track_ids_in_playlist(sp, playlist_id, verbose_flag)
+        existing_track_ids_in_playlist = get_all_track_ids_in_playlist(sp, playlist_id, verbose_flag, playlist_cache)
         
         original_count = len(actual_ids_to_add)
         actual_ids_to_add = [tid for tid in actual_ids_to_add if tid not in existing_track_ids_in_playlist]
@@ -296,48 +554,91 @@ def add_tracks_to_target_playlist(sp, playlist_id, playlist_name, track_ids_to_a
         return
 
     progress.update(task_id, total=num_tracks, description=action_desc) # Set total for real run
-    batch_size, added_count = 100, 0
+    batch_size, added_count, snapshot_id = 100, 0, None
     for i in range(0, num_tracks, batch_size):
         batch = actual_ids_to_add[i : i + batch_size]
         try:
-            spotify_api_call_with_retry(lambda: sp.playlist_add_items(playlist_id, batch), verbose_flag)
+            results = spotify_api_call_with_retry(lambda: sp.playlist_add_items(playlist_id, batch), verbose_flag)
+            snapshot_id = (results or {}).get('snapshot_id')
             added_count += len(batch); progress.update(task_id, advance=len(batch))
             v_print(f"Added batch. Total added: {added_count}", verbose_flag)
-            if num_tracks > batch_size and i + batch_size < num_tracks: time.sleep(1)
         except Exception as e:
             msg = f"Error adding batch to '{playlist_name}': {e}"; console.print(f"  [red]{msg}[/red]"); logging.error(msg, exc_info=True)
             break # Stop if a batch fails
+    if added_count:
+        added_ids = actual_ids_to_add[:added_count]
+        added_tracks = [[tid, *track_details[tid]] for tid in added_ids] if track_details and all(tid in track_details for tid in added_ids) else None
+        update_playlist_cache(playlist_cache, playlist_id, snapshot_id, added_tracks=added_tracks)
     
     final_desc = f"[green]'{playlist_name}': {added_count}/{num_tracks} added!" if added_count == num_tracks else f"[yellow]'{playlist_name}': {added_count}/{num_tracks} (partial)"
     progress.update(task_id, description=final_desc)
     logging.info(f"Finished adding to '{playlist_name}'. Added {added_count}/{num_tracks} new tracks.")
 
 
-def clean_existing_playlist(sp, playlist_id, playlist_name, local_tracks_list, progress, task_id, dry_run_flag, verbose_flag, current_similarity_threshold):
+SAVED_TRACKS_ADD_BATCH_SIZE = 50 # API maximum per current_user_saved_tracks_add
+PLAYLIST_ADD_BATCH_SIZE = 100 # API maximum per playlist_add_items
+
+class TrackWriteQueue:
+    # Collects track IDs for one write endpoint and sends them in API-maximum batches. A batch goes out when
+    # it is full, on add()/flush_if_due() once the oldest queued ID has waited max_wait_seconds, and on flush().
+    # write_batch(ids) performs the API call; a failed batch is reported and its tracks are kept in `failed`
+    # while later batches still go out.
+    def __init__(self, write_batch, batch_size, target_desc, verbose_flag, max_wait_seconds=None):
+        self.write_batch = write_batch
+        self.batch_size = batch_size
+        self.target_desc = target_desc
+        self.verbose_flag = verbose_flag
+        self.max_wait_seconds = APP_CONFIG.get("orphan_write_flush_seconds", 30) if max_wait_seconds is None else max_wait_seconds
+        self.pending = {} # track_id -> label (e.g. title), in queue order
+        self.first_queued_at = None
+        self.added = []
+        self.failed = []
+        self.batches_sent = 0
+
+    def __contains__(self, track_id):
+        return track_id in self.pending
+
+    def add(self, track_id, label=None):
+        if track_id in self.pending: return
+        if not self.pending: self.first_queued_at = time.monotonic()
+        self.pending[track_id] = label or track_id
+        if len(self.pending) >= self.batch_size: self._send(self.batch_size)
+        else: self.flush_if_due()
+
+    def flush_if_due(self):
+        if self.pending and self.max_wait_seconds >= 0 and time.monotonic() - self.first_queued_at >= self.max_wait_seconds:
+            self.flush()
+
+    def flush(self):
+        while self.pending:
+            self._send(self.batch_size)
+        return len(self.added), len(self.failed)
+
+    def _send(self, count):
+        batch_ids = list(self.pending)[:count]
+        labels = [self.pending.pop(track_id) for track_id in batch_ids]
+        self.first_queued_at = time.monotonic() if self.pending else None
+        self.batches_sent += 1
+        try:
+            self.write_batch(batch_ids)
+        except Exception as e:
+            self.failed.extend(labels)
+            msg = f"Error adding batch of {len(batch_ids)} track(s) to {self.target_desc}: {e}. Not added: {', '.join(labels[:10])}{' ...' if len(labels) > 10 else ''}"
+            console.print(f"  [red]{msg}[/red]"); logging.error(msg, exc_info=True)
+            return
+        self.added.extend(labels)
+        msg = f"Added {len(batch_ids)} track(s) to {self.target_desc}."
+        console.print(f"  [green]{msg}[/green]"); logging.info(f"{msg} {labels}")
+
+
+def clean_existing_playlist(sp, playlist_id, playlist_name, local_tracks_list, progress, task_id, dry_run_flag, verbose_flag, current_similarity_threshold,
+                            playlist_cache=None):
     console.print(Panel(f"Cleaning playlist '{playlist_name}' (ID: {playlist_id})", title="[blue]Playlist Cleaning[/blue]", expand=False))
     logging.info(f"Starting cleaning of playlist '{playlist_name}'. Dry run: {dry_run_flag}")
 
-    playlist_spotify_tracks_raw = []
-    offset, limit, total_playlist_tracks = 0, 100, 0
     try:
-        results = spotify_api_call_with_retry(lambda: sp.playlist_items(playlist_id, limit=limit, offset=offset, fields='items(track(name,artists(name),album(name),id,external_urls)),next,total'), verbose_flag)
-        if not results: raise Exception("Failed to fetch initial playlist items.")
-        total_playlist_tracks = results.get('total', 0)
-        if results['items']: playlist_spotify_tracks_raw.extend(item['track'] for item in results['items'] if item['track'] and item['track'].get('id')) # Ensure track and ID exist
-        
-        progress.update(task_id, total=total_playlist_tracks, description=f"[blue]Fetching from '{playlist_name}'...")
-        progress.update(task_id, advance=len(results['items'] or []))
-        offset += len(results['items'] or [])
-
-        while results and results['next'] and offset < total_playlist_tracks:
-            results = spotify_api_call_with_retry(lambda: sp.next(results), verbose_flag)
-            if not results: break
-            if results['items']: playlist_spotify_tracks_raw.extend(item['track'] for item in results['items'] if item['track'] and item['track'].get('id'))
-            progress.update(task_id, advance=len(results['items'] or [])); offset += len(results['items'] or [])
-        
-        current_task_obj = progress._tasks.get(task_id) # Access task via internal _tasks dict
-        if current_task_obj and len(playlist_spotify_tracks_raw) >= total_playlist_tracks and current_task_obj.completed < total_playlist_tracks:
-             progress.update(task_id, completed=total_playlist_tracks) # Mark as complete if all fetched
+        progress.update(task_id, description=f"[blue]Fetching from '{playlist_name}'...")
+        playlist_spotify_tracks_raw = fetch_playlist_tracks(sp, playlist_id, verbose_flag, playlist_cache, progress, task_id)
     except Exception as e:
         msg = f"Error fetching all tracks from playlist '{playlist_name}': {e}"
         console.print(f"[red]{msg}[/red]"); logging.error(msg, exc_info=True)
@@ -353,26 +654,17 @@ def clean_existing_playlist(sp, playlist_id, playlist_name, local_tracks_list, p
     v_print(f"Fetched {len(playlist_spotify_tracks_raw)} tracks from '{playlist_name}'. Now checking against local library...", verbose_flag)
     progress.update(task_id, completed=0, total=len(playlist_spotify_tracks_raw), description=f"[blue]Analyzing '{playlist_name}' tracks...")
 
-    local_blocks = defaultdict(list)
-    for l_track in local_tracks_list: local_blocks[generate_block_key(l_track['norm_artist'], l_track['norm_title'])].append(l_track)
+    local_index = build_local_track_index(local_tracks_list, verbose_flag) # Same index compare_tracks used, when the library is unchanged
     
     track_ids_to_remove = []
-    for pl_track in playlist_spotify_tracks_raw:
+    for pl_track_id, pl_track_name, pl_track_artist, _ in playlist_spotify_tracks_raw:
         progress.update(task_id, advance=1)
-        if not pl_track or not pl_track.get('id'): 
-            v_print(f"Skipping malformed/local track data from playlist: {pl_track}", verbose_flag); continue # Skip if no ID (e.g. local file in playlist)
-
-        pl_norm_title = normalize_text_advanced(pl_track['name'])
-        pl_norm_artist = normalize_text_advanced(pl_track['artists'][0]['name'] if pl_track['artists'] else "Unknown", is_artist=True)
-        block_key = generate_block_key(pl_norm_artist, pl_norm_title)
-        candidate_locals = local_blocks.get(block_key, [])
-        found_locally = False
-        for l_track in candidate_locals:
-            title_sim, artist_sim = fuzz.ratio(pl_norm_title, l_track['norm_title']), fuzz.ratio(pl_norm_artist, l_track['norm_artist'])
-            match_score = (title_sim * 0.7) + (artist_sim * 0.3)
-            if match_score >= current_similarity_threshold: 
-                found_locally = True; v_print(f"Playlist track '{pl_track['name']}' found locally as '{l_track['original_title']}'. Mark for removal.", verbose_flag); break
-        if found_locally: track_ids_to_remove.append(pl_track['id'])
+        pl_norm_title = normalize_text_advanced(pl_track_name)
+        pl_norm_artist = normalize_text_advanced(pl_track_artist, is_artist=True)
+        local_idx, match_score = local_index.best_match(pl_norm_artist, pl_norm_title, current_similarity_threshold)
+        if local_idx is not None: 
+            v_print(f"Playlist track '{pl_track_name}' found locally as '{local_tracks_list[local_idx]['original_title']}'. Mark for removal.", verbose_flag)
+            track_ids_to_remove.append(pl_track_id)
 
     removed_count = 0
     if track_ids_to_remove:
@@ -382,16 +674,20 @@ def clean_existing_playlist(sp, playlist_id, playlist_name, local_tracks_list, p
             for track_id in track_ids_to_remove: logging.info(f"[DRY RUN] Would remove ID: {track_id}")
             removed_count = len(track_ids_to_remove)
         else:
+            snapshot_id = None
             for i in range(0, len(track_ids_to_remove), 100):
                 batch_ids_uris = [{'uri': f"spotify:track:{tid}"} for tid in track_ids_to_remove[i:i+100]] # Use URI format
                 try:
-                    spotify_api_call_with_retry(lambda: sp.playlist_remove_specific_occurrences_of_items(playlist_id, batch_ids_uris), verbose_flag)
+                    results = spotify_api_call_with_retry(lambda: sp.playlist_remove_specific_occurrences_of_items(playlist_id, batch_ids_uris), verbose_flag)
+                    snapshot_id = (results or {}).get('snapshot_id')
                     removed_count += len(batch_ids_uris)
                     v_print(f"Removed batch of {len(batch_ids_uris)} from '{playlist_name}'. Total removed: {removed_count}", verbose_flag)
                 except Exception as e:
                     msg = f"Error removing tracks batch from playlist '{playlist_name}': {e}"
                     console.print(f"  [red]{msg}[/red]"); logging.error(msg, exc_info=True)
                     break 
+            if removed_count:
+                update_playlist_cache(playlist_cache, playlist_id, snapshot_id, added_tracks=[], removed_ids=track_ids_to_remove[:removed_count])
             console.print(f"  [green]Removed {removed_count} tracks from playlist '{playlist_name}'.[/green]")
     else:
         console.print(f"  [green]No tracks in playlist '{playlist_name}' needed removal (none found in local library).[/green]")
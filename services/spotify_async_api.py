@@ -0,0 +1,275 @@
+import asyncio
+import logging
+
+import spotipy
+from rich.text import Text
+
+from spotify_sync_lib.config import console, APP_CONFIG, v_print
+from services.rate_limiter import get_spotify_rate_limiter
+from services.spotify_api import api_retry_delay, build_page_records, update_liked_sync_state, SPOTIPY_RETRY_STATUS_CODES
+
+try:
+    import httpx # Optional: only needed for the asyncio client (--async-api)
+except ImportError:
+    httpx = None
+
+# Asyncio Spotify Web API client. Requests go straight to the REST API over one pooled httpx.AsyncClient
+# instead of blocking spotipy calls in worker threads, so a stage can keep many requests in flight on the
+# event loop. Authorization still comes from the spotipy client (same token cache and refresh), and every
+# request follows the retry/backoff policy of spotify_api_call_with_retry under the shared rate limiter.
+SPOTIFY_API_BASE = "https://api.spotify.com/v1/"
+SAVED_TRACKS_PAGE_SIZE = 50
+PLAYLIST_PAGE_SIZE = 100
+SAVED_TRACKS_BATCH_SIZE = 50 # Max IDs per PUT /me/tracks
+PLAYLIST_BATCH_SIZE = 100 # Max URIs per playlist add/remove
+
+def async_spotify_available():
+    return httpx is not None
+
+def spotify_token_provider(sp):
+    # Blocking token getter backed by the spotipy client's auth manager (cached, refreshed when expired).
+    # force_refresh: the cached token was rejected (HTTP 401) before its expiry, so get_access_token would
+    # hand it back again; exchange the refresh token for a new one instead.
+    auth_manager = sp.auth_manager
+    def get_token(force_refresh=False):
+        if force_refresh:
+            cached = auth_manager.cache_handler.get_cached_token()
+            if cached and cached.get("refresh_token"):
+                return auth_manager.refresh_access_token(cached["refresh_token"])["access_token"]
+        return auth_manager.get_access_token(as_dict=False)
+    return get_token
+
+def _track_uri(track_id):
+    return track_id if track_id.startswith("spotify:") else f"spotify:track:{track_id}"
+
+def _batches(items, size):
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+def _spotify_exception(response):
+    # Same exception type spotipy raises, so callers handle both clients alike
+    try:
+        error = response.json().get("error")
+    except (ValueError, AttributeError):
+        error = None
+    message = error.get("message") if isinstance(error, dict) else error
+    return spotipy.SpotifyException(response.status_code, -1, f"{response.request.url}:\n {message or response.text[:200]}",
+                                    headers=dict(response.headers))
+
+async def _gather_or_cancel(coroutines):
+    # asyncio.gather that cancels the remaining requests when one fails
+    tasks = [asyncio.ensure_future(c) for c in coroutines]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks: task.cancel()
+        raise
+
+class AsyncSpotifyClient:
+    # Create inside a running event loop and use as `async with AsyncSpotifyClient(...) as client:`.
+    # max_connections bounds both the connection pool and the requests in flight; more can be awaited at
+    # once, the rest queue here instead of timing out in the pool. transport: httpx transport override (e.g.
+    # httpx.MockTransport in benchmarks/bench_async_api.py).
+    def __init__(self, token_provider, max_connections=None, verbose_flag=False, transport=None):
+        if httpx is None:
+            raise RuntimeError("The asyncio Spotify client requires the 'httpx' package (pip install httpx)")
+        self.max_connections = max_connections or APP_CONFIG.get("spotify_async_concurrency", 32)
+        self.verbose_flag = verbose_flag
+        self._token_provider = token_provider
+        self._loop = asyncio.get_running_loop()
+        self._token = None
+        self._token_lock = asyncio.Lock()
+        self._in_flight = asyncio.Semaphore(self.max_connections)
+        timeout = httpx.Timeout(APP_CONFIG.get("requests_timeout_read", 30), connect=APP_CONFIG.get("requests_timeout_connect", 10))
+        limits = httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections)
+        self._http = httpx.AsyncClient(base_url=SPOTIFY_API_BASE, timeout=timeout, limits=limits, transport=transport)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def aclose(self):
+        await self._http.aclose()
+
+    def submit(self, coroutine):
+        # For blocking code in a worker thread (e.g. a stage run with asyncio.to_thread): schedules a coroutine of
+        # this client on its event loop and returns a concurrent.futures.Future
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop)
+
+    async def _access_token(self, stale_token=None):
+        # stale_token: the token a request was rejected with (HTTP 401). Only the first caller holding it
+        # forces a refresh; the others pick up the new token.
+        async with self._token_lock:
+            if self._token is None:
+                self._token = await asyncio.to_thread(self._token_provider)
+            elif stale_token is not None and self._token == stale_token:
+                self._token = await asyncio.to_thread(self._token_provider, True)
+            return self._token
+
+    async def request(self, method, path, params=None, json=None):
+        # Returns the decoded JSON body (None if empty). Retries like spotify_api_call_with_retry: the shared
+        # rate limiter paces every attempt and absorbs HTTP 429 Retry-After; 5xx and connection errors back off
+        # exponentially; an expired token is refreshed once. Raises spotipy.SpotifyException otherwise.
+        max_retries = APP_CONFIG.get("api_max_retries", 3)
+        rate_limiter = get_spotify_rate_limiter()
+        token_refreshed = False
+        for attempt in range(max_retries):
+            wait = rate_limiter.reserve()
+            if wait > 0: await asyncio.sleep(wait)
+            token = await self._access_token()
+            try:
+                async with self._in_flight:
+                    response = await self._http.request(method, path, params=params, json=json,
+                                                        headers={"Authorization": f"Bearer {token}"})
+            except httpx.TransportError as e:
+                delay = api_retry_delay(attempt)
+                msg = f"Spotify API request failed (attempt {attempt + 1}/{max_retries}): {type(e).__name__} - {str(e)[:100]}. Retrying in {delay}s..."
+                logging.warning(msg); console.print(f"[yellow]{msg}[/yellow]")
+                if attempt < max_retries - 1:
+                    await asyncio.sleep(delay); continue
+                logging.error(f"Max retries reached for API request after {type(e).__name__}."); raise
+
+            status = response.status_code
+            if status < 400:
+                return response.json() if response.content else None
+            if status == 401 and not token_refreshed:
+                v_print(f"Spotify rejected the access token for {method} {path}; refreshing it.", self.verbose_flag)
+                token_refreshed = True
+                await self._access_token(stale_token=token)
+                continue
+
+            error = _spotify_exception(response)
+            if status == 429: # Rate limit
+                delay = api_retry_delay(attempt, response.headers.get("Retry-After"))
+                rate_limiter.rate_limited(delay)
+                msg = f"Rate limited by Spotify (HTTP 429). Attempt {attempt + 1}/{max_retries}. Retrying in {delay}s..."
+            elif status in SPOTIPY_RETRY_STATUS_CODES: # Server error
+                delay = api_retry_delay(attempt)
+                msg = f"Spotify server error (HTTP {status}). Attempt {attempt + 1}/{max_retries}. Retrying in {delay}s..."
+            else:
+                logging.error(f"Spotify API Error (HTTP {status}): {error.msg}")
+                raise error
+            logging.warning(msg); console.print(f"[yellow]{msg}[/yellow]")
+            if attempt < max_retries - 1:
+                if status != 429: await asyncio.sleep(delay) # For 429 the next reserve() waits out the Retry-After
+                continue
+            logging.error(f"Max retries reached for API request after HTTP {status}."); raise error
+        raise spotipy.SpotifyException(401, -1, f"{method} {path}: access token rejected (HTTP 401)")
+
+    # --- PAGING ---
+    async def saved_tracks_page(self, offset, limit=SAVED_TRACKS_PAGE_SIZE):
+        return await self.request("GET", "me/tracks", params={"limit": limit, "offset": offset})
+
+    async def all_saved_tracks(self, on_total=None, on_page=None, parse_page=None):
+        # Returns (items in library order, total). The first page gives the total, then every other page is
+        # requested at once. Pages that still fail after the retries do not discard the others: they are
+        # requested again one at a time, like the serial fallback of fetch_spotify_liked_tracks, and paging
+        # stops at the first one that fails again. Only the first page's error is raised. on_total(total) is
+        # called once the total is known and on_page(items) as each page arrives (e.g. to drive a progress bar).
+        # parse_page(items), if given, converts each page as it arrives; on_page and the result then get the
+        # converted items.
+        first_page = await self.saved_tracks_page(0) or {}
+        total = first_page.get("total", 0)
+        first_items = first_page.get("items") or []
+        if parse_page: first_items = parse_page(first_items)
+        if on_total: on_total(total)
+        if on_page: on_page(first_items)
+
+        async def fetch(offset):
+            items = (await self.saved_tracks_page(offset) or {}).get("items") or []
+            if parse_page: items = parse_page(items)
+            if on_page: on_page(items)
+            return items
+
+        offsets = range(SAVED_TRACKS_PAGE_SIZE, total, SAVED_TRACKS_PAGE_SIZE) if first_page.get("next") else []
+        pages = {0: first_items}
+        for offset, page in zip(offsets, await asyncio.gather(*(fetch(offset) for offset in offsets), return_exceptions=True)):
+            if isinstance(page, BaseException):
+                logging.warning(f"Concurrent fetch failed at offset {offset}: {page}. Will retry serially.")
+            else:
+                pages[offset] = page
+        for offset in offsets: # Serial paging for the pages that failed
+            if offset in pages: continue
+            try:
+                pages[offset] = await fetch(offset)
+            except Exception as e:
+                msg = f"Failed to fetch Spotify batch after retries: {e}"
+                console.print(f"[red]{msg}[/red]"); logging.error(msg, exc_info=True)
+                break
+            v_print(f"Fetched page at offset {offset} serially. Pages: {len(pages)}", self.verbose_flag)
+        return [item for offset in sorted(pages) for item in pages[offset]], total
+
+    async def playlist_items(self, playlist_id, fields=None):
+        # All items of a playlist, in playlist order. fields: Spotify field filter for the items
+        # (e.g. "items(track(id))"); "total" and "next" are always requested so the pages can be fanned out.
+        params = {"limit": PLAYLIST_PAGE_SIZE}
+        if fields: params["fields"] = f"{fields},total,next"
+        path = f"playlists/{playlist_id}/tracks"
+        first_page = await self.request("GET", path, params=dict(params, offset=0)) or {}
+        total = first_page.get("total", 0)
+
+        async def fetch(offset):
+            return (await self.request("GET", path, params=dict(params, offset=offset)) or {}).get("items") or []
+
+        offsets = range(PLAYLIST_PAGE_SIZE, total, PLAYLIST_PAGE_SIZE) if first_page.get("next") else []
+        pages = await _gather_or_cancel(fetch(offset) for offset in offsets)
+        return [item for page in [first_page.get("items") or [], *pages] for item in page]
+
+    async def search_tracks(self, query, limit=5):
+        results = await self.request("GET", "search", params={"q": query, "type": "track", "limit": limit})
+        return ((results or {}).get("tracks") or {}).get("items") or []
+
+    # --- BATCHED WRITES ---
+    async def add_to_saved_tracks(self, track_ids):
+        # Batches run concurrently: Liked Songs has no order to preserve
+        await _gather_or_cancel(self.request("PUT", "me/tracks", json={"ids": batch})
+                                for batch in _batches(list(track_ids), SAVED_TRACKS_BATCH_SIZE))
+
+    async def add_to_playlist(self, playlist_id, track_ids):
+        # Batches run one after another so the tracks are appended in the given order. Returns the last snapshot_id.
+        snapshot_id = None
+        for batch in _batches([_track_uri(t) for t in track_ids], PLAYLIST_BATCH_SIZE):
+            result = await self.request("POST", f"playlists/{playlist_id}/tracks", json={"uris": batch})
+            snapshot_id = (result or {}).get("snapshot_id", snapshot_id)
+        return snapshot_id
+
+    async def remove_from_playlist(self, playlist_id, track_ids):
+        # Removes every occurrence of each track. Returns the last snapshot_id.
+        snapshot_id = None
+        for batch in _batches([_track_uri(t) for t in track_ids], PLAYLIST_BATCH_SIZE):
+            result = await self.request("DELETE", f"playlists/{playlist_id}/tracks", json={"tracks": [{"uri": uri} for uri in batch]})
+            snapshot_id = (result or {}).get("snapshot_id", snapshot_id)
+        return snapshot_id
+
+
+async def fetch_spotify_liked_tracks_async(sp, progress, task_id, verbose_flag, liked_sync_state=None, on_page=None):
+    # Async counterpart of fetch_spotify_liked_tracks: every page after the first is requested concurrently on
+    # the event loop, bounded by spotify_async_concurrency and the shared rate limiter; pages that fail are paged
+    # again serially. on_page receives each page's track records as it arrives.
+    if not sp: return []
+    v_print("Starting Spotify library fetch (asyncio client)...", verbose_flag); logging.info("Starting Spotify library fetch (asyncio client)...")
+
+    def on_total(total):
+        msg = f"Found {total} tracks in your Spotify library."
+        console.print(Text(msg, style="deep_sky_blue1" if console.color_system else "default")); logging.info(msg)
+        progress.update(task_id, total=total, description="[green]Fetching Spotify tracks..." if total else "[green]No Spotify tracks found.")
+
+    def page_arrived(page_records):
+        progress.update(task_id, advance=len(page_records))
+        if on_page: on_page(page_records)
+
+    try:
+        async with AsyncSpotifyClient(spotify_token_provider(sp), verbose_flag=verbose_flag) as client:
+            spotify_tracks_data, total_tracks_expected = await client.all_saved_tracks(on_total=on_total, on_page=page_arrived, parse_page=build_page_records)
+    except Exception as e:
+        msg = f"Error fetching Spotify tracks with the asyncio client: {e}"
+        console.print(f"[red]{msg}[/red]"); logging.error(msg, exc_info=True)
+        progress.update(task_id, description="[red]Error fetching Spotify tracks")
+        return []
+
+    progress.update(task_id, completed=total_tracks_expected)
+    msg = f"Finished fetching. Loaded {len(spotify_tracks_data)} tracks from Spotify."
+    v_print(msg, verbose_flag); logging.info(msg)
+    update_liked_sync_state(liked_sync_state, spotify_tracks_data, total_tracks_expected)
+    return spotify_tracks_data
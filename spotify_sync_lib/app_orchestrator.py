@@ -1,22 +1,33 @@
 import argparse
 import os
 import asyncio
+import contextlib
+import queue
 from datetime import datetime
 import logging
 
 from spotify_sync_lib.config import (
     console, load_app_config, setup_logging, v_print, 
-    APP_CONFIG, DEFAULT_SESSION_FILENAME
+    APP_CONFIG, DEFAULT_SESSION_FILENAME, LEGACY_SESSION_FILENAME, DEFAULT_SCAN_CACHE_FILENAME, DEFAULT_SEARCH_CACHE_FILENAME,
+    DEFAULT_PLAYLIST_CACHE_FILENAME
 )
-from spotify_sync_lib.session_handler import save_session_data, load_session_data
+from spotify_sync_lib.session_handler import save_session_data, save_session_changes, load_session_data, complete_session_tracks, SESSION_META_KEYS
+from spotify_sync_lib.session_store import is_session_store_file
+from spotify_sync_lib.scan_cache import load_scan_cache, save_scan_cache
+from spotify_sync_lib.search_cache import load_search_cache, save_search_cache
+from spotify_sync_lib.playlist_cache import load_playlist_cache, save_playlist_cache
 from services.spotify_api import (
-    get_spotify_connection, fetch_spotify_liked_tracks, select_existing_playlist,
+    get_spotify_connection, spotify_scopes_for_run, get_current_spotify_user, fetch_spotify_liked_tracks, fetch_spotify_liked_tracks_incremental,
+    select_existing_playlist,
     create_new_playlist, 
     add_tracks_to_target_playlist, 
     clean_existing_playlist,
+    log_api_rate_limiter_metrics,
 )
-from services.local_file_scanner import scan_local_tracks 
-from core_logic.track_comparator import compare_tracks, review_uncertain_matches
+from services.spotify_async_api import async_spotify_available, fetch_spotify_liked_tracks_async, spotify_token_provider, AsyncSpotifyClient
+from services.local_file_scanner import iter_local_tracks, prefetch_track_batches 
+from core_logic.track_comparator import compare_tracks, review_uncertain_matches, match_streamed_pages
+from core_logic.match_index import build_local_track_index, index_local_track_batches
 from core_logic.orphan_processor import process_local_orphans 
 from reporting.report_generator import write_results_to_files, display_run_statistics
 
@@ -44,12 +55,26 @@ async def run_sync_process(project_root_dir):
                         help=f"Similarity threshold (0-100, config default: {APP_CONFIG['default_similarity_threshold']})")
     parser.add_argument("--review-threshold", type=int, default=APP_CONFIG["default_review_threshold"], 
                         help=f"Review threshold (0-100, config default: {APP_CONFIG['default_review_threshold']})")
+    parser.add_argument("--compare-workers", type=int, default=APP_CONFIG["compare_workers"], 
+                        help=f"Worker processes for the library comparison (1 = serial, 0 = one per CPU core; config default: {APP_CONFIG['compare_workers']})")
     parser.add_argument("-v", "--verbose", action="store_true", help="Enable verbose output")
     parser.add_argument("--session-file", type=str, 
                         default=os.path.join(project_root_dir, DEFAULT_SESSION_FILENAME), 
                         help=f"Filepath for session data (default: {DEFAULT_SESSION_FILENAME} in project dir).")
     parser.add_argument("--force-rescan", action="store_true", help="Force rescan, ignoring session file.")
+    parser.add_argument("--incremental", action="store_true", help="Reuse the session but bring Liked Songs up to date, fetching only tracks liked since the last run.")
+    parser.add_argument("--refresh-spotify", action="store_true", help="Fetch all Liked Songs again but keep reusing the session's local tracks.")
+    parser.add_argument("--refresh-local", action="store_true", help="Rescan all local directories (still using the tag cache) but keep the session's Spotify tracks.")
+    parser.add_argument("--async-api", action="store_true", help="Use the asyncio Spotify client (requires httpx) to fetch Liked Songs and to search and add orphans.")
+    parser.add_argument("--stream-compare", action="store_true", help="Compare Liked Songs page by page while they are still being fetched (full fetches only).")
+    parser.add_argument("--one-to-one", action="store_true", help="Match every local track to at most one Spotify track, choosing the best overall assignment.")
     parser.add_argument("--no-save-session", action="store_true", help="Disable saving session data.")
+    parser.add_argument("--scan-cache-file", type=str, 
+                        default=os.path.join(project_root_dir, DEFAULT_SCAN_CACHE_FILENAME), 
+                        help=f"Filepath for the per-file local tag cache (default: {DEFAULT_SCAN_CACHE_FILENAME} in project dir).")
+    parser.add_argument("--no-scan-cache", action="store_true", help="Disable the per-file local tag cache; every local file is re-tagged.")
+    parser.add_argument("--scan-workers", type=int, default=APP_CONFIG["scan_workers"], 
+                        help=f"Worker processes for local tag extraction (0 = one per CPU core, 1 = serial; config default: {APP_CONFIG['scan_workers']})")
     parser.add_argument("--dry-run", action="store_true", help="Perform a dry run; no changes made to Spotify.")
     parser.add_argument("--process-orphans", choices=['display', 'add-to-liked', 'add-to-playlist'], 
                         const='display', nargs='?', 
@@ -57,6 +82,10 @@ async def run_sync_process(project_root_dir):
     parser.add_argument("--orphan-playlist-name", type=str, 
                         default="Local Orphans Found (Script)", 
                         help="Default name for a new playlist if 'add-to-playlist' is chosen for orphans and a new playlist is created.")
+    parser.add_argument("--search-cache-file", type=str, 
+                        default=os.path.join(project_root_dir, DEFAULT_SEARCH_CACHE_FILENAME), 
+                        help=f"Filepath for the cache of orphan search results (default: {DEFAULT_SEARCH_CACHE_FILENAME} in project dir).")
+    parser.add_argument("--no-search-cache", action="store_true", help="Disable the orphan search cache; every orphan is searched on Spotify.")
     args = parser.parse_args()
 
     # Setup logging now that args.verbose is known
@@ -65,6 +94,8 @@ async def run_sync_process(project_root_dir):
     # Apply CLI args for thresholds, overriding config/script defaults
     SIMILARITY_THRESHOLD = args.threshold 
     REVIEW_THRESHOLD = args.review_threshold
+    APP_CONFIG["scan_workers"] = args.scan_workers
+    APP_CONFIG["compare_workers"] = args.compare_workers
     
     run_stats = {} 
 
@@ -80,49 +111,135 @@ async def run_sync_process(project_root_dir):
     
     spotify_tracks, local_tracks = [], []
     session_filepath = args.session_file 
+    session_meta = {}
+    loaded_session_path, partial_session = None, False
     matched_local_filepaths_set = set()
 
     if not args.force_rescan:
-        s_loaded, l_loaded = load_session_data(session_filepath)
+        session_load_path = session_filepath
+        legacy_session_path = os.path.join(project_root_dir, LEGACY_SESSION_FILENAME)
+        if session_filepath == os.path.join(project_root_dir, DEFAULT_SESSION_FILENAME) and not os.path.exists(session_filepath) and os.path.exists(legacy_session_path):
+            session_load_path = legacy_session_path # First run after the switch to SQLite: migrate the old JSON session
+            v_print(f"No session database yet; loading legacy session file {legacy_session_path}.", args.verbose)
+        # A run on the session's Liked Songs loads only the fields the comparison needs from a session database;
+        # the rest is looked up for the tracks that are reviewed, reported or searched
+        comparator_columns = not (args.refresh_spotify or args.incremental)
+        s_loaded, l_loaded, session_meta = load_session_data(session_load_path, comparator_columns)
         if s_loaded is not None and l_loaded is not None:
             spotify_tracks, local_tracks = s_loaded, l_loaded
+            loaded_session_path = session_load_path
+            partial_session = comparator_columns and is_session_store_file(session_load_path)
         else:
             v_print("Proceeding with full scan (session load failed or file not found).", args.verbose)
     else:
         msg = "Forced rescan. Ignoring any existing session file."
         console.print(f"[yellow]Info: {msg}[/yellow]"); logging.info(msg)
 
-    if not spotify_tracks or not local_tracks: 
+    # Spotify and local data are refreshed independently. Local tracks are always checked against the music
+    # directories: only directories that changed since the session was saved (and new roots) are scanned.
+    if args.refresh_spotify or not spotify_tracks:
+        spotify_mode = "full"
+    elif args.incremental:
+        spotify_mode = "incremental"
+    else:
+        spotify_mode = "session"
+    reuse_local = bool(local_tracks) and not args.refresh_local
+    session_spotify_tracks, session_local_tracks = spotify_tracks, local_tracks # As loaded, for a partial save
+    use_async_api = args.async_api and async_spotify_available()
+    if args.async_api and not use_async_api:
+        msg = "--async-api needs the 'httpx' package (pip install httpx). Using the regular Spotify client."
+        console.print(f"[yellow]Warning: {msg}[/yellow]"); logging.warning(msg)
+    next_session_meta = {key: session_meta.get(key) for key in SESSION_META_KEYS}
+
+    # Every step uses the same client, authorized once for all scopes this run may need
+    run_scopes = spotify_scopes_for_run(args.process_orphans)
+    sp_read = None
+    if spotify_mode != "session":
         # Connection for reading liked songs
-        sp_read = get_spotify_connection(scopes="user-library-read", verbose_flag=args.verbose, project_root_dir=project_root_dir)
+        sp_read = get_spotify_connection(scopes=run_scopes, verbose_flag=args.verbose, project_root_dir=project_root_dir)
         if not sp_read:
             console.print("[red]Exiting due to Spotify connection failure for reading library.[/red]")
             logging.critical("Exiting: Spotify connection failed for reading library.")
             return
 
-        with Progress(SpinnerColumn(), TextColumn("[progress.description]{task.description}"), BarColumn(), TextColumn("{task.completed} of {task.total}"), TimeElapsedColumn(), TimeRemainingColumn(), console=console, transient=False) as progress_manager:
-            spotify_fetch_task_id = progress_manager.add_task("Spotify liked init...", total=1, visible=True) 
-            local_scan_task_id = progress_manager.add_task("Local scan init...", total=1, visible=True)
-            
-            v_print("Starting concurrent data fetching...", args.verbose)
-            logging.info("Starting concurrent data fetching.")
-            
-            spotify_tracks_task = asyncio.to_thread(fetch_spotify_liked_tracks, sp_read, progress_manager, spotify_fetch_task_id, args.verbose)
-            local_tracks_task = asyncio.to_thread(scan_local_tracks, local_music_paths, progress_manager, local_scan_task_id, args.verbose)
-            
+    with Progress(SpinnerColumn(), TextColumn("[progress.description]{task.description}"), BarColumn(), TextColumn("{task.completed} of {task.total}"), TimeElapsedColumn(), TimeRemainingColumn(), console=console, transient=False) as progress_manager:
+        spotify_fetch_task_id = progress_manager.add_task("Spotify liked init...", total=1, visible=spotify_mode != "session") 
+        local_scan_task_id = progress_manager.add_task("Local scan init...", total=1, visible=True)
+        
+        v_print("Starting concurrent data fetching...", args.verbose)
+        logging.info("Starting concurrent data fetching.")
+        
+        scan_cache = None if args.no_scan_cache else load_scan_cache(args.scan_cache_file)
+        scan_stats, liked_sync_state, local_dir_state = {}, {}, {}
+        # Streaming comparison: fetched pages are queued and scored as soon as the local index exists
+        stream_compare = args.stream_compare and spotify_mode == "full"
+        page_queue = queue.Queue() if stream_compare else None
+        on_page = page_queue.put if stream_compare else None
+        if spotify_mode == "full" and use_async_api:
+            spotify_tracks_task = fetch_spotify_liked_tracks_async(sp_read, progress_manager, spotify_fetch_task_id, args.verbose, liked_sync_state, on_page)
+        elif spotify_mode == "full":
+            spotify_tracks_task = asyncio.to_thread(fetch_spotify_liked_tracks, sp_read, progress_manager, spotify_fetch_task_id, args.verbose, liked_sync_state, on_page)
+        elif spotify_mode == "incremental":
+            spotify_tracks_task = asyncio.to_thread(fetch_spotify_liked_tracks_incremental, sp_read, spotify_tracks, session_meta, progress_manager, spotify_fetch_task_id, args.verbose, liked_sync_state)
+        else:
+            spotify_tracks_task = asyncio.sleep(0, result=spotify_tracks) # Liked Songs come from the session
+        # The scan streams its tracks through a bounded buffer into the local token index, so the comparison
+        # can start as soon as the last file is tagged
+        local_scan = iter_local_tracks(local_music_paths, progress_manager, local_scan_task_id, args.verbose, scan_cache, scan_stats,
+                                       local_tracks if reuse_local else None, session_meta.get("local_dirs") if reuse_local else None, local_dir_state)
+        local_tracks_task = asyncio.to_thread(index_local_track_batches, prefetch_track_batches(local_scan), args.verbose)
+        
+        streamed_matches = None
+        if stream_compare:
+            local_tracks_task = asyncio.ensure_future(local_tracks_task) # Awaited by the gather and the streaming comparison
+            stream_task_id = progress_manager.add_task("Streaming comparison init...", total=None)
+
+            async def fetch_then_end_stream(fetch_task):
+                try:
+                    return await fetch_task
+                finally:
+                    page_queue.put(None)
+
+            async def compare_fetched_pages():
+                scanned_tracks = await local_tracks_task
+                local_index = await asyncio.to_thread(build_local_track_index, scanned_tracks if scanned_tracks is not None else local_tracks, args.verbose)
+                return await asyncio.to_thread(match_streamed_pages, local_index, page_queue, min(SIMILARITY_THRESHOLD, REVIEW_THRESHOLD),
+                                               progress_manager, stream_task_id, args.verbose,
+                                               APP_CONFIG.get("assignment_candidates_per_track", 10) if args.one_to_one else None)
+
+            fetched_s_tracks, fetched_l_tracks, streamed_matches = await asyncio.gather(
+                fetch_then_end_stream(spotify_tracks_task), local_tracks_task, compare_fetched_pages())
+        else:
             fetched_s_tracks, fetched_l_tracks = await asyncio.gather(spotify_tracks_task, local_tracks_task)
-            
-            spotify_tracks = fetched_s_tracks if fetched_s_tracks is not None else spotify_tracks
-            local_tracks = fetched_l_tracks if fetched_l_tracks is not None else local_tracks
-            
-        v_print("Finished concurrent data fetching.", args.verbose)
-        logging.info("Finished concurrent data fetching.")
+        
+        spotify_tracks = fetched_s_tracks if fetched_s_tracks is not None else spotify_tracks
+        local_tracks = fetched_l_tracks if fetched_l_tracks is not None else local_tracks
+        
+    v_print("Finished concurrent data fetching.", args.verbose)
+    logging.info("Finished concurrent data fetching.")
 
-        if not args.no_save_session and spotify_tracks and local_tracks : 
-             save_session_data(session_filepath, spotify_tracks, local_tracks)
-        elif args.no_save_session:
-            msg = "Session saving disabled by user."
-            console.print(f"[yellow]Info: {msg}[/yellow]"); logging.info(msg)
+    if scan_cache is not None and scan_stats:
+        save_scan_cache(args.scan_cache_file, scan_cache)
+        run_stats["Local Scan Cache Hits"] = scan_stats["hits"]
+        run_stats["Local Scan Cache Misses"] = scan_stats["misses"]
+    if reuse_local and scan_stats:
+        run_stats["Local Directories Reused"] = scan_stats["reused_dirs"]
+        run_stats["Local Directories Rescanned"] = scan_stats["listed_dirs"]
+
+    if spotify_mode != "session": next_session_meta.update(liked_sync_state)
+    next_session_meta["local_dirs"] = local_dir_state
+    session_changed = spotify_mode != "session" or not reuse_local or scan_stats.get("listed_dirs", 1) > 0
+    if args.no_save_session:
+        msg = "Session saving disabled by user."
+        console.print(f"[yellow]Info: {msg}[/yellow]"); logging.info(msg)
+    elif spotify_tracks and local_tracks and session_changed:
+        # Into the session database the tracks came from, only new, changed and removed tracks are written
+        if not (loaded_session_path == session_filepath and save_session_changes(
+                session_filepath, session_spotify_tracks, spotify_tracks, session_local_tracks, local_tracks, next_session_meta)):
+            if partial_session: complete_session_tracks(loaded_session_path, spotify_tracks, local_tracks) # A full save writes every field
+            save_session_data(session_filepath, spotify_tracks, local_tracks, next_session_meta)
+    elif not session_changed:
+        v_print("Session is up to date; not saving it again.", args.verbose)
 
     run_stats["Spotify Tracks Loaded"] = len(spotify_tracks)
     run_stats["Local Tracks Loaded"] = len(local_tracks)
@@ -138,8 +255,11 @@ async def run_sync_process(project_root_dir):
         initial_missing_songs, songs_for_review = compare_tracks(
             spotify_tracks, local_tracks, progress_manager, compare_task_id, 
             matched_local_filepaths_set, 
-            args.verbose, SIMILARITY_THRESHOLD, REVIEW_THRESHOLD
+            args.verbose, SIMILARITY_THRESHOLD, REVIEW_THRESHOLD, streamed_matches, args.one_to_one
         )
+    if partial_session: # Reviewed and reported tracks are shown with their album, URL and artists
+        complete_session_tracks(loaded_session_path, initial_missing_songs + [r['spotify_track'] for r in songs_for_review],
+                                [r['best_local_match'] for r in songs_for_review if r['best_local_match']])
     run_stats["Initial Missing (Spotify not in Local)"] = len(initial_missing_songs)
     run_stats["Tracks for Manual Review"] = len(songs_for_review)
     
@@ -170,8 +290,7 @@ async def run_sync_process(project_root_dir):
         
         if Confirm.ask("\nProcess playlist for these missing Spotify tracks?", default=False):
             logging.info("User opted to manage playlist for missing Spotify tracks.")
-            playlist_scopes = ["user-library-read", "playlist-modify-private", "playlist-read-private", "playlist-modify-public"]
-            sp_playlist_mgmt = get_spotify_connection(scopes=playlist_scopes, verbose_flag=args.verbose, project_root_dir=project_root_dir)
+            sp_playlist_mgmt = get_spotify_connection(scopes=run_scopes, verbose_flag=args.verbose, project_root_dir=project_root_dir)
             
             if not sp_playlist_mgmt:
                 console.print("[red]Could not get necessary permissions for playlist management. Skipping.[/red]")
@@ -179,8 +298,7 @@ async def run_sync_process(project_root_dir):
             else:
                 user_id, user_name = "", "User"
                 try:
-                    from services.spotify_api import spotify_api_call_with_retry # Already imported but to be explicit
-                    current_user_info = spotify_api_call_with_retry(lambda: sp_playlist_mgmt.current_user(), args.verbose)
+                    current_user_info = get_current_spotify_user(sp_playlist_mgmt, args.verbose)
                     if not current_user_info: raise Exception("Failed to retrieve current user for playlist operations.")
                     user_id, user_name = current_user_info['id'], current_user_info.get('display_name', 'User')
                 except Exception as e:
@@ -188,6 +306,9 @@ async def run_sync_process(project_root_dir):
                     logging.error(f"Playlist management skipped: error getting user info: {e}", exc_info=True)
                 
                 if user_id: 
+                    # Mirror of playlists read before; a playlist whose snapshot_id is unchanged is not paged again
+                    playlist_cache_file = os.path.join(project_root_dir, DEFAULT_PLAYLIST_CACHE_FILENAME)
+                    playlist_cache = load_playlist_cache(playlist_cache_file)
                     playlist_id_to_use, playlist_name_to_use = None, APP_CONFIG["default_playlist_name_template"].format("Missing", datetime.now().strftime('%Y-%m-%d'))
                     selected_existing_playlist_obj = None
 
@@ -205,7 +326,7 @@ async def run_sync_process(project_root_dir):
                                         clean_existing_playlist, sp_playlist_mgmt, playlist_id_to_use, playlist_name_to_use,
                                         local_tracks, 
                                         clean_pm, clean_task_id, args.dry_run, args.verbose,
-                                        SIMILARITY_THRESHOLD 
+                                        SIMILARITY_THRESHOLD, playlist_cache
                                     )
                                     run_stats[f"Tracks Cleaned from Playlist '{playlist_name_to_use}'"] = removed_count
                             else:
@@ -233,11 +354,13 @@ async def run_sync_process(project_root_dir):
                                 await asyncio.to_thread( 
                                     add_tracks_to_target_playlist, sp_playlist_mgmt, playlist_id_to_use, 
                                     playlist_name_to_use, missing_ids, pl_progress, add_id, 
-                                    args.dry_run, args.verbose
+                                    args.dry_run, args.verbose, playlist_cache,
+                                    {s['id']: (s['original_title'], s['original_artist'], s['album']) for s in all_missing_songs_final if s.get('id')}
                                 )
                         else:
                             console.print("  No valid Spotify track IDs for missing songs to add to playlist.")
                             logging.info("No track IDs to add to playlist for missing Spotify tracks.")
+                    save_playlist_cache(playlist_cache_file, playlist_cache)
         else:
             logging.info("User opted not to create/add to playlist for missing Spotify tracks.")
             
@@ -254,32 +377,36 @@ async def run_sync_process(project_root_dir):
             logging.info("Process orphans skipped: no local tracks loaded.")
         else:
             local_orphan_tracks = [lt for lt in local_tracks if lt['filepath'] not in matched_local_filepaths_set]
+            if partial_session: complete_session_tracks(loaded_session_path, (), local_orphan_tracks) # Searched by artist and title
             run_stats["Local Orphan Tracks Identified"] = len(local_orphan_tracks)
 
             if local_orphan_tracks:
                 console.print(Panel(f"[bold blue]Processing {len(local_orphan_tracks)} Local Orphan Tracks on Spotify[/bold blue]", expand=False))
                 
-                orphan_action_scopes = ['user-library-read'] 
-                if args.process_orphans == 'add-to-liked':
-                    orphan_action_scopes.append('user-library-modify')
-                elif args.process_orphans == 'add-to-playlist':
-                    orphan_action_scopes.extend(['playlist-read-private', 'playlist-modify-private', 'playlist-modify-public'])
-                
-                sp_orphan_processor = get_spotify_connection(scopes=orphan_action_scopes or None, verbose_flag=args.verbose, project_root_dir=project_root_dir)
+                sp_orphan_processor = get_spotify_connection(scopes=run_scopes, verbose_flag=args.verbose, project_root_dir=project_root_dir)
 
                 if sp_orphan_processor:
-                    with Progress(SpinnerColumn(),TextColumn("[progress.description]{task.description}"), BarColumn(), TextColumn("{task.completed} of {task.total}"), TimeElapsedColumn(), console=console, transient=True) as progress_manager:
-                        orphan_search_task_id = progress_manager.add_task("Orphan processing init...", total=1) 
-                        added_liked, added_pl = await asyncio.to_thread(
-                            process_local_orphans, 
-                            sp_orphan_processor, local_orphan_tracks, 
-                            progress_manager, orphan_search_task_id, 
-                            args.dry_run, args.process_orphans, 
-                            args.orphan_playlist_name, 
-                            args.verbose
-                        )
-                        run_stats["Orphans Added to Liked Songs"] = added_liked
-                        run_stats["Orphans Added to Playlist"] = added_pl
+                    search_cache = None if args.no_search_cache else load_search_cache(args.search_cache_file)
+                    search_stats = {"cached": 0, "searched": 0}
+                    async with contextlib.AsyncExitStack() as orphan_api_stack:
+                        orphan_async_client = await orphan_api_stack.enter_async_context(
+                            AsyncSpotifyClient(spotify_token_provider(sp_orphan_processor), verbose_flag=args.verbose)) if use_async_api else None
+                        with Progress(SpinnerColumn(),TextColumn("[progress.description]{task.description}"), BarColumn(), TextColumn("{task.completed} of {task.total}"), TimeElapsedColumn(), console=console, transient=True) as progress_manager:
+                            orphan_search_task_id = progress_manager.add_task("Orphan processing init...", total=1) 
+                            added_liked, added_pl = await asyncio.to_thread(
+                                process_local_orphans, 
+                                sp_orphan_processor, local_orphan_tracks, 
+                                progress_manager, orphan_search_task_id, 
+                                args.dry_run, args.process_orphans, 
+                                args.orphan_playlist_name, 
+                                args.verbose, search_cache, search_stats, orphan_async_client
+                            )
+                            run_stats["Orphans Added to Liked Songs"] = added_liked
+                            run_stats["Orphans Added to Playlist"] = added_pl
+                    run_stats["Orphan Searches From Cache"] = search_stats["cached"]
+                    run_stats["Orphan Searches Sent to Spotify"] = search_stats["searched"]
+                    if search_cache is not None and search_stats["searched"]:
+                        save_search_cache(args.search_cache_file, search_cache)
                 else:
                     console.print("[red]Could not establish Spotify connection for orphan processing. Skipping.[/red]")
                     logging.error("Orphan processing skipped: Spotify connection failed for required scopes.")
@@ -287,6 +414,7 @@ async def run_sync_process(project_root_dir):
                 console.print("[cyan]No local orphan tracks identified for processing.[/cyan]")
                 logging.info("No local orphan tracks identified after main comparison and review.")
 
+    log_api_rate_limiter_metrics(run_stats)
     display_run_statistics(run_stats, console)
     console.print(Panel("[bold VIOLET]Script finished.[/bold VIOLET]", expand=False, border_style="violet" ))
     logging.info("Script finished successfully.")
\ No newline at end of file
@@ -1,6 +1,7 @@
 import os
 import json
 import logging
+import math
 import re
 from rich.console import Console
 
@@ -9,7 +10,11 @@ from rich.console import Console
 # SCRIPT_DIR here refers to the directory of THIS config.py file.
 # For locating .env and config.json, we'll use project_root_dir.
 
-DEFAULT_SESSION_FILENAME = ".session_cache.json"
+DEFAULT_SESSION_FILENAME = ".session_cache.db"
+LEGACY_SESSION_FILENAME = ".session_cache.json" # Pre-SQLite session file, still read when no database exists yet
+DEFAULT_SCAN_CACHE_FILENAME = ".scan_cache.json"
+DEFAULT_SEARCH_CACHE_FILENAME = ".search_cache.json"
+DEFAULT_PLAYLIST_CACHE_FILENAME = ".playlist_cache.json"
 LOG_FILENAME_BASENAME = 'spotify_checker.log'
 CONFIG_FILENAME_BASENAME = "config.json"
 SPOTIFY_CACHE_BASENAME = ".spotify_user_cache"
@@ -41,7 +46,24 @@ APP_CONFIG = {
     "requests_timeout_connect": 10, # Seconds to connect
     "requests_timeout_read": 30,    # Seconds to wait for read
     "api_max_retries": 3,
-    "api_initial_retry_delay": 5 # Seconds
+    "api_initial_retry_delay": 5, # Seconds
+    "api_requests_per_second": 10, # Shared rate limit for concurrent Spotify API callers
+    "api_burst_size": 10,
+    "spotify_fetch_concurrency": 4, # Parallel Liked Songs page requests. 1 = serial paging
+    "spotify_async_concurrency": 32, # Requests in flight (and pooled connections) of the asyncio client (--async-api)
+    "orphan_search_workers": 8, # Threads searching Spotify for orphans in the background
+    "orphan_search_lookahead": 64, # How many orphans ahead of the current prompt are searched
+    "orphan_write_flush_seconds": 30, # Confirmed orphan adds are sent in batches at least this often
+    "search_cache_ttl_days": 30, # Age after which cached orphan search results are searched again
+    "search_cache_negative_ttl_days": 7, # Same for cached searches that found nothing
+    "search_cache_max_entries": 20000, # Least recently used searches beyond this are dropped on save
+    "match_candidates_top_n": 50, # Local candidates scored per Spotify track (inverted token index)
+    "assignment_candidates_per_track": 10, # Best candidate pairs per Spotify track considered by --one-to-one
+    "compare_workers": 1, # Processes used for the comparison. 1 = serial in-process, 0 = one per CPU core
+    "compare_shard_size": 500, # Spotify tracks per comparison task
+    "scan_workers": 0, # Processes used to tag local files. 0 = one per CPU core, 1 = tag serially in-thread
+    "scan_chunk_size": 200, # Files handed to a tagging worker per task
+    "scan_stream_buffer_batches": 8 # Batches of scanned tracks the scan may run ahead of the indexing stage
 }
 
 # --- LOGGING SETUP ---
@@ -66,6 +88,13 @@ def setup_logging(project_root_dir, verbose_flag=False):
 
 
 # --- CONFIG LOADING ---
+def apply_normalization_patterns(patterns_str_list):
+    # Also called by worker processes, which (with the 'spawn' start method) only see the script defaults
+    APP_CONFIG["normalization_patterns_to_remove_regex"] = [
+        re.compile(p, flags=re.IGNORECASE) for p in patterns_str_list
+    ]
+    APP_CONFIG["normalization_patterns_to_remove_str"] = patterns_str_list # Keep original strings too
+
 def load_app_config(project_root_dir):
     global APP_CONFIG # Modifying global APP_CONFIG
     
@@ -97,10 +126,7 @@ def load_app_config(project_root_dir):
     # Special handling for regex patterns
     patterns_str_list = user_config.get("normalization_patterns_to_remove_str", 
                                         APP_CONFIG["normalization_patterns_to_remove_str"])
-    APP_CONFIG["normalization_patterns_to_remove_regex"] = [
-        re.compile(p, flags=re.IGNORECASE) for p in patterns_str_list
-    ]
-    APP_CONFIG["normalization_patterns_to_remove_str"] = patterns_str_list # Keep original strings too
+    apply_normalization_patterns(patterns_str_list)
 
     # Update other keys
     for key, default_value in APP_CONFIG.items():
@@ -112,7 +138,12 @@ def load_app_config(project_root_dir):
     # Ensure numeric values are correctly typed
     for key_numeric in ["default_similarity_threshold", "default_review_threshold", 
                         "requests_timeout_connect", "requests_timeout_read", 
-                        "api_max_retries", "api_initial_retry_delay"]:
+                        "api_max_retries", "api_initial_retry_delay",
+                        "api_burst_size", "spotify_fetch_concurrency", "spotify_async_concurrency",
+                        "orphan_search_workers", "orphan_search_lookahead", "orphan_write_flush_seconds",
+                        "search_cache_ttl_days", "search_cache_negative_ttl_days", "search_cache_max_entries",
+                        "match_candidates_top_n", "assignment_candidates_per_track", "compare_workers", "compare_shard_size",
+                        "scan_workers", "scan_chunk_size", "scan_stream_buffer_batches"]:
         if key_numeric in APP_CONFIG:
             try:
                 APP_CONFIG[key_numeric] = int(APP_CONFIG[key_numeric])
@@ -120,12 +151,29 @@ def load_app_config(project_root_dir):
                 original_default = { # Re-access original defaults before modification
                     "default_similarity_threshold": 85, "default_review_threshold": 75,
                     "requests_timeout_connect": 10, "requests_timeout_read": 30,    
-                    "api_max_retries": 3, "api_initial_retry_delay": 5 
+                    "api_max_retries": 3, "api_initial_retry_delay": 5,
+                    "api_burst_size": 10, "spotify_fetch_concurrency": 4, "spotify_async_concurrency": 32,
+                    "orphan_search_workers": 8, "orphan_search_lookahead": 64, "orphan_write_flush_seconds": 30,
+                    "search_cache_ttl_days": 30, "search_cache_negative_ttl_days": 7, "search_cache_max_entries": 20000,
+                    "match_candidates_top_n": 50, "assignment_candidates_per_track": 10, "compare_workers": 1, "compare_shard_size": 500,
+                    "scan_workers": 0, "scan_chunk_size": 200, "scan_stream_buffer_batches": 8
                 }
                 console.print(f"[red]Warning: Config value for '{key_numeric}' ('{APP_CONFIG[key_numeric]}') is not a valid integer. Using script default: {original_default[key_numeric]}.[/red]")
                 logging.warning(f"Config value for '{key_numeric}' ('{APP_CONFIG[key_numeric]}') is not a valid integer. Using script default.")
                 APP_CONFIG[key_numeric] = original_default[key_numeric]
 
+    # A rate, so fractions are allowed (0.5 = one request every 2 seconds). The rate limiter paces requests at
+    # this rate, so it must be a positive number.
+    try:
+        requests_per_second = float(APP_CONFIG["api_requests_per_second"])
+    except (ValueError, TypeError):
+        requests_per_second = None
+    if requests_per_second is None or not 0 < requests_per_second < math.inf:
+        console.print(f"[red]Warning: Config value for 'api_requests_per_second' ('{APP_CONFIG['api_requests_per_second']}') must be a finite number greater than 0. Using script default: 10.[/red]")
+        logging.warning(f"Config value for 'api_requests_per_second' ('{APP_CONFIG['api_requests_per_second']}') must be a finite number greater than 0. Using script default.")
+        requests_per_second = 10
+    APP_CONFIG["api_requests_per_second"] = requests_per_second
+
 
 def v_print(message, verbose_flag):
     if verbose_flag:
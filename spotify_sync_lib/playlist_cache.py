@@ -0,0 +1,62 @@
+import json
+import logging
+import os
+from datetime import datetime
+from .config import console # Use shared console from config module
+
+# Local mirror of playlists this tool reads or edits, keyed by playlist ID:
+#   playlist_id -> {"snapshot_id": str, "tracks": [[id, name, first_artist, album], ...]}
+# Spotify changes a playlist's snapshot_id on every edit, so an entry whose snapshot_id still matches the
+# playlist's current one can stand in for paging through its items. Our own adds/removes are applied to the
+# mirror together with the snapshot_id Spotify returned for them.
+PLAYLIST_CACHE_VERSION = "1.0"
+
+def load_playlist_cache(filepath):
+    try:
+        with open(filepath, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get("version") != PLAYLIST_CACHE_VERSION:
+            msg = f"Playlist cache {filepath} has version '{data.get('version')}', expected '{PLAYLIST_CACHE_VERSION}'. Starting with an empty cache."
+            console.print(f"[yellow]{msg}[/yellow]"); logging.warning(msg)
+            return {}
+        entries = data.get("entries", {})
+        logging.info(f"Playlist cache loaded from {filepath} ({len(entries)} playlists, saved at {data.get('saved_at', 'N/A')})")
+        return entries
+    except FileNotFoundError:
+        logging.info(f"Playlist cache file {filepath} not found. Playlists will be read from Spotify.")
+    except json.JSONDecodeError:
+        msg = f"Error: Could not decode playlist cache file {filepath}. It might be corrupted. Starting with an empty cache."
+        console.print(f"[red]{msg}[/red]"); logging.error(msg)
+    except Exception as e:
+        msg = f"Error loading playlist cache from {filepath}: {e}"
+        console.print(f"[red]{msg}[/red]"); logging.error(msg, exc_info=True)
+    return {}
+
+def save_playlist_cache(filepath, entries):
+    data_to_save = {
+        "entries": entries,
+        "saved_at": datetime.now().isoformat(),
+        "version": PLAYLIST_CACHE_VERSION
+    }
+    tmp_filepath = filepath + ".tmp"
+    try:
+        with open(tmp_filepath, 'w', encoding='utf-8') as f:
+            json.dump(data_to_save, f, separators=(',', ':'))
+        os.replace(tmp_filepath, filepath) # Atomic swap so an interrupted save never corrupts the previous cache
+        logging.info(f"Playlist cache saved to {filepath} ({len(entries)} playlists)")
+    except Exception as e:
+        msg = f"Error saving playlist cache to {filepath}: {e}"
+        console.print(f"[red]{msg}[/red]"); logging.error(msg, exc_info=True)
+
+def update_playlist_cache(entries, playlist_id, snapshot_id, added_tracks=None, removed_ids=None):
+    # Applies our own edit to the mirror. added_tracks: [id, name, first_artist, album] rows, or None when
+    # their details are unknown. Without a new snapshot_id or the added details, the entry is dropped and
+    # re-read on next use.
+    if entries is None or playlist_id not in entries: return
+    if not snapshot_id or added_tracks is None:
+        del entries[playlist_id]
+        return
+    entry = entries[playlist_id]
+    removed = set(removed_ids or ())
+    entry["tracks"] = [t for t in entry["tracks"] if t[0] not in removed] + [list(t) for t in added_tracks]
+    entry["snapshot_id"] = snapshot_id
@@ -0,0 +1,71 @@
+import json
+import logging
+import os
+from datetime import datetime
+from .config import console # Use shared console from config module
+
+# Entries are stored compactly as lists to keep the cache file small on big libraries:
+#   filepath -> [size, mtime_ns, title, artist, album]  (tagged file)
+#   filepath -> [size, mtime_ns]                        (file without usable title/artist tags)
+SCAN_CACHE_VERSION = "1.0"
+
+def load_scan_cache(filepath):
+    try:
+        with open(filepath, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get("version") != SCAN_CACHE_VERSION:
+            msg = f"Scan cache {filepath} has version '{data.get('version')}', expected '{SCAN_CACHE_VERSION}'. Starting with an empty cache."
+            console.print(f"[yellow]{msg}[/yellow]"); logging.warning(msg)
+            return {}
+        entries = data.get("entries", {})
+        msg = f"Scan cache loaded from {filepath} ({len(entries)} entries, saved at {data.get('saved_at', 'N/A')})"
+        console.print(f"[green]{msg}[/green]"); logging.info(msg)
+        return entries
+    except FileNotFoundError:
+        msg = f"Info: Scan cache file {filepath} not found. All local files will be tagged."
+        console.print(f"[yellow]{msg}[/yellow]"); logging.info(msg)
+    except json.JSONDecodeError:
+        msg = f"Error: Could not decode scan cache file {filepath}. It might be corrupted. Starting with an empty cache."
+        console.print(f"[red]{msg}[/red]"); logging.error(msg)
+    except Exception as e:
+        msg = f"Error loading scan cache from {filepath}: {e}"
+        console.print(f"[red]{msg}[/red]"); logging.error(msg, exc_info=True)
+    return {}
+
+def save_scan_cache(filepath, entries):
+    data_to_save = {
+        "entries": entries,
+        "saved_at": datetime.now().isoformat(),
+        "version": SCAN_CACHE_VERSION
+    }
+    tmp_filepath = filepath + ".tmp"
+    try:
+        with open(tmp_filepath, 'w', encoding='utf-8') as f:
+            json.dump(data_to_save, f, separators=(',', ':'))
+        os.replace(tmp_filepath, filepath) # Atomic swap so an interrupted save never corrupts the previous cache
+        msg = f"Scan cache saved to {filepath} ({len(entries)} entries)"
+        console.print(f"[green]{msg}[/green]"); logging.info(msg)
+    except Exception as e:
+        msg = f"Error saving scan cache to {filepath}: {e}"
+        console.print(f"[red]{msg}[/red]"); logging.error(msg, exc_info=True)
+
+def lookup_scan_cache(entries, filepath, size, mtime_ns):
+    # Returns (hit, tags). tags is (title, artist, album), or None for a cached untagged file.
+    entry = entries.get(filepath)
+    if entry is None or entry[0] != size or entry[1] != mtime_ns:
+        return False, None
+    if len(entry) < 5:
+        return True, None
+    return True, (entry[2], entry[3], entry[4])
+
+def store_scan_cache(entries, filepath, size, mtime_ns, tags):
+    entries[filepath] = [size, mtime_ns, *tags] if tags else [size, mtime_ns]
+
+def prune_scan_cache(entries, scanned_roots, seen_filepaths):
+    # Drops entries under the scanned roots that were not seen in the latest walk (deleted/moved files).
+    # Entries of directories not scanned in this run are kept.
+    root_prefixes = tuple(os.path.join(root, '') for root in scanned_roots)
+    stale = [fp for fp in entries if fp not in seen_filepaths and fp.startswith(root_prefixes)]
+    for fp in stale:
+        del entries[fp]
+    return len(stale)
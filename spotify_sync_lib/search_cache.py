@@ -0,0 +1,98 @@
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from .config import console, APP_CONFIG # Use shared console from config module
+
+# Spotify track search results, keyed by the normalized query string. Entries are compact lists:
+#   query -> [stored_at, [[title, artist, album, url, id], ...]]
+# An empty hit list is a cached "no results" answer. Those expire sooner (search_cache_negative_ttl_days)
+# than real hits (search_cache_ttl_days), since new releases can turn them into hits. Dict order doubles
+# as recency: a hit moves its entry to the end, so trimming to search_cache_max_entries drops the least
+# recently used queries first.
+SEARCH_CACHE_VERSION = "1.0"
+SEARCH_HIT_FIELDS = ("title", "artist", "album", "url", "id")
+_search_cache_lock = threading.Lock() # Orphan searches run on several threads
+
+def search_cache_key(query):
+    return " ".join(query.lower().split())
+
+def load_search_cache(filepath):
+    try:
+        with open(filepath, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get("version") != SEARCH_CACHE_VERSION:
+            msg = f"Search cache {filepath} has version '{data.get('version')}', expected '{SEARCH_CACHE_VERSION}'. Starting with an empty cache."
+            console.print(f"[yellow]{msg}[/yellow]"); logging.warning(msg)
+            return {}
+        entries = data.get("entries", {})
+        dropped = prune_search_cache(entries)
+        msg = f"Search cache loaded from {filepath} ({len(entries)} entries, {dropped} expired or evicted, saved at {data.get('saved_at', 'N/A')})"
+        console.print(f"[green]{msg}[/green]"); logging.info(msg)
+        return entries
+    except FileNotFoundError:
+        msg = f"Info: Search cache file {filepath} not found. Orphans will be searched on Spotify."
+        console.print(f"[yellow]{msg}[/yellow]"); logging.info(msg)
+    except json.JSONDecodeError:
+        msg = f"Error: Could not decode search cache file {filepath}. It might be corrupted. Starting with an empty cache."
+        console.print(f"[red]{msg}[/red]"); logging.error(msg)
+    except Exception as e:
+        msg = f"Error loading search cache from {filepath}: {e}"
+        console.print(f"[red]{msg}[/red]"); logging.error(msg, exc_info=True)
+    return {}
+
+def save_search_cache(filepath, entries):
+    with _search_cache_lock:
+        prune_search_cache(entries)
+        data_to_save = {
+            "entries": entries,
+            "saved_at": datetime.now().isoformat(),
+            "version": SEARCH_CACHE_VERSION
+        }
+        tmp_filepath = filepath + ".tmp"
+        try:
+            with open(tmp_filepath, 'w', encoding='utf-8') as f:
+                json.dump(data_to_save, f, separators=(',', ':'))
+            os.replace(tmp_filepath, filepath) # Atomic swap so an interrupted save never corrupts the previous cache
+            msg = f"Search cache saved to {filepath} ({len(entries)} entries)"
+            console.print(f"[green]{msg}[/green]"); logging.info(msg)
+        except Exception as e:
+            msg = f"Error saving search cache to {filepath}: {e}"
+            console.print(f"[red]{msg}[/red]"); logging.error(msg, exc_info=True)
+
+def _is_expired(entry, now):
+    ttl_days = APP_CONFIG.get("search_cache_ttl_days", 30) if entry[1] else APP_CONFIG.get("search_cache_negative_ttl_days", 7)
+    return now - entry[0] > ttl_days * 86400
+
+def lookup_search_cache(entries, query):
+    # Returns (hit, spotify_hits); spotify_hits is a list of hit dicts, empty for a cached "no results"
+    key = search_cache_key(query)
+    with _search_cache_lock:
+        entry = entries.get(key)
+        if entry is None:
+            return False, None
+        if _is_expired(entry, time.time()):
+            del entries[key]
+            return False, None
+        entries[key] = entries.pop(key) # Most recently used last
+    return True, [dict(zip(SEARCH_HIT_FIELDS, hit)) for hit in entry[1]]
+
+def store_search_cache(entries, query, spotify_hits):
+    key = search_cache_key(query)
+    with _search_cache_lock:
+        entries.pop(key, None)
+        entries[key] = [int(time.time()), [[hit[field] for field in SEARCH_HIT_FIELDS] for hit in spotify_hits]]
+
+def prune_search_cache(entries):
+    # Drops expired entries, then the least recently used ones beyond search_cache_max_entries.
+    # Returns how many entries were removed.
+    now = time.time()
+    stale = [key for key, entry in entries.items() if _is_expired(entry, now)]
+    for key in stale:
+        del entries[key]
+    overflow = max(0, len(entries) - APP_CONFIG.get("search_cache_max_entries", 20000))
+    for key in list(entries)[:overflow]:
+        del entries[key]
+    return len(stale) + overflow
@@ -1,25 +1,148 @@
 import json
 import logging
+import sqlite3
+from contextlib import closing
 from datetime import datetime
 from .config import console # Use shared console from config module
+from .session_store import (SESSION_STORE_VERSION, SPOTIFY_COLUMNS, LOCAL_COLUMNS, COMPARATOR_SPOTIFY_COLUMNS, COMPARATOR_LOCAL_COLUMNS,
+                            is_session_store_file, open_session_store, save_session_store, load_session_store, write_session_meta,
+                            prepend_spotify_tracks, upsert_spotify_tracks, delete_spotify_tracks, upsert_local_tracks, delete_local_tracks,
+                            lookup_spotify_tracks, lookup_local_tracks)
+from .track_records import track_record_to_json, as_spotify_tracks, as_local_tracks
+from .session_pack import PACK_VERSION, is_session_pack_path, is_session_pack_file, save_session_pack, load_session_pack
 
-def save_session_data(filepath, spotify_tracks, local_tracks):
+# Incremental Liked Songs sync state, and the directory state of the local scan (dirpath -> [mtime_ns, subdir names])
+SESSION_META_KEYS = ("liked_watermark", "liked_total", "local_dirs")
+
+# Sessions are stored in an indexed SQLite database (see session_store). Paths ending in ".pack",
+# ".pack.gz" or ".pack.zst" use the compact, lazily decoded binary format (see session_pack), and paths
+# ending in ".json" the legacy single-file JSON format. All three are detected on load.
+def save_session_data(filepath, spotify_tracks, local_tracks, session_meta=None):
+    if is_session_pack_path(filepath):
+        return _save_session_backend(save_session_pack, f"pack-{PACK_VERSION}", filepath, spotify_tracks, local_tracks, session_meta)
+    if not str(filepath).lower().endswith(".json"):
+        return _save_session_backend(save_session_store, SESSION_STORE_VERSION, filepath, spotify_tracks, local_tracks, session_meta)
     data_to_save = {
         "spotify_tracks": spotify_tracks,
         "local_tracks": local_tracks,
         "saved_at": datetime.now().isoformat(),
-        "version": "1.0" # Second version. First version with modular structure
+        "version": "1.1" # 1.1 adds Spotify 'added_at' and the incremental sync watermark
     }
+    for key in SESSION_META_KEYS:
+        if session_meta and session_meta.get(key) is not None:
+            data_to_save[key] = session_meta[key]
     try:
         with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(data_to_save, f, indent=2)
+            json.dump(data_to_save, f, indent=2, default=track_record_to_json)
         msg = f"Session data saved to {filepath}"
         console.print(f"[green]{msg}[/green]"); logging.info(msg)
     except Exception as e:
         msg = f"Error saving session data to {filepath}: {e}"
         console.print(f"[red]{msg}[/red]"); logging.error(msg, exc_info=True)
 
-def load_session_data(filepath):
+def save_session_changes(filepath, previous_spotify_tracks, spotify_tracks, previous_local_tracks, local_tracks, session_meta=None):
+    # Partial save into the session database the previous_* tracks were loaded from: only new, changed and
+    # removed tracks are written, in one transaction. Returns False if that is not possible (not a session
+    # database, Liked Songs reordered other than new tracks on top, or the write failed); the caller then
+    # saves the full session.
+    if is_session_pack_path(filepath) or str(filepath).lower().endswith(".json") or not is_session_store_file(filepath):
+        return False
+    spotify_changes = _spotify_changes(previous_spotify_tracks, spotify_tracks)
+    if spotify_changes is None:
+        return False
+    spotify_prepend, spotify_updates, spotify_deletes = spotify_changes
+    local_upserts, local_deletes = _local_changes(previous_local_tracks, local_tracks)
+
+    def write_changes(path, _spotify_tracks, _local_tracks, meta):
+        with closing(open_session_store(path)) as conn, conn:
+            delete_spotify_tracks(conn, spotify_deletes)
+            upsert_spotify_tracks(conn, spotify_updates)
+            prepend_spotify_tracks(conn, spotify_prepend)
+            delete_local_tracks(conn, local_deletes)
+            upsert_local_tracks(conn, local_upserts)
+            write_session_meta(conn, meta)
+        logging.info(f"Session changes: Spotify {len(spotify_prepend)} new, {len(spotify_updates)} updated, {len(spotify_deletes)} removed; "
+                     f"local {len(local_upserts)} new or updated, {len(local_deletes)} removed.")
+    return _save_session_backend(write_changes, SESSION_STORE_VERSION, filepath, spotify_tracks, local_tracks, session_meta)
+
+def _stored_values(track, columns):
+    # version_keywords is derived from the title and filled in lazily, so it does not count as a change
+    return [track.get(col) for col in columns if col != "version_keywords"]
+
+def _spotify_changes(previous_tracks, tracks):
+    # (tracks to put on top, tracks to update in place, ids to delete) turning previous_tracks into tracks, or
+    # None if tracks is not previous_tracks with some removed and new or re-liked ones on top (how Liked Songs change)
+    if tracks is previous_tracks:
+        return [], [], []
+    current_ids = {t['id'] for t in tracks}
+    i, j, updates = len(tracks) - 1, len(previous_tracks) - 1, []
+    while i >= 0 and j >= 0: # Match the unchanged order from the end
+        previous = previous_tracks[j]
+        if previous['id'] not in current_ids:
+            j -= 1; continue
+        track = tracks[i]
+        if track['id'] != previous['id']: break
+        if track is not previous and _stored_values(track, SPOTIFY_COLUMNS) != _stored_values(previous, SPOTIFY_COLUMNS):
+            updates.append(track)
+        i -= 1; j -= 1
+    prepend = tracks[:i + 1]
+    prepend_ids = {t['id'] for t in prepend}
+    if any(t['id'] in current_ids and t['id'] not in prepend_ids for t in previous_tracks[:j + 1]):
+        return None
+    return prepend, updates, [t['id'] for t in previous_tracks if t['id'] not in current_ids]
+
+def _local_changes(previous_tracks, tracks):
+    # (new or changed tracks, removed filepaths). Tracks of unchanged directories are the loaded records themselves.
+    if tracks is previous_tracks: return [], [] # Every directory reused (possibly still undecoded)
+    previous_by_path = {t['filepath']: t for t in previous_tracks}
+    upserts = []
+    for track in tracks:
+        previous = previous_by_path.get(track['filepath'])
+        if previous is not track and (previous is None or _stored_values(track, LOCAL_COLUMNS) != _stored_values(previous, LOCAL_COLUMNS)):
+            upserts.append(track)
+    current_paths = {t['filepath'] for t in tracks}
+    return upserts, [path for path in previous_by_path if path not in current_paths]
+
+def complete_session_tracks(filepath, spotify_tracks=(), local_tracks=()):
+    # Fills in the fields a load_session_data(..., comparator_columns=True) left out, for just the given tracks
+    # (those about to be reviewed, reported, searched or fully saved). Tracks not in the database are left as they are.
+    try:
+        for tracks, lookup, key, columns, loaded_columns in ((spotify_tracks, lookup_spotify_tracks, 'id', SPOTIFY_COLUMNS, COMPARATOR_SPOTIFY_COLUMNS),
+                                                              (local_tracks, lookup_local_tracks, 'filepath', LOCAL_COLUMNS, COMPARATOR_LOCAL_COLUMNS)):
+            if not tracks: continue
+            missing_columns = [col for col in columns if col not in loaded_columns]
+            stored = lookup(filepath, [t[key] for t in tracks], (key, *missing_columns))
+            for track in tracks:
+                record = stored.get(track[key])
+                if record is None: continue
+                for col in missing_columns:
+                    if track.get(col) is None: track[col] = record[col]
+    except sqlite3.Error as e:
+        msg = f"Error reading track details from session database {filepath}: {e}"
+        console.print(f"[red]{msg}[/red]"); logging.error(msg, exc_info=True)
+
+def _save_session_backend(save_func, version, filepath, spotify_tracks, local_tracks, session_meta):
+    meta_to_save = {key: session_meta.get(key) for key in SESSION_META_KEYS} if session_meta else {}
+    meta_to_save.update({"saved_at": datetime.now().isoformat(), "version": version})
+    try:
+        save_func(filepath, spotify_tracks, local_tracks, meta_to_save)
+        msg = f"Session data saved to {filepath}"
+        console.print(f"[green]{msg}[/green]"); logging.info(msg)
+        return True
+    except Exception as e:
+        msg = f"Error saving session data to {filepath}: {e}"
+        console.print(f"[red]{msg}[/red]"); logging.error(msg, exc_info=True)
+        return False
+
+def load_session_data(filepath, comparator_columns=False):
+    # comparator_columns: from a session database, load only COMPARATOR_*_COLUMNS (fill in the rest for
+    # the tracks that need it with complete_session_tracks). Other formats always load every field.
+    if is_session_store_file(filepath):
+        if comparator_columns:
+            return _load_session_backend(lambda path: load_session_store(path, COMPARATOR_SPOTIFY_COLUMNS, COMPARATOR_LOCAL_COLUMNS), filepath)
+        return _load_session_backend(load_session_store, filepath)
+    if is_session_pack_file(filepath):
+        return _load_session_backend(load_session_pack, filepath)
     try:
         with open(filepath, 'r', encoding='utf-8') as f:
             data = json.load(f)
@@ -31,7 +154,9 @@ def load_session_data(filepath):
 
         msg = f"Session data loaded from {filepath} (saved at {data.get('saved_at', 'N/A')})"
         console.print(f"[green]{msg}[/green]"); logging.info(msg)
-        return data.get("spotify_tracks"), data.get("local_tracks")
+        session_meta = {key: data.get(key) for key in SESSION_META_KEYS}
+        session_meta["saved_at"] = data.get("saved_at")
+        return as_spotify_tracks(data.get("spotify_tracks")), as_local_tracks(data.get("local_tracks")), session_meta
     except FileNotFoundError:
         msg = f"Info: Session file {filepath} not found."
         # This is not an error if it's the first run, so use info level.
@@ -42,4 +167,20 @@ def load_session_data(filepath):
     except Exception as e:
         msg = f"Error loading session data from {filepath}: {e}"
         console.print(f"[red]{msg}[/red]"); logging.error(msg, exc_info=True)
-    return None, None
\ No newline at end of file
+    return None, None, {}
+
+def _load_session_backend(load_func, filepath):
+    try:
+        spotify_tracks, local_tracks, stored_meta = load_func(filepath)
+        msg = f"Session data loaded from {filepath} (saved at {stored_meta.get('saved_at', 'N/A')})"
+        console.print(f"[green]{msg}[/green]"); logging.info(msg)
+        session_meta = {key: stored_meta.get(key) for key in SESSION_META_KEYS}
+        session_meta["saved_at"] = stored_meta.get("saved_at")
+        return spotify_tracks, local_tracks, session_meta
+    except sqlite3.DatabaseError as e:
+        msg = f"Error: Could not read session database {filepath}. It might be corrupted ({e})."
+        console.print(f"[red]{msg}[/red]"); logging.error(msg)
+    except Exception as e:
+        msg = f"Error loading session data from {filepath}: {e}"
+        console.print(f"[red]{msg}[/red]"); logging.error(msg, exc_info=True)
+    return None, None, {}
@@ -0,0 +1,241 @@
+import gzip
+import json
+import mmap
+import os
+import struct
+import sys
+import weakref
+from array import array
+from collections.abc import Sequence
+
+from .session_store import SPOTIFY_COLUMNS, LOCAL_COLUMNS, encode_track_value, decode_track_value
+from .track_records import SpotifyTrack, LocalTrack
+
+try:
+    import zstandard # Optional: only needed for ".pack.zst" sessions
+except ImportError:
+    zstandard = None
+
+# Compact binary session format ("pack"). Every distinct string (titles, artists, albums, paths, ...)
+# is stored once in a string table; tracks are fixed-width rows of uint32 indices into that table, so
+# repeated artist/album names cost 4 bytes per track and row i can be found without scanning.
+#
+# Layout (little-endian, sections 8-byte aligned):
+#   header   PACK_HEADER, see below
+#   meta     JSON: session metadata and the column names of both track tables
+#   strings  uint32 end offsets (one per string) followed by the UTF-8 blob
+#   spotify  n_spotify rows of len(spotify_columns) uint32 string indices
+#   local    n_local rows of len(local_columns) uint32 string indices
+#
+# Uncompressed files are memory-mapped and decoded lazily: loading only reads the header and meta, and
+# a track record is built when it is first accessed. ".pack.gz" / ".pack.zst" files are decompressed into
+# memory first and then read the same way. Before a mapped file is replaced by a save, its image is copied
+# into memory and the mapping closed (Windows refuses to replace a mapped file).
+PACK_MAGIC = b"SSPK"
+PACK_VERSION = 1
+PACK_HEADER = struct.Struct("<4sHHIIIIQQQQ")
+NONE_INDEX = 0xFFFFFFFF
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+PACK_EXTENSIONS = (".pack", ".pack.gz", ".pack.zst")
+
+def is_session_pack_path(filepath):
+    return str(filepath).lower().endswith(PACK_EXTENSIONS)
+
+def is_session_pack_file(filepath):
+    try:
+        with open(filepath, 'rb') as f:
+            head = f.read(len(PACK_MAGIC))
+    except OSError:
+        return False
+    return head == PACK_MAGIC or (is_session_pack_path(filepath) and (head[:2] == GZIP_MAGIC or head == ZSTD_MAGIC))
+
+def _align(offset):
+    return (offset + 7) & ~7
+
+def _uint32_array(values):
+    arr = array('I', values)
+    if sys.byteorder != 'little': arr.byteswap()
+    return arr.tobytes()
+
+# --- WRITE ---
+def encode_session_pack(spotify_tracks, local_tracks, session_meta):
+    string_ids = {}
+    string_list = []
+    def intern(value):
+        if value is None:
+            return NONE_INDEX
+        value = value if isinstance(value, str) else str(value)
+        idx = string_ids.get(value)
+        if idx is None:
+            idx = string_ids[value] = len(string_list)
+            string_list.append(value)
+        return idx
+
+    spotify_rows = [intern(encode_track_value(col, t.get(col))) for t in spotify_tracks for col in SPOTIFY_COLUMNS]
+    local_rows = [intern(encode_track_value(col, t.get(col))) for t in local_tracks for col in LOCAL_COLUMNS]
+
+    encoded_strings = [s.encode('utf-8', 'surrogatepass') for s in string_list] # Paths may carry surrogate escapes
+    ends, total = [], 0
+    for b in encoded_strings:
+        total += len(b)
+        ends.append(total)
+    meta_bytes = json.dumps({"session_meta": session_meta, "spotify_columns": SPOTIFY_COLUMNS,
+                             "local_columns": LOCAL_COLUMNS}).encode('utf-8')
+
+    sections = [meta_bytes, _uint32_array(ends) + b"".join(encoded_strings), _uint32_array(spotify_rows), _uint32_array(local_rows)]
+    positions, offset = [], PACK_HEADER.size
+    for section in sections:
+        offset = _align(offset)
+        positions.append(offset)
+        offset += len(section)
+    header = PACK_HEADER.pack(PACK_MAGIC, PACK_VERSION, 0, len(meta_bytes), len(string_list),
+                              len(spotify_tracks), len(local_tracks), *positions)
+    out = bytearray(header)
+    for position, section in zip(positions, sections):
+        out.extend(b"\x00" * (position - len(out)))
+        out.extend(section)
+    return bytes(out)
+
+def save_session_pack(filepath, spotify_tracks, local_tracks, session_meta):
+    data = encode_session_pack(spotify_tracks, local_tracks, session_meta)
+    lower_path = str(filepath).lower()
+    if lower_path.endswith(".gz"):
+        data = gzip.compress(data, compresslevel=6)
+    elif lower_path.endswith(".zst"):
+        if zstandard is None:
+            raise RuntimeError("Writing a .zst session requires the 'zstandard' package (pip install zstandard)")
+        data = zstandard.ZstdCompressor(level=3).compress(data)
+    tmp_filepath = str(filepath) + ".tmp"
+    with open(tmp_filepath, 'wb') as f:
+        f.write(data)
+    release_mapped_session_packs(filepath) # After encoding, which may read the tracks from that mapping
+    os.replace(tmp_filepath, filepath) # Atomic swap
+
+def release_mapped_session_packs(filepath):
+    # Detaches every loaded pack that has filepath mapped, so the file can be replaced or deleted
+    target = os.path.abspath(filepath)
+    for pack in list(_mapped_packs):
+        if pack.filepath == target:
+            pack.release_file()
+
+# --- READ ---
+_mapped_packs = weakref.WeakSet() # SessionPacks currently backed by a file mapping
+
+class SessionPack:
+    # Read-only access to a pack image (mmap or bytes). Strings are decoded on first use and the decoded
+    # object is shared by every track that references it.
+    def __init__(self, buffer, filepath=None):
+        self.filepath = os.path.abspath(filepath) if filepath is not None else None
+        self._open(buffer)
+        if isinstance(buffer, mmap.mmap): _mapped_packs.add(self)
+
+    def _open(self, buffer):
+        self._buffer = buffer
+        view = memoryview(buffer)
+        (magic, version, _, meta_len, n_strings, self.n_spotify, self.n_local,
+         meta_pos, strings_pos, spotify_pos, local_pos) = PACK_HEADER.unpack_from(view, 0)
+        if magic != PACK_MAGIC:
+            raise ValueError("not a session pack file")
+        if version != PACK_VERSION:
+            raise ValueError(f"unsupported session pack version {version}")
+        meta = json.loads(bytes(view[meta_pos:meta_pos + meta_len]))
+        self.session_meta = meta.get("session_meta") or {}
+        self.spotify_columns = tuple(meta["spotify_columns"])
+        self.local_columns = tuple(meta["local_columns"])
+        self._string_ends = self._uint32_view(view, strings_pos, n_strings)
+        self._blob_pos = strings_pos + 4 * n_strings
+        self._view = view
+        self._strings = [None] * n_strings
+        self.spotify_rows = self._uint32_view(view, spotify_pos, self.n_spotify * len(self.spotify_columns))
+        self.local_rows = self._uint32_view(view, local_pos, self.n_local * len(self.local_columns))
+
+    def release_file(self):
+        # Copies the mapped image into memory and closes the mapping; decoded strings are kept
+        mapped = self._buffer
+        if not isinstance(mapped, mmap.mmap) or mapped.closed:
+            return
+        strings = self._strings
+        for view in (self._string_ends, self.spotify_rows, self.local_rows, self._view):
+            if isinstance(view, memoryview): view.release()
+        self._open(bytes(mapped))
+        self._strings = strings
+        mapped.close()
+        _mapped_packs.discard(self)
+
+    @staticmethod
+    def _uint32_view(view, position, count):
+        section = view[position:position + 4 * count]
+        if sys.byteorder == 'little':
+            return section.cast('I') # Zero-copy
+        arr = array('I', section)
+        arr.byteswap()
+        return arr
+
+    def string(self, idx):
+        if idx == NONE_INDEX:
+            return None
+        value = self._strings[idx]
+        if value is None:
+            start = self._string_ends[idx - 1] if idx else 0
+            value = self._strings[idx] = str(self._view[self._blob_pos + start:self._blob_pos + self._string_ends[idx]], 'utf-8', 'surrogatepass')
+        return value
+
+
+class PackedTrackList(Sequence):
+    # Lazy list of track records backed by one table ("spotify" or "local") of a SessionPack. A record is
+    # built on first access and then kept, so changes to it (e.g. a review decision) persist; the list itself
+    # cannot be resized. column() reads the stored values, not those changes.
+    def __init__(self, pack, table, columns, length, record_type):
+        self._pack = pack
+        self._record_type = record_type
+        self._rows_attr = f"{table}_rows" # Looked up on use: release_file() replaces the pack's row views
+        self.columns = columns
+        self._width = len(columns)
+        self._length = length
+        self._records = [None] * length
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._length))]
+        if index < 0: index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("track index out of range")
+        record = self._records[index]
+        if record is None:
+            base = index * self._width
+            string, rows = self._pack.string, getattr(self._pack, self._rows_attr)
+            record = self._records[index] = self._record_type(**{col: decode_track_value(col, string(rows[base + i])) for i, col in enumerate(self.columns)})
+        return record
+
+    def __iter__(self):
+        for index in range(self._length):
+            yield self[index]
+
+    def column(self, name):
+        # All values of one field without building the track records (e.g. norm_title for the match index)
+        offset = self.columns.index(name)
+        string = self._pack.string
+        return [decode_track_value(name, string(idx)) for idx in getattr(self._pack, self._rows_attr)[offset::self._width]]
+
+
+def load_session_pack(filepath):
+    # Returns (spotify_tracks, local_tracks, session_meta); the track lists are PackedTrackList views
+    with open(filepath, 'rb') as f:
+        head = f.read(len(PACK_MAGIC))
+        f.seek(0)
+        if head[:2] == GZIP_MAGIC:
+            buffer = gzip.decompress(f.read())
+        elif head == ZSTD_MAGIC:
+            if zstandard is None:
+                raise RuntimeError("Reading a .zst session requires the 'zstandard' package (pip install zstandard)")
+            buffer = zstandard.ZstdDecompressor().decompress(f.read())
+        else:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) # Stays valid after the file is closed
+    pack = SessionPack(buffer, filepath)
+    spotify_tracks = PackedTrackList(pack, "spotify", pack.spotify_columns, pack.n_spotify, SpotifyTrack)
+    local_tracks = PackedTrackList(pack, "local", pack.local_columns, pack.n_local, LocalTrack)
+    return spotify_tracks, local_tracks, pack.session_meta
@@ -0,0 +1,160 @@
+import json
+import sqlite3
+from contextlib import closing
+
+from .track_records import SpotifyTrack, LocalTrack
+
+# Indexed SQLite session store. Spotify tracks, local tracks and run metadata live in separate tables,
+# so a run can write only the tracks that changed, look tracks up by ID or filepath, and load only the
+# columns the comparison needs. Functions raise sqlite3.Error; session_handler reports errors to the user.
+SESSION_STORE_VERSION = "2.0"
+SQLITE_HEADER = b"SQLite format 3\x00"
+
+SPOTIFY_COLUMNS = ("id", "original_title", "original_artist", "all_artists_str", "album",
+                   "norm_title", "norm_artist", "version_keywords", "url", "added_at")
+LOCAL_COLUMNS = ("filepath", "original_title", "original_artist", "album",
+                 "norm_title", "norm_artist", "version_keywords")
+# What matching, the playlist clean and matched tracks need; the display-only fields are looked up for the
+# tracks that get reviewed, reported or searched (see session_handler.complete_session_tracks)
+COMPARATOR_SPOTIFY_COLUMNS = ("id", "original_title", "original_artist", "norm_title", "norm_artist", "version_keywords")
+COMPARATOR_LOCAL_COLUMNS = ("filepath", "original_title", "norm_title", "norm_artist", "version_keywords")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS run_meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS spotify_tracks (
+    id TEXT PRIMARY KEY, position INTEGER NOT NULL,
+    original_title TEXT, original_artist TEXT, all_artists_str TEXT, album TEXT,
+    norm_title TEXT, norm_artist TEXT, version_keywords TEXT, url TEXT, added_at TEXT
+);
+CREATE INDEX IF NOT EXISTS spotify_tracks_position ON spotify_tracks(position);
+CREATE TABLE IF NOT EXISTS local_tracks (
+    filepath TEXT PRIMARY KEY, position INTEGER NOT NULL,
+    original_title TEXT, original_artist TEXT, album TEXT,
+    norm_title TEXT, norm_artist TEXT, version_keywords TEXT
+);
+CREATE INDEX IF NOT EXISTS local_tracks_position ON local_tracks(position);
+"""
+
+def is_session_store_file(filepath):
+    try:
+        with open(filepath, 'rb') as f:
+            return f.read(len(SQLITE_HEADER)) == SQLITE_HEADER
+    except OSError:
+        return False
+
+def open_session_store(filepath):
+    conn = sqlite3.connect(filepath)
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+# --- ROW <-> RECORD ---
+def encode_track_value(column, value):
+    if column == "version_keywords":
+        return None if value is None else "|".join(value)
+    return value
+
+def decode_track_value(column, value):
+    if column == "version_keywords":
+        return None if value is None else (tuple(value.split("|")) if value else ())
+    return value
+
+# Paths from non-UTF-8 filenames carry surrogate escapes, which SQLite cannot store as TEXT. Such values are
+# stored as a BLOB of their 'surrogatepass' UTF-8 bytes (as in session_pack) and decoded back on read.
+def _to_sql(value):
+    if isinstance(value, str) and not value.isascii():
+        try:
+            value.encode('utf-8')
+        except UnicodeEncodeError:
+            return value.encode('utf-8', 'surrogatepass')
+    return value
+
+def _from_sql(value):
+    return value.decode('utf-8', 'surrogatepass') if isinstance(value, bytes) else value
+
+def _rows_to_records(rows, columns, record_type):
+    return [record_type(**{col: decode_track_value(col, _from_sql(val)) for col, val in zip(columns, row)}) for row in rows]
+
+def _record_rows(tracks, columns, first_position):
+    for position, track in enumerate(tracks, start=first_position):
+        yield (position, *(_to_sql(encode_track_value(col, track.get(col))) for col in columns))
+
+# --- WRITES ---
+def save_session_store(filepath, spotify_tracks, local_tracks, session_meta):
+    # Full replace of both track tables and the metadata, atomically
+    with closing(open_session_store(filepath)) as conn, conn:
+        conn.execute("DELETE FROM spotify_tracks")
+        conn.execute("DELETE FROM local_tracks")
+        _insert_tracks(conn, "spotify_tracks", SPOTIFY_COLUMNS, spotify_tracks, 0)
+        _insert_tracks(conn, "local_tracks", LOCAL_COLUMNS, local_tracks, 0)
+        write_session_meta(conn, session_meta)
+
+def _insert_tracks(conn, table, columns, tracks, first_position, keep_position_of=None):
+    # keep_position_of: key column; a track already stored under that key is updated where it is
+    placeholders = ", ".join("?" * (len(columns) + 1))
+    if keep_position_of is None:
+        statement = f"INSERT OR REPLACE INTO {table} (position, {', '.join(columns)}) VALUES ({placeholders})"
+    else:
+        updates = ", ".join(f"{col} = excluded.{col}" for col in columns if col != keep_position_of)
+        statement = f"INSERT INTO {table} (position, {', '.join(columns)}) VALUES ({placeholders}) ON CONFLICT({keep_position_of}) DO UPDATE SET {updates}"
+    conn.executemany(statement, _record_rows(tracks, columns, first_position))
+
+def _next_position(conn, table):
+    hi = conn.execute(f"SELECT MAX(position) FROM {table}").fetchone()[0]
+    return (hi if hi is not None else -1) + 1
+
+def write_session_meta(conn, session_meta):
+    conn.executemany("INSERT OR REPLACE INTO run_meta (key, value) VALUES (?, ?)",
+                     [(key, json.dumps(value)) for key, value in session_meta.items()]) # JSON keeps ints as ints
+
+# Partial updates take an open connection, so several of them (and write_session_meta) can share one
+# transaction: `with closing(open_session_store(filepath)) as conn, conn: ...`
+def prepend_spotify_tracks(conn, spotify_tracks):
+    # Places the tracks before all stored ones (newly liked songs come first in Spotify's order). A track
+    # already stored (same id) is replaced, so a re-liked song moves to its new position.
+    lo = conn.execute("SELECT MIN(position) FROM spotify_tracks").fetchone()[0]
+    _insert_tracks(conn, "spotify_tracks", SPOTIFY_COLUMNS, spotify_tracks, (lo or 0) - len(spotify_tracks))
+
+def upsert_spotify_tracks(conn, spotify_tracks):
+    # Updates stored tracks in place and appends the others
+    _insert_tracks(conn, "spotify_tracks", SPOTIFY_COLUMNS, spotify_tracks, _next_position(conn, "spotify_tracks"), keep_position_of="id")
+
+def delete_spotify_tracks(conn, track_ids):
+    conn.executemany("DELETE FROM spotify_tracks WHERE id = ?", [(tid,) for tid in track_ids])
+
+def upsert_local_tracks(conn, local_tracks):
+    # Updates stored tracks in place and appends the others
+    _insert_tracks(conn, "local_tracks", LOCAL_COLUMNS, local_tracks, _next_position(conn, "local_tracks"), keep_position_of="filepath")
+
+def delete_local_tracks(conn, filepaths):
+    conn.executemany("DELETE FROM local_tracks WHERE filepath = ?", [(_to_sql(fp),) for fp in filepaths])
+
+# --- READS ---
+def load_session_store(filepath, spotify_columns=SPOTIFY_COLUMNS, local_columns=LOCAL_COLUMNS):
+    # Returns (spotify_tracks, local_tracks, session_meta) in stored order. Passing column subsets
+    # (COMPARATOR_*_COLUMNS) loads only those fields; lookup_*_tracks can fill in the rest later.
+    with closing(open_session_store(filepath)) as conn:
+        spotify_tracks = _rows_to_records(conn.execute(f"SELECT {', '.join(spotify_columns)} FROM spotify_tracks ORDER BY position"), spotify_columns, SpotifyTrack)
+        local_tracks = _rows_to_records(conn.execute(f"SELECT {', '.join(local_columns)} FROM local_tracks ORDER BY position"), local_columns, LocalTrack)
+        session_meta = {key: json.loads(value) for key, value in conn.execute("SELECT key, value FROM run_meta")}
+    return spotify_tracks, local_tracks, session_meta
+
+LOOKUP_BATCH_SIZE = 500 # Keys per query, below SQLite's bound-parameter limit
+
+def _lookup_tracks(filepath, table, key_column, keys, columns, record_type):
+    keys, found = list(keys), {}
+    with closing(open_session_store(filepath)) as conn:
+        for i in range(0, len(keys), LOOKUP_BATCH_SIZE):
+            batch = [_to_sql(key) for key in keys[i:i + LOOKUP_BATCH_SIZE]]
+            rows = conn.execute(f"SELECT {', '.join(columns)} FROM {table} WHERE {key_column} IN ({', '.join('?' * len(batch))})", batch)
+            for record in _rows_to_records(rows, columns, record_type):
+                found[record[key_column]] = record
+    return found
+
+def lookup_spotify_tracks(filepath, track_ids, columns=SPOTIFY_COLUMNS):
+    # Returns {id: SpotifyTrack} for the stored ones among track_ids
+    return _lookup_tracks(filepath, "spotify_tracks", "id", track_ids, columns, SpotifyTrack)
+
+def lookup_local_tracks(filepath, filepaths, columns=LOCAL_COLUMNS):
+    # Returns {filepath: LocalTrack} for the stored ones among filepaths
+    return _lookup_tracks(filepath, "local_tracks", "filepath", filepaths, columns, LocalTrack)
@@ -1,47 +1,113 @@
 import unicodedata
 import re
+from functools import lru_cache
 from .config import APP_CONFIG # Use relative import for APP_CONFIG
 
-def normalize_text_advanced(text, is_artist=False):
-    if not text: return ""
-    normalized_text = str(text)
-    
-    for pattern in APP_CONFIG["normalization_patterns_to_remove_regex"]:
-        normalized_text = pattern.sub("", normalized_text)
+# --- COMPILED NORMALIZATION PIPELINE ---
+# Artist cut-offs: everything from the first "feat."/"ft.", ",", "&" or " a.k.a." to the end. Each of the
+# former separate re.sub calls truncated the string, so one alternation keeps the earliest cut (same result).
+ARTIST_TRUNCATE_REGEX = re.compile(r'(?:feat|ft)\..*|[,&].*|\s+a\.?k\.?a\.?.*', flags=re.IGNORECASE)
+TITLE_BRACKETS_REGEX = re.compile(r'[\(\[\{].*?[\)\]\}]')
+TITLE_TRUNCATE_REGEX = re.compile(r'[:-].*$')
+# After the ASCII fold only ASCII remains, so r"[^\w\s]" becomes a str.translate deletion table
+NON_WORD_ASCII_TABLE = {c: None for c in range(128) if not re.match(r'[\w\s]', chr(c))}
+ARTIST_MEMO_SIZE = 65536 # Artist names repeat across a library; titles mostly don't, so only artists are memoized
+
+_pipeline_source = None # normalization_patterns_to_remove_regex list the pipeline was built from
+_removal_steps = (None, ()) # (prefilter alternation or None, removal patterns in configured order)
+
+def _removal_pipeline():
+    # One alternation of all configured removal patterns, rebuilt when load_app_config replaces them, decides
+    # whether a string needs the removal loop at all. It cannot replace the loop: the patterns are applied one
+    # after another, so a removal can expose a match for a later pattern that a single pass misses (nested
+    # brackets such as "(stereo(official video))"). A string none of them matches is left unchanged by the
+    # loop, so skipping it gives the same result. Patterns that cannot be combined (e.g. inline global flags,
+    # or differing compile flags) always run the loop.
+    global _pipeline_source, _removal_steps
+    source = APP_CONFIG["normalization_patterns_to_remove_regex"]
+    if source is not _pipeline_source:
+        prefilter = None
+        if len({p.flags for p in source}) == 1:
+            try:
+                prefilter = re.compile("|".join(f"(?:{p.pattern})" for p in source), flags=source[0].flags)
+            except re.error:
+                pass
+        _removal_steps = (prefilter, tuple(source))
+        _pipeline_source = source
+        _normalize_artist_memo.cache_clear()
+    return _removal_steps
+
+def _normalize_uncached(text, is_artist, removal_steps):
+    prefilter, patterns = removal_steps
+    if prefilter is None or prefilter.search(text):
+        for pattern in patterns:
+            text = pattern.sub("", text)
     
-    normalized_text = unicodedata.normalize('NFKD', normalized_text).encode('ascii', 'ignore').decode('utf-8')
+    text = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode('utf-8')
     
     if is_artist:
-        normalized_text = re.sub(r'feat\..*', '', normalized_text, flags=re.IGNORECASE)
-        normalized_text = re.sub(r'ft\..*', '', normalized_text, flags=re.IGNORECASE) # Also ft.
-        normalized_text = re.sub(r'[,&].*', '', normalized_text) # Takes only first artist
-        # Attempt to remove ' a.k.a. ...'
-        normalized_text = re.sub(r'\s+a\.?k\.?a\.?.*', '', normalized_text, flags=re.IGNORECASE)
+        text = ARTIST_TRUNCATE_REGEX.sub('', text) # Takes only first artist, drops feat./ft./a.k.a.
     else: # Is title
-        normalized_text = re.sub(r'[\(\[\{].*?[\)\]\}]', '', normalized_text) 
-        normalized_text = re.sub(r'[:-].*$', '', normalized_text) 
+        text = TITLE_BRACKETS_REGEX.sub('', text)
+        text = TITLE_TRUNCATE_REGEX.sub('', text)
     
-    normalized_text = re.sub(r"[^\w\s]", "", normalized_text) 
-    normalized_text = normalized_text.lower().strip()
-    normalized_text = re.sub(r'\s+', ' ', normalized_text)
-    return normalized_text
+    return ' '.join(text.translate(NON_WORD_ASCII_TABLE).lower().split())
+
+@lru_cache(maxsize=ARTIST_MEMO_SIZE)
+def _normalize_artist_memo(text):
+    return _normalize_uncached(text, True, _removal_steps)
+
+def normalize_text_advanced(text, is_artist=False):
+    if not text: return ""
+    removal_steps = _removal_pipeline()
+    if is_artist:
+        return _normalize_artist_memo(str(text))
+    return _normalize_uncached(str(text), False, removal_steps)
+
+# --- VERSION KEYWORD MATCHER ---
+_keyword_source = None # version_keywords list the matcher was built from
+_keyword_matcher = None
+_keyword_implied = {}
+
+def _version_keyword_matcher():
+    # One regex for all keywords, found in a single scan. Each match is a zero-width lookahead, so
+    # overlapping keywords ("radio edit" and "edit") are all reported. At one position the alternation
+    # returns the longest keyword; shorter keywords ending on a word boundary inside it ("radio" in
+    # "radio edit") are added from _keyword_implied.
+    global _keyword_source, _keyword_matcher, _keyword_implied
+    source = APP_CONFIG["version_keywords"]
+    if source is not _keyword_source:
+        keywords = sorted({kw.lower() for kw in source if kw}, key=len, reverse=True)
+        alternation = "|".join(re.escape(kw) for kw in keywords)
+        _keyword_matcher = re.compile(r'(?=\b(' + alternation + r')\b)') if keywords else None
+        _keyword_implied = {
+            kw: [other for other in keywords if other != kw and re.match(re.escape(other) + r'\b', kw)]
+            for kw in keywords
+        }
+        _keyword_source = source
+    return _keyword_matcher
 
 def extract_version_keywords(title):
     if not title: return set()
-    title_lower = title.lower()
+    matcher = _version_keyword_matcher()
+    if matcher is None: return set()
+    # Keywords inside (...)/[...]/{...} are part of the title and delimited by non-word characters,
+    # so this one scan also covers bracketed version info
     found_keywords = set()
-    
-    for kw in APP_CONFIG["version_keywords"]:
-        if re.search(r'\b' + re.escape(kw) + r'\b', title_lower):
-            found_keywords.add(kw)
-            
-    bracket_content = re.findall(r'[\(\[\{](.*?)[\)\]\}]', title_lower)
-    for content_part in bracket_content:
-        for kw in APP_CONFIG["version_keywords"]:
-            if re.search(r'\b' + re.escape(kw) + r'\b', content_part):
-                found_keywords.add(kw)
+    for kw in matcher.findall(title.lower()):
+        found_keywords.add(kw)
+        found_keywords.update(_keyword_implied[kw])
     return found_keywords
 
+def record_version_keywords(track):
+    # Version keywords cached on the track record ('version_keywords', stored like norm_title).
+    # Records from older sessions get them computed once here.
+    keywords = track.get('version_keywords')
+    if keywords is None:
+        keywords = tuple(sorted(extract_version_keywords(track['original_title'])))
+        track['version_keywords'] = keywords
+    return set(keywords)
+
 def generate_block_key(norm_artist, norm_title):
     key_parts = []
     if norm_artist and len(norm_artist) > 0:
@@ -58,4 +124,21 @@ def generate_block_key(norm_artist, norm_title):
             # This part can be enhanced. For now, just first letter of first word.
             key_parts.append(title_words[0][0])
     
-    return "".join(key_parts) if key_parts else "default_block"
\ No newline at end of file
+    return "".join(key_parts) if key_parts else "default_block"
+
+def generate_index_features(norm_artist, norm_title):
+    # Word tokens of the normalized artist and title, tagged by field so "love" the artist and "love" in a
+    # title are separate features. Used by the local track inverted index instead of single-letter blocks.
+    features = set()
+    if norm_artist:
+        features.update("a:" + word for word in norm_artist.split())
+    if norm_title:
+        features.update("t:" + word for word in norm_title.split())
+    return features
+
+def generate_feature_trigrams(feature):
+    # Character trigrams of an index feature's word, tagged by field ("t:helo" -> "t# he", "t#hel", "t#elo",
+    # "t#lo "). Padding gives short words and word edges trigrams too. Used to find indexed words close to a
+    # misspelt one.
+    padded = f" {feature[2:]} "
+    return {f"{feature[0]}#{padded[i:i + 3]}" for i in range(len(padded) - 2)}
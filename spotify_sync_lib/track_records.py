@@ -0,0 +1,89 @@
+import sys
+
+# Compact track records. A dict per track costs a hash table plus its keys; these __slots__ classes store the
+# fields inline, and the strings that repeat across a library (artists, albums) are interned so every track
+# by the same artist shares one string object.
+# Records keep the dict-style access used throughout the code (track['norm_title'], track.get('url'),
+# 'version_note' in track, track['review_decision'] = ...). A field that was never set reads as None;
+# get() and `in` treat None as missing, like a key that was never added to a dict.
+SPOTIFY_TRACK_FIELDS = ("id", "original_title", "original_artist", "all_artists_str", "album",
+                        "norm_title", "norm_artist", "version_keywords", "url", "added_at",
+                        "version_note", "review_decision") # The last two are set during comparison/review
+LOCAL_TRACK_FIELDS = ("filepath", "original_title", "original_artist", "album",
+                      "norm_title", "norm_artist", "version_keywords")
+INTERNED_FIELDS = frozenset(("original_artist", "all_artists_str", "album", "norm_artist"))
+
+def _intern(value):
+    return sys.intern(value) if type(value) is str else value
+
+class TrackRecord:
+    __slots__ = ()
+    FIELDS = ()
+    FIELD_SET = frozenset()
+
+    def __init__(self, **fields):
+        for name in self.FIELDS:
+            value = fields.get(name)
+            if name in INTERNED_FIELDS: value = _intern(value)
+            elif name == "version_keywords" and type(value) is list: value = tuple(value) # From JSON sessions
+            setattr(self, name, value)
+
+    @classmethod
+    def from_dict(cls, data):
+        # Unknown keys are ignored (e.g. fields of older session files)
+        return cls(**{name: data.get(name) for name in cls.FIELDS})
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.FIELDS if getattr(self, name) is not None}
+
+    def __getitem__(self, key):
+        if key not in self.FIELD_SET:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        if key not in self.FIELD_SET:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def get(self, key, default=None):
+        value = getattr(self, key) if key in self.FIELD_SET else None
+        return default if value is None else value
+
+    def __contains__(self, key):
+        return key in self.FIELD_SET and getattr(self, key) is not None
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.FIELDS)
+
+    __hash__ = None # Mutable, like the dicts they replace
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+class SpotifyTrack(TrackRecord):
+    __slots__ = SPOTIFY_TRACK_FIELDS
+    FIELDS = SPOTIFY_TRACK_FIELDS
+    FIELD_SET = frozenset(SPOTIFY_TRACK_FIELDS)
+
+
+class LocalTrack(TrackRecord):
+    __slots__ = LOCAL_TRACK_FIELDS
+    FIELDS = LOCAL_TRACK_FIELDS
+    FIELD_SET = frozenset(LOCAL_TRACK_FIELDS)
+
+
+def track_record_to_json(obj):
+    # json.dump(..., default=track_record_to_json) writes records as plain objects
+    if isinstance(obj, TrackRecord):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def as_spotify_tracks(tracks):
+    return [t if isinstance(t, SpotifyTrack) else SpotifyTrack.from_dict(t) for t in tracks] if tracks is not None else None
+
+def as_local_tracks(tracks):
+    return [t if isinstance(t, LocalTrack) else LocalTrack.from_dict(t) for t in tracks] if tracks is not None else None